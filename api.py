@@ -0,0 +1,243 @@
+import logging
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Query
+from pydantic import BaseModel
+
+from time_utils import get_bolivia_today, combine_date_time, parse_datetime_flexible
+from occupancy import dock_capacity, get_reservation_index, reservation_slots
+from sheets_data import (
+    GESTION_SHEET, RESERVAS_SHEET, load_sheets, load_view_data, get_shared_data_store, get_write_log_status, get_sheets_connection_health,
+    get_today_reservations, get_existing_arrivals, get_completed_orders,
+    get_arrival_record_silent, get_dock_board_feed,
+    build_arrival_data, validate_service_times, build_service_data, is_blank_value,
+    save_arrival_to_sheets, update_service_times, get_write_results
+)
+
+# ─────────────────────────────────────────────────────────────
+# Headless JSON API for scanners and integrations
+# Run with: uvicorn api:app --host 0.0.0.0 --port 8000
+# Reads .streamlit/secrets.toml and uses the same data layer code as the Streamlit
+# app, but runs in its own process: the data store, caches and idempotency keys
+# are separate copies. Only the write-ahead log file is shared with the app, and
+# whichever process holds its replayer lock flushes it to Google Sheets.
+# ─────────────────────────────────────────────────────────────
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger('provider_control_app')
+
+# Request handlers share the data store frames; copy on write keeps them intact
+pd.options.mode.copy_on_write = True
+
+app = FastAPI(title="Control de Proveedores API")
+
+class ArrivalRequest(BaseModel):
+    orden_de_compra: str
+    hora_llegada: str  # "HH:MM" for today or "YYYY-MM-DD H:MM:SS"
+
+class ServiceRequest(BaseModel):
+    orden_de_compra: str
+    hora_inicio_atencion: str  # "HH:MM" for today or "YYYY-MM-DD H:MM:SS"
+    hora_fin_atencion: str
+
+def parse_request_time(value):
+    """Parse "HH:MM" as today in Bolivia or a full datetime string"""
+    value = str(value).strip()
+    try:
+        return combine_date_time(get_bolivia_today(), datetime.strptime(value, '%H:%M').time())
+    except ValueError:
+        parsed = parse_datetime_flexible(value)
+        if parsed is None:
+            raise HTTPException(status_code=422, detail=f"Hora inválida: '{value}'")
+        return parsed
+
+def load_frames():
+    """Frames from the shared data store, 503 when Google Sheets is unavailable"""
+    reservas_df, gestion_df = load_view_data('registro')
+    if reservas_df is None or gestion_df is None:
+        raise HTTPException(status_code=503, detail="No se pudo cargar los datos de Google Sheets")
+    return reservas_df, gestion_df
+
+def frame_to_records(df):
+    """DataFrame rows as JSON-safe dicts (NaN -> None)"""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+@app.post("/arrivals")
+def register_arrival(request: ArrivalRequest):
+    orden_compra = request.orden_de_compra.strip()
+    logger.info(f"API arrival registration for order: {orden_compra}")
+    reservas_df, gestion_df = load_frames()
+
+    today_reservations = get_today_reservations(reservas_df)
+    order_reserva = today_reservations[today_reservations['Orden_de_compra'].astype(str).str.strip() == orden_compra]
+    if order_reserva.empty:
+        raise HTTPException(status_code=404, detail=f"La orden '{orden_compra}' no tiene reserva para hoy")
+
+    processed_orders = get_existing_arrivals(gestion_df) + get_completed_orders(gestion_df)
+    if orden_compra in [str(order).strip() for order in processed_orders]:
+        raise HTTPException(status_code=409, detail=f"La llegada de la orden '{orden_compra}' ya fue registrada")
+
+    arrival_data = build_arrival_data(order_reserva.iloc[0], parse_request_time(request.hora_llegada))
+    write_id = save_arrival_to_sheets(arrival_data, get_arrival_record_silent(gestion_df, orden_compra))
+    if not write_id:
+        raise HTTPException(status_code=500, detail="Error al registrar la llegada")
+
+    return {
+        'write_id': write_id,
+        'Orden_de_compra': orden_compra,
+        'Hora_llegada': arrival_data['Hora_llegada'],
+        'Tiempo_retraso': arrival_data['Tiempo_retraso'],
+        'hora_de_reserva': arrival_data['hora_de_reserva']
+    }
+
+@app.post("/services")
+def register_service(request: ServiceRequest):
+    orden_compra = request.orden_de_compra.strip()
+    logger.info(f"API service registration for order: {orden_compra}")
+    reservas_df, gestion_df = load_frames()
+
+    arrival_record = get_arrival_record_silent(gestion_df, orden_compra)
+    if arrival_record is None or is_blank_value(arrival_record['Hora_llegada']):
+        raise HTTPException(status_code=404, detail=f"No se encontró registro de llegada para la orden: '{orden_compra}'")
+    if not is_blank_value(arrival_record['Hora_fin_atencion']):
+        raise HTTPException(status_code=409, detail=f"La atención de la orden '{orden_compra}' ya fue registrada")
+
+    arrival_datetime = parse_datetime_flexible(str(arrival_record['Hora_llegada']))
+    hora_inicio = parse_request_time(request.hora_inicio_atencion)
+    hora_fin = parse_request_time(request.hora_fin_atencion)
+
+    validation_error = validate_service_times(arrival_datetime, hora_inicio, hora_fin)
+    if validation_error:
+        raise HTTPException(status_code=422, detail=validation_error)
+
+    service_data = build_service_data(arrival_datetime, hora_inicio, hora_fin)
+    write_id = update_service_times(orden_compra, service_data, arrival_record)
+    if not write_id:
+        raise HTTPException(status_code=500, detail="Error al registrar la atención")
+
+    return {'write_id': write_id, 'Orden_de_compra': orden_compra, **service_data}
+
+@app.get("/writes/{write_id}")
+def write_status(write_id: str):
+    """Whether a save acknowledged by /arrivals or /services reached Google Sheets or was rejected"""
+    status, reason = get_write_results([write_id])[write_id]
+    return {'write_id': write_id, 'status': status, 'reason': reason}
+
+@app.get("/status/today")
+def today_status(since: int = Query(None, description="Return only changes after this sequence")):
+    feed = get_dock_board_feed()
+    feed.sync()
+
+    if since is not None:
+        sequence, changes = feed.changes_since(since)
+        if changes is not None:
+            return {
+                'sequence': sequence,
+                'changes': [{'Orden_de_compra': order, 'row': row} for _, order, row in changes]
+            }
+
+    sequence, board = feed.snapshot()
+    return {'sequence': sequence, 'orders': list(board.values())}
+
+@lru_cache(maxsize=64)
+def compute_dashboard_aggregates(data_version, weeks, provider):
+    """Dashboard aggregates for one filter combination, cached per data version
+
+    lru_cache rather than st.cache_data: uvicorn runs outside the Streamlit
+    runtime. Callers must not mutate the returned dict. Errors are not
+    cached, so a 503 is retried on the next request.
+    """
+    import dashboard
+
+    gestion_df = load_sheets(GESTION_SHEET)[0]
+    if gestion_df is None:
+        # The store may have failed a reload since load_frames succeeded
+        raise HTTPException(status_code=503, detail="No se pudo cargar los datos de Google Sheets")
+    filtered_data = dashboard.get_completed_weeks_data(gestion_df, weeks)
+    weekly_data = dashboard.aggregate_by_week(filtered_data, provider)
+    hourly_data = dashboard.aggregate_by_hour_from_filtered(filtered_data, provider)
+    percentiles = dashboard.get_period_percentiles(gestion_df, data_version, weeks, provider)
+    return {
+        'data_version': data_version,
+        'weekly': frame_to_records(weekly_data),
+        'hourly': frame_to_records(hourly_data),
+        'percentiles': frame_to_records(percentiles)
+    }
+
+@app.get("/dashboard/aggregates")
+def dashboard_aggregates(weeks: int = Query(4, ge=1, le=52), provider: str = "Todos"):
+    load_frames()
+    return compute_dashboard_aggregates(get_shared_data_store().version, weeks, provider)
+
+@app.get("/providers/scorecards")
+def provider_scorecards(weeks: int = Query(4, ge=1, le=52)):
+    import dashboard
+
+    reservas_df, gestion_df = load_frames()
+    scorecards = dashboard.get_provider_scorecards(gestion_df, get_shared_data_store().version, weeks)
+    return {'data_version': get_shared_data_store().version, 'providers': frame_to_records(scorecards)}
+
+def load_reservation_index():
+    """Reservation index over the whole reservas sheet, 503 when Google Sheets is unavailable"""
+    reservas_all = load_sheets(RESERVAS_SHEET)[0]
+    if reservas_all is None:
+        raise HTTPException(status_code=503, detail="No se pudo cargar los datos de Google Sheets")
+    return get_reservation_index(reservas_all, get_shared_data_store().version)
+
+def parse_request_date(value):
+    """Parse a "YYYY-MM-DD" query value"""
+    try:
+        return datetime.strptime(str(value).strip(), '%Y-%m-%d')
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Fecha inválida: '{value}'")
+
+@app.get("/reservations/overbooking")
+def reservation_overbooking(start: str = Query(None, description="YYYY-MM-DD, today by default"),
+                            weeks: int = Query(2, ge=1, le=52),
+                            capacity: int = Query(None, ge=1)):
+    index = load_reservation_index()
+    range_start = parse_request_date(start) if start else datetime.combine(get_bolivia_today(), datetime.min.time())
+    range_end = range_start + timedelta(weeks=weeks)
+    capacity = capacity or dock_capacity()
+    overbooked = index.overbooked(capacity, range_start, range_end)
+    return {
+        'data_version': get_shared_data_store().version,
+        'capacity': capacity,
+        'overbooked': frame_to_records(overbooked.astype({'Inicio': str, 'Fin': str}))
+    }
+
+@app.get("/reservations/conflicts")
+def reservation_conflicts(fecha: str, hora: str, orden_de_compra: str = None):
+    """Reservations overlapping a booking of hora (reservas Hora format) on fecha"""
+    index = load_reservation_index()
+    day = parse_request_date(fecha)
+    slots = reservation_slots(hora)
+    if not slots:
+        raise HTTPException(status_code=422, detail=f"Hora inválida: '{hora}'")
+
+    conflicts = pd.concat([
+        index.conflicts(day + timedelta(minutes=start), day + timedelta(minutes=end), orden_de_compra)
+        for start, end in slots
+    ]).drop_duplicates()
+    return {
+        'data_version': get_shared_data_store().version,
+        'conflicts': frame_to_records(conflicts.astype({'Inicio': str, 'Fin': str}))
+    }
+
+@app.get("/health")
+def health():
+    store = get_shared_data_store()
+    return {
+        'data_version': store.version,
+        'data_fresh': store.is_fresh(),
+        'google_sheets': get_sheets_connection_health(),
+        'write_log': get_write_log_status()
+    }
@@ -1,17 +1,27 @@
 import io
 import os
 import streamlit as st
-import gspread
 import pandas as pd
-from google.oauth2.service_account import Credentials
 import time
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 from datetime import datetime, timedelta, time as dt_time
-import pytz
 import logging
 
+from time_utils import (
+    get_bolivia_now, get_bolivia_today,
+    parse_time_range, parse_single_time, parse_combined_time_slots,
+    combine_date_time, parse_datetime_flexible
+)
+from sheets_data import (
+    load_view_data, invalidate_data_store, refresh_data_store, get_shared_data_store,
+    get_sheets_connection_health, get_today_reservations,
+    get_existing_arrivals, get_completed_orders, get_pending_arrivals,
+    get_arrival_record, get_arrival_record_silent, get_dock_board_feed, BOARD_STATES,
+    build_arrival_data, validate_service_times, build_service_data, calculate_arrival_delay,
+    save_arrival_to_sheets, update_service_times, get_write_results, get_write_log_status,
+    acknowledge_failed_writes, WRITE_LOG_PATH
+)
+from forecast import get_service_time_model
+
 # ─────────────────────────────────────────────────────────────
 # LOGGING CONFIGURATION
 # ─────────────────────────────────────────────────────────────
@@ -27,16 +37,8 @@ logging.basicConfig(
 # Create logger for this application
 logger = logging.getLogger('provider_control_app')
 
-# Configure timezone for Bolivia
-BOLIVIA_TZ = pytz.timezone('America/La_Paz')
-
-def get_bolivia_now():
-    """Get current datetime in Bolivia timezone"""
-    return datetime.now(BOLIVIA_TZ)
-
-def get_bolivia_today():
-    """Get today's date in Bolivia timezone"""
-    return get_bolivia_now().date()
+# The data store hands the same frames to every session, so edits must copy
+pd.options.mode.copy_on_write = True
 
 # Configure page
 st.set_page_config(
@@ -48,8 +50,8 @@ st.set_page_config(
 # Custom CSS for enhanced tab visibility - UNCHANGED
 st.markdown("""
 <style>
-/* Tab styling */
-.stTabs [data-baseweb="tab-list"] {
+/* Tab styling (view selector rendered as a horizontal radio, scoped to its container) */
+.st-key-view_selector .stRadio [role="radiogroup"] {
     gap: 20px;
     background-color: #f0f2f6;
     padding: 10px;
@@ -57,7 +59,7 @@ st.markdown("""
     margin-bottom: 20px;
 }
 
-.stTabs [data-baseweb="tab"] {
+.st-key-view_selector .stRadio [role="radiogroup"] > label {
     height: 60px;
     background-color: white;
     border-radius: 8px;
@@ -65,9 +67,14 @@ st.markdown("""
     border: 2px solid #e1e5e9;
     font-weight: bold;
     font-size: 16px;
+    align-items: center;
 }
 
-.stTabs [aria-selected="true"] {
+.st-key-view_selector .stRadio [role="radiogroup"] > label > div:first-child {
+    display: none;
+}
+
+.st-key-view_selector .stRadio [role="radiogroup"] > label:has(input:checked) {
     background-color: #1f77b4 !important;
     color: white !important;
     border-color: #1f77b4 !important;
@@ -154,6 +161,44 @@ st.markdown("""
     margin: 10px 0;
 }
 
+/* Post-save notifications - the browser hides them when the animation delay runs out */
+.save-notification {
+    padding: 15px;
+    border-radius: 0 8px 8px 0;
+    margin: 10px 0;
+    animation: notification-dismiss 0.5s ease-in forwards;
+}
+
+.save-notification-success {
+    background-color: rgba(76, 175, 80, 0.15);
+    border-left: 5px solid #4caf50;
+}
+
+.save-notification-warning {
+    background-color: rgba(255, 152, 0, 0.15);
+    border-left: 5px solid #ff9800;
+}
+
+.save-notification-info {
+    background-color: rgba(33, 150, 243, 0.1);
+    border-left: 5px solid #2196f3;
+}
+
+.save-notification-error {
+    background-color: rgba(244, 67, 54, 0.12);
+    border-left: 5px solid #f44336;
+}
+
+@keyframes notification-dismiss {
+    to {
+        opacity: 0;
+        max-height: 0;
+        padding: 0;
+        margin: 0;
+        overflow: hidden;
+    }
+}
+
 /* Visual separator */
 .tab-separator {
     height: 4px;
@@ -165,939 +210,136 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ─────────────────────────────────────────────────────────────
-# 1. Google Sheets Configuration - WITH LOGGING
+# 1. Live Dock Board - WITH LOGGING
 # ─────────────────────────────────────────────────────────────
-@st.cache_resource
-def setup_google_sheets():
-    """Configurar conexión a Google Sheets"""
-    logger.info("Starting Google Sheets connection setup")
-    try:
-        credentials_info = dict(st.secrets["google_service_account"])
-        logger.info("Successfully loaded Google service account credentials from secrets")
-        
-        scopes = [
-            "https://www.googleapis.com/auth/spreadsheets",
-            "https://www.googleapis.com/auth/drive"
-        ]
-        
-        credentials = Credentials.from_service_account_info(credentials_info, scopes=scopes)
-        logger.info("Successfully created credentials with required scopes")
-        
-        gc = gspread.authorize(credentials)
-        logger.info("Successfully authorized gspread client")
-        
-        return gc
-    except KeyError as e:
-        logger.error(f"Missing required secret key: {str(e)}")
-        st.error(f"❌ Error: Missing configuration - {str(e)}")
-        return None
-    except Exception as e:
-        logger.error(f"Error setting up Google Sheets connection: {str(e)}")
-        st.error(f"❌ Error conectando: {str(e)}")
-        return None
-
-# ─────────────────────────────────────────────────────────────
-# 2. Google Sheets Download Functions - WITH LOGGING
-# ─────────────────────────────────────────────────────────────
-@st.cache_data(ttl=60, show_spinner=False)  # Reduced TTL for real-time management
-def download_sheets_to_memory():
-    """Download all sheets from Google Sheets - REPLACES SharePoint Excel download"""
-    logger.info("Starting data download from Google Sheets")
-    try:
-        gc = setup_google_sheets()
-        if not gc:
-            logger.error("Failed to establish Google Sheets connection")
-            return None, None, None
-        
-        spreadsheet_name = st.secrets["GOOGLE_SHEET_NAME"]
-        logger.info(f"Attempting to open spreadsheet: {spreadsheet_name}")
-        
-        spreadsheet = gc.open(spreadsheet_name)
-        logger.info(f"Successfully opened spreadsheet: {spreadsheet_name}")
-        
-        # Load credentials sheet
-        logger.info("Loading credentials sheet...")
-        try:
-            credentials_ws = spreadsheet.worksheet("proveedor_credencial")
-            credentials_data = credentials_ws.get_all_records()
-            logger.info(f"Retrieved {len(credentials_data)} credential records")
-            
-            if credentials_data:
-                credentials_df = pd.DataFrame(credentials_data)
-                # Ensure all columns are strings for consistency
-                for col in credentials_df.columns:
-                    credentials_df[col] = credentials_df[col].astype(str)
-                logger.info(f"Successfully processed credentials DataFrame with shape: {credentials_df.shape}")
-            else:
-                logger.warning("No credential records found, using fallback method")
-                # Fallback to raw values
-                all_values = credentials_ws.get_all_values()
-                if all_values and len(all_values) > 1:
-                    credentials_df = pd.DataFrame(all_values[1:], columns=all_values[0])
-                    logger.info(f"Fallback: created credentials DataFrame from raw values with shape: {credentials_df.shape}")
-                else:
-                    credentials_df = pd.DataFrame(columns=['usuario', 'password', 'Email', 'cc'])
-                    logger.warning("No credential data found, created empty DataFrame")
-        except gspread.WorksheetNotFound:
-            logger.warning("Credentials worksheet not found, creating empty DataFrame")
-            credentials_df = pd.DataFrame(columns=['usuario', 'password', 'Email', 'cc'])
-        
-        # Load reservas sheet
-        logger.info("Loading reservas sheet...")
-        try:
-            reservas_ws = spreadsheet.worksheet("proveedor_reservas")
-            reservas_data = reservas_ws.get_all_records()
-            logger.info(f"Retrieved {len(reservas_data)} reservation records")
-            
-            if reservas_data:
-                reservas_df = pd.DataFrame(reservas_data)
-                # Ensure Orden_de_compra is string
-                if 'Orden_de_compra' in reservas_df.columns:
-                    reservas_df['Orden_de_compra'] = reservas_df['Orden_de_compra'].astype(str)
-                logger.info(f"Successfully processed reservas DataFrame with shape: {reservas_df.shape}")
-            else:
-                logger.warning("No reservation records found, using fallback method")
-                # Fallback to raw values
-                all_values = reservas_ws.get_all_values()
-                if all_values and len(all_values) > 1:
-                    reservas_df = pd.DataFrame(all_values[1:], columns=all_values[0])
-                    # Ensure Orden_de_compra is string
-                    if 'Orden_de_compra' in reservas_df.columns:
-                        reservas_df['Orden_de_compra'] = reservas_df['Orden_de_compra'].astype(str)
-                    logger.info(f"Fallback: created reservas DataFrame from raw values with shape: {reservas_df.shape}")
-                else:
-                    reservas_df = pd.DataFrame(columns=['Fecha', 'Hora', 'Proveedor', 'Numero_de_bultos', 'Orden_de_compra'])
-                    logger.warning("No reservation data found, created empty DataFrame")
-        except gspread.WorksheetNotFound:
-            logger.warning("Reservas worksheet not found, creating empty DataFrame")
-            reservas_df = pd.DataFrame(columns=['Fecha', 'Hora', 'Proveedor', 'Numero_de_bultos', 'Orden_de_compra'])
-
-        # Load or create gestion sheet
-        logger.info("Loading gestion sheet...")
-        try:
-            gestion_ws = spreadsheet.worksheet("proveedor_gestion")
-            gestion_data = gestion_ws.get_all_records()
-            logger.info(f"Retrieved {len(gestion_data)} management records")
-            
-            if gestion_data:
-                gestion_df = pd.DataFrame(gestion_data)
-                logger.info(f"Successfully processed gestion DataFrame with shape: {gestion_df.shape}")
-            else:
-                logger.warning("No management records found, using fallback method")
-                # Fallback to raw values
-                all_values = gestion_ws.get_all_values()
-                if all_values and len(all_values) > 1:
-                    gestion_df = pd.DataFrame(all_values[1:], columns=all_values[0])
-                    logger.info(f"Fallback: created gestion DataFrame from raw values with shape: {gestion_df.shape}")
-                else:
-                    gestion_df = pd.DataFrame(columns=[
-                        'Orden_de_compra', 'Proveedor', 'Numero_de_bultos',
-                        'Hora_llegada', 'Hora_inicio_atencion', 'Hora_fin_atencion',
-                        'Tiempo_espera', 'Tiempo_atencion', 'Tiempo_total', 'Tiempo_retraso',
-                        'numero_de_semana', 'hora_de_reserva'
-                    ])
-                    logger.warning("No management data found, created empty DataFrame")
-        except gspread.WorksheetNotFound:
-            logger.warning("Gestion worksheet not found, attempting to create it")
-            # Create gestion sheet if it doesn't exist
-            try:
-                gestion_ws = spreadsheet.add_worksheet("proveedor_gestion", rows=200, cols=12)
-                logger.info("Successfully created new gestion worksheet")
-                
-                # Add headers
-                headers = [
-                    'Orden_de_compra', 'Proveedor', 'Numero_de_bultos',
-                    'Hora_llegada', 'Hora_inicio_atencion', 'Hora_fin_atencion',
-                    'Tiempo_espera', 'Tiempo_atencion', 'Tiempo_total', 'Tiempo_retraso',
-                    'numero_de_semana', 'hora_de_reserva'
-                ]
-                gestion_ws.update(values=[headers], range_name='A1:L1')
-                logger.info("Successfully added headers to new gestion worksheet")
-                
-                gestion_df = pd.DataFrame(columns=headers)
-            except Exception as e:
-                logger.error(f"Failed to create gestion worksheet: {str(e)}")
-                st.warning(f"No se pudo crear hoja de gestión: {e}")
-                gestion_df = pd.DataFrame(columns=[
-                    'Orden_de_compra', 'Proveedor', 'Numero_de_bultos',
-                    'Hora_llegada', 'Hora_inicio_atencion', 'Hora_fin_atencion',
-                    'Tiempo_espera', 'Tiempo_atencion', 'Tiempo_total', 'Tiempo_retraso',
-                    'numero_de_semana', 'hora_de_reserva'
-                ])
-        
-        logger.info(f"Data download complete. DataFrames - Credentials: {credentials_df.shape}, Reservas: {reservas_df.shape}, Gestion: {gestion_df.shape}")
-        return credentials_df, reservas_df, gestion_df
-        
-    except Exception as e:
-        logger.error(f"Critical error during data download: {str(e)}")
-        st.error(f"Error descargando datos: {str(e)}")
-        return None, None, None
-
-def save_gestion_to_sheets(new_record):
-    """Save new management record to Google Sheets - WITH LOGGING"""
-    logger.info(f"Starting save operation for new gestion record: {new_record.get('Orden_de_compra', 'UNKNOWN_ORDER')}")
-    
-    try:
-        # Load current data
-        credentials_df, reservas_df, gestion_df = download_sheets_to_memory()
-        
-        if reservas_df is None:
-            logger.error("Failed to load data for save operation")
-            return False
-        
-        logger.info("Successfully loaded current data for save operation")
-        
-        # Get Google Sheets connection
-        gc = setup_google_sheets()
-        if not gc:
-            logger.error("Failed to establish Google Sheets connection for save")
-            return False
-        
-        spreadsheet_name = st.secrets["GOOGLE_SHEET_NAME"]
-        spreadsheet = gc.open(spreadsheet_name)
-        gestion_ws = spreadsheet.worksheet("proveedor_gestion")
-        
-        logger.info(f"Successfully opened gestion worksheet for order: {new_record.get('Orden_de_compra')}")
-        
-        # Prepare new row data - MAINTAIN EXACT FORMAT
-        new_row_data = [
-            new_record.get('Orden_de_compra', ''),           # A: Orden_de_compra
-            new_record.get('Proveedor', ''),                 # B: Proveedor
-            str(new_record.get('Numero_de_bultos', '')),     # C: Numero_de_bultos
-            new_record.get('Hora_llegada', ''),              # D: Hora_llegada
-            new_record.get('Hora_inicio_atencion', ''),      # E: Hora_inicio_atencion
-            new_record.get('Hora_fin_atencion', ''),         # F: Hora_fin_atencion
-            str(new_record.get('Tiempo_espera', '')),        # G: Tiempo_espera
-            str(new_record.get('Tiempo_atencion', '')),      # H: Tiempo_atencion
-            str(new_record.get('Tiempo_total', '')),         # I: Tiempo_total
-            str(new_record.get('Tiempo_retraso', '')),       # J: Tiempo_retraso
-            str(new_record.get('numero_de_semana', '')),     # K: numero_de_semana
-            str(new_record.get('hora_de_reserva', ''))       # L: hora_de_reserva
-        ]
-        
-        logger.info(f"Prepared new row data for order {new_record.get('Orden_de_compra')}: columns={len(new_row_data)}")
-        
-        # Get current row count to determine next row
-        all_values = gestion_ws.get_all_values()
-        next_row = len(all_values) + 1
-        col_range = f'A{next_row}:L{next_row}'
-        
-        logger.info(f"Inserting new record at row {next_row} (range: {col_range})")
-        
-        # Update specific row instead of append
-        gestion_ws.update(
-            range_name=col_range,
-            values=[new_row_data],
-            value_input_option='RAW'
-        )
-        
-        logger.info(f"Successfully saved new gestion record for order: {new_record.get('Orden_de_compra')}")
-        
-        # Clear cache after successful save
-        download_sheets_to_memory.clear()
-        logger.info("Cache cleared after successful save operation")
-        
-        return True
-        
-    except Exception as e:
-        logger.error(f"Error saving new gestion record for order {new_record.get('Orden_de_compra', 'UNKNOWN')}: {str(e)}")
-        st.error(f"❌ Error guardando registro en Google Sheets: {str(e)}")
-        return False
-
-def update_sheets_record(orden_compra, update_data):
-    """Update existing record in Google Sheets - WITH LOGGING"""
-    logger.info(f"Starting update operation for order: {orden_compra}")
-    logger.info(f"Update data: {list(update_data.keys())}")
-    
-    try:
-        gc = setup_google_sheets()
-        if not gc:
-            logger.error("Failed to establish Google Sheets connection for update")
-            return False
-        
-        spreadsheet_name = st.secrets["GOOGLE_SHEET_NAME"]
-        spreadsheet = gc.open(spreadsheet_name)
-        gestion_ws = spreadsheet.worksheet("proveedor_gestion")
-        
-        logger.info(f"Successfully opened gestion worksheet for update of order: {orden_compra}")
-        
-        # Get all data
-        all_values = gestion_ws.get_all_values()
-        logger.info(f"Retrieved {len(all_values)} total rows from gestion worksheet")
-        
-        # Find the row to update
-        target_row_index = None
-        for i, row in enumerate(all_values[1:], start=1):  # Skip header, start counting from 1
-            if len(row) > 0 and str(row[0]).strip() == str(orden_compra).strip():
-                target_row_index = i
-                logger.info(f"Found target row at index {i} for order: {orden_compra}")
-                break
-        
-        if target_row_index is None:
-            logger.error(f"No matching record found for order: {orden_compra}")
-            available_orders = [str(row[0]).strip() for row in all_values[1:] if len(row) > 0]
-            logger.error(f"Available orders: {available_orders[:10]}...")  # Log first 10 to avoid spam
-            st.error("No se encontró el registro para actualizar")
-            return False
-        
-        # Get the current row data
-        current_row = all_values[target_row_index].copy()
-        logger.info(f"Current row data length: {len(current_row)} columns")
-        
-        # Ensure row has enough columns (12 columns total)
-        while len(current_row) < 12:
-            current_row.append('')
-        
-        # Column mapping (0-based index)
-        col_mapping = {
-            'Hora_llegada': 3,           # D = index 3
-            'Hora_inicio_atencion': 4,   # E = index 4
-            'Hora_fin_atencion': 5,      # F = index 5
-            'Tiempo_espera': 6,          # G = index 6
-            'Tiempo_atencion': 7,        # H = index 7
-            'Tiempo_total': 8,           # I = index 8
-            'Tiempo_retraso': 9,         # J = index 9
-            'numero_de_semana': 10,      # K = index 10
-            'hora_de_reserva': 11        # L = index 11
-        }
-        
-        # Update the row data
-        updated_fields = []
-        for field, value in update_data.items():
-            if field in col_mapping:
-                col_index = col_mapping[field]
-                old_value = current_row[col_index] if col_index < len(current_row) else ''
-                
-                # Handle None values and ensure proper string conversion
-                if value is None or str(value).lower() in ['none', 'nan', '']:
-                    current_row[col_index] = ''
-                    new_value = ''
+BOARD_REFRESH_SECONDS = 15   # How often board fragments poll the shared feed
+
+@st.fragment(run_every=BOARD_REFRESH_SECONDS)
+def render_live_board():
+    """Read-only board of today's orders, updated from the shared feed"""
+    feed = get_dock_board_feed()
+    feed.sync()
+    
+    # Apply only the deltas this session has not seen yet
+    if 'board_rows' not in st.session_state:
+        st.session_state.board_sequence, st.session_state.board_rows = feed.snapshot()
+        recently_changed = set()
+    else:
+        sequence, changes = feed.changes_since(st.session_state.board_sequence)
+        if changes is None:
+            st.session_state.board_sequence, st.session_state.board_rows = feed.snapshot()
+            recently_changed = set()
+        else:
+            for _, order, row in changes:
+                if row is None:
+                    st.session_state.board_rows.pop(order, None)
                 else:
-                    current_row[col_index] = str(value)
-                    new_value = str(value)
-                
-                updated_fields.append(f"{field}: '{old_value}' -> '{new_value}'")
-                logger.info(f"Updated field {field} at column {col_index}: '{old_value}' -> '{new_value}'")
-        
-        logger.info(f"Updated fields for order {orden_compra}: {updated_fields}")
-        
-        # Update the entire row (row numbers are 1-based for gspread)
-        row_number = target_row_index + 1  # Convert to 1-based
-        range_name = f"A{row_number}:L{row_number}"
-        
-        logger.info(f"Updating row {row_number} (range: {range_name}) for order: {orden_compra}")
-        
-        # Update the row
-        gestion_ws.update(values=[current_row], range_name=range_name, value_input_option='RAW')
-        
-        logger.info(f"Successfully updated record for order: {orden_compra}")
-        
-        # Clear cache after successful update
-        download_sheets_to_memory.clear()
-        logger.info("Cache cleared after successful update operation")
-        
-        return True
-        
-    except Exception as e:
-        logger.error(f"Error updating record for order {orden_compra}: {str(e)}")
-        st.error(f"❌ Error actualizando registro: {str(e)}")
-        return False
-
-
-# ─────────────────────────────────────────────────────────────
-# 3. Helper Functions - UNCHANGED TIME PARSING AND CALCULATIONS
-# ─────────────────────────────────────────────────────────────
-def get_today_reservations(reservas_df):
-    """Get today's reservations"""
-    today = get_bolivia_today().strftime('%Y-%m-%d')
-    today_reservations = reservas_df[reservas_df['Fecha'].astype(str).str.contains(today, na=False)]
-    logger.info(f"Found {len(today_reservations)} reservations for today ({today})")
-    return today_reservations
-
-def parse_time_range(time_range_str):
-    """Parse time range string (e.g., '09:00-09:30' or '09:00 - 09:30') and return start time"""
-    try:
-        # Handle both formats: "12:00-12:30" and "12:00 - 12:30"
-        if '-' in time_range_str:
-            start_time_str = time_range_str.split('-')[0].strip()
-            return datetime.strptime(start_time_str, '%H:%M').time()
-        return None
-    except:
-        return None
-
-def parse_single_time(time_str):
-    """Parse single time string (e.g., '09:00') and return time object"""
-    try:
-        return datetime.strptime(time_str.strip(), '%H:%M').time()
-    except:
-        return None
-        
-def parse_combined_time_slots(time_str):
-    """Parse comma-separated time slots and return the first (start) time"""
-    try:
-        if ',' in time_str:
-            # Take the first time slot for combined bookings
-            first_slot = time_str.split(',')[0].strip()
-            # Remove seconds if present (e.g., "09:00:00" -> "09:00")
-            if first_slot.count(':') == 2:
-                first_slot = ':'.join(first_slot.split(':')[:2])
-            return datetime.strptime(first_slot, '%H:%M').time()
-        return None
-    except:
-        return None        
-
-def calculate_time_difference(start_datetime, end_datetime):
-    """Calculate time difference in minutes"""
-    if start_datetime and end_datetime:
-        # Ensure both are datetime objects
-        if isinstance(start_datetime, str):
-            start_datetime = datetime.fromisoformat(start_datetime)
-        if isinstance(end_datetime, str):
-            end_datetime = datetime.fromisoformat(end_datetime)
-            
-        diff = end_datetime - start_datetime
-        return int(diff.total_seconds() / 60)
-    return None
-
-def combine_date_time(date_part, time_part):
-    """Combine date and time into datetime"""
-    return datetime.combine(date_part, time_part)
-
-def format_datetime_no_zero_padding(dt):
-    """Format datetime with single digit hours (9:00:00 not 09:00:00)"""
-    if dt is None:
-        return None
-    
-    # Get components
-    year = dt.year
-    month = dt.month
-    day = dt.day
-    hour = dt.hour  # This will be single digit for 1-9
-    minute = dt.minute
-    second = dt.second
+                    st.session_state.board_rows[order] = row
+            st.session_state.board_sequence = sequence
+            recently_changed = {order for _, order, row in changes if row is not None}
     
-    # Format with single digit hour when needed
-    return f"{year}-{month:02d}-{day:02d} {hour}:{minute:02d}:{second:02d}"
-
-def parse_datetime_flexible(datetime_str):
-    """Parse datetime string that may have single or double digit hours"""
-    if not datetime_str or str(datetime_str).lower() in ['none', 'nan', '']:
-        return None
+    rows = list(st.session_state.board_rows.values())
+    st.caption(f"Actualizado {get_bolivia_now().strftime('%H:%M:%S')} · refresco automático cada {BOARD_REFRESH_SECONDS} s")
     
-    datetime_str = str(datetime_str).strip()
+    if not rows:
+        st.info("No hay reservas programadas para hoy.")
+        return
     
-    try:
-        # First try standard ISO format (with zero-padded hours)
-        return datetime.fromisoformat(datetime_str)
-    except ValueError:
-        try:
-            # Try parsing with single digit hours manually
-            # Format: "2025-07-08 9:00:00"
-            if ' ' in datetime_str and ':' in datetime_str:
-                date_part, time_part = datetime_str.split(' ', 1)
-                
-                # Parse date part
-                year, month, day = map(int, date_part.split('-'))
-                
-                # Parse time part
-                time_components = time_part.split(':')
-                hour = int(time_components[0])
-                minute = int(time_components[1]) if len(time_components) > 1 else 0
-                second = int(time_components[2]) if len(time_components) > 2 else 0
-                
-                return datetime(year, month, day, hour, minute, second)
-            else:
-                return None
-        except (ValueError, IndexError):
-            return None
+    board_df = pd.DataFrame(rows).sort_values(['Hora', 'Proveedor'])
+    board_df['Nuevo'] = board_df['Orden_de_compra'].isin(recently_changed).map({True: '🔔', False: ''})
+    
+    state_columns = st.columns(len(BOARD_STATES))
+    for state_column, state in zip(state_columns, BOARD_STATES):
+        state_rows = board_df[board_df['Estado'] == state]
+        with state_column:
+            st.metric(state, len(state_rows))
+            if not state_rows.empty:
+                st.dataframe(
+                    state_rows[['Nuevo', 'Hora', 'Proveedor', 'Orden_de_compra', 'Llegada', 'Fin']],
+                    hide_index=True,
+                    use_container_width=True
+                )
 
 # ─────────────────────────────────────────────────────────────
-# 4. Dashboard Helper Functions - UNCHANGED
+# 2. Post-save Notifications
 # ─────────────────────────────────────────────────────────────
-def get_current_week():
-    """Get current week number"""
-    return get_bolivia_now().isocalendar()[1]
-
-
-
-
-def get_completed_weeks_data(gestion_df, weeks_back):
-    """Get data for completed weeks only"""
-    if gestion_df.empty:
-        return pd.DataFrame()
-    
-    # Get current datetime and calculate cutoff date
-    current_date = get_bolivia_now()
-    # Go back to start of current week (Monday)
-    current_week_start = current_date - timedelta(days=current_date.weekday())
-    # Calculate cutoff: start of current week minus weeks_back
-    cutoff_date = current_week_start - timedelta(weeks=weeks_back)
-    
-    # Filter records that have completion times and are within date range
-    filtered_df = gestion_df[
-        (gestion_df['Tiempo_total'].notna()) &  # Only completed records
-        (gestion_df['Hora_llegada'].notna())
-    ].copy()
-    
-    # Parse arrival dates and filter by date range
-    def parse_arrival_date(datetime_str):
-        """Parse arrival datetime and return date"""
-        dt = parse_datetime_flexible(datetime_str)
-        return dt.date() if dt else None
-    
-    filtered_df['arrival_date'] = filtered_df['Hora_llegada'].apply(parse_arrival_date)
-    
-    # Filter by date range: from cutoff_date up to (but not including) current week
-    filtered_df = filtered_df[
-        (filtered_df['arrival_date'].notna()) &
-        (filtered_df['arrival_date'] >= cutoff_date.date()) &
-        (filtered_df['arrival_date'] < current_week_start.date())
-    ]
-    
-    # Remove temporary column
-    filtered_df = filtered_df.drop('arrival_date', axis=1)
-    
-    return filtered_df
-
-
-
-
-
-
-
-
-
-def aggregate_by_week(df, provider_filter=None):
-    """Aggregate data by week"""
-    if df.empty:
-        return pd.DataFrame()
-    
-    # Filter by provider if specified
-    if provider_filter and provider_filter != "Todos":
-        df = df[df['Proveedor'] == provider_filter]
-    
-    if df.empty:
-        return pd.DataFrame()
-    
-    # Convert numeric columns
-    for col in ['Tiempo_espera', 'Tiempo_atencion', 'Tiempo_total', 'Tiempo_retraso']:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    # Parse arrival dates and create week identifiers
-    def get_week_label(datetime_str):
-        """Get week label from datetime string (YYYY-WW format)"""
-        dt = parse_datetime_flexible(datetime_str)
-        if dt:
-            year, week, _ = dt.isocalendar()
-            return f"{year}-W{week:02d}"
-        return None
-    
-    df = df.copy()
-    df['week_label'] = df['Hora_llegada'].apply(get_week_label)
-    
-    # Filter out rows without valid week labels
-    df = df[df['week_label'].notna()]
-    
-    if df.empty:
-        return pd.DataFrame()
-    
-    # Aggregate by week
-    weekly_data = df.groupby('week_label').agg({
-        'Tiempo_espera': 'mean',
-        'Tiempo_atencion': 'mean', 
-        'Tiempo_total': 'mean',
-        'Tiempo_retraso': 'mean'
-    }).round(1).reset_index()
-    
-    # Sort by week label to ensure proper chronological order
-    weekly_data = weekly_data.sort_values('week_label')
-    
-    return weekly_data
-    
-
-def aggregate_by_hour_from_filtered(filtered_df, provider_filter=None):
-    """Aggregate data by reservation hour from already filtered data"""
-    if filtered_df.empty:
-        return pd.DataFrame()
-    
-    # Filter by provider if specified
-    if provider_filter and provider_filter != "Todos":
-        filtered_df = filtered_df[filtered_df['Proveedor'] == provider_filter]
-    
-    if filtered_df.empty:
-        return pd.DataFrame()
-    
-    # Convert numeric columns
-    for col in ['Tiempo_espera', 'Tiempo_atencion', 'Tiempo_total', 'Tiempo_retraso']:
-        filtered_df[col] = pd.to_numeric(filtered_df[col], errors='coerce')
-    
-    # Filter out records without reservation hour
-    filtered_df = filtered_df[filtered_df['hora_de_reserva'].notna()]
-    
-    if filtered_df.empty:
-        return pd.DataFrame()
-    
-    # Aggregate by hour
-    hourly_data = filtered_df.groupby('hora_de_reserva').agg({
-        'Tiempo_espera': 'mean',
-        'Tiempo_atencion': 'mean',
-        'Tiempo_total': 'mean', 
-        'Tiempo_retraso': 'mean'
-    }).round(1).reset_index()
-    
-    return hourly_data
-
-
-
-def create_weekly_times_chart(weekly_data):
-    """Create chart for weekly time metrics"""
-    if weekly_data.empty:
-        return None
-    
-    fig = go.Figure()
-    
-    fig.add_trace(go.Scatter(
-        x=weekly_data['week_label'],
-        y=weekly_data['Tiempo_espera'],
-        mode='lines+markers',
-        name='Tiempo de Espera',
-        line=dict(color='#FF6B6B')
-    ))
-    
-    fig.add_trace(go.Scatter(
-        x=weekly_data['week_label'],
-        y=weekly_data['Tiempo_atencion'],
-        mode='lines+markers', 
-        name='Tiempo de Atención',
-        line=dict(color='#4ECDC4')
-    ))
-    
-    fig.add_trace(go.Scatter(
-        x=weekly_data['week_label'],
-        y=weekly_data['Tiempo_total'],
-        mode='lines+markers',
-        name='Tiempo Total', 
-        line=dict(color='#45B7D1')
-    ))
-    
-    fig.update_layout(
-        title='Tiempos Promedio por Semana',
-        xaxis_title='Semana (Año-Semana)',
-        yaxis_title='Tiempo (minutos)',
-        hovermode='x unified'
-    )
-    
-    return fig
-
-
-
-
-
-def create_weekly_delay_chart(weekly_data):
-    """Create chart for weekly delay metrics"""
-    if weekly_data.empty:
-        return None
-    
-    fig = go.Figure()
-    
-    fig.add_trace(go.Scatter(
-        x=weekly_data['week_label'],
-        y=weekly_data['Tiempo_retraso'],
-        mode='lines+markers',
-        name='Tiempo de Retraso',
-        line=dict(color='#E74C3C')
-    ))
-    
-    # Add zero line
-    fig.add_hline(y=0, line_dash="dash", line_color="gray", opacity=0.5)
-    
-    fig.update_layout(
-        title='Tiempo de Retraso Promedio por Semana',
-        xaxis_title='Semana (Año-Semana)',
-        yaxis_title='Tiempo (minutos)',
-        hovermode='x unified'
-    )
-    
-    return fig
-
-def create_hourly_times_chart(hourly_data):
-    """Create chart for hourly time metrics"""
-    if hourly_data.empty:
-        return None
-    
-    fig = go.Figure()
-    
-    fig.add_trace(go.Bar(
-        x=hourly_data['hora_de_reserva'],
-        y=hourly_data['Tiempo_espera'],
-        name='Tiempo de Espera',
-        marker_color='#FF6B6B'
-    ))
-    
-    fig.add_trace(go.Bar(
-        x=hourly_data['hora_de_reserva'],
-        y=hourly_data['Tiempo_atencion'],
-        name='Tiempo de Atención',
-        marker_color='#4ECDC4'
-    ))
-    
-    fig.add_trace(go.Bar(
-        x=hourly_data['hora_de_reserva'],
-        y=hourly_data['Tiempo_total'],
-        name='Tiempo Total',
-        marker_color='#45B7D1'
-    ))
-    
-    fig.update_layout(
-        title='Tiempos Promedio por Hora de Reserva',
-        xaxis_title='Hora de Reserva',
-        yaxis_title='Tiempo (minutos)',
-        barmode='group'
-    )
+NOTIFICATION_SECONDS = 10      # How long a confirmation stays on screen
+REJECTION_SECONDS = 60         # How long a save rejected by Google Sheets stays on screen
+WRITE_STATUS_POLL_SECONDS = 5  # How often pending saves are checked for a rejection
+
+def queue_notification(kind, title, lines=(), seconds=NOTIFICATION_SECONDS):
+    """Keep a confirmation in session state so it survives the rerun after a save"""
+    st.session_state.setdefault('notifications', []).append({
+        'kind': kind,  # success, warning, info or error
+        'title': title,
+        'lines': list(lines),
+        'expires_at': time.time() + seconds
+    })
+
+def track_write(write_id, orden_compra, label):
+    """Follow a logged save until the background replayer applies or rejects it"""
+    st.session_state.setdefault('tracked_writes', {})[write_id] = {'orden_compra': orden_compra, 'label': label}
+
+def check_tracked_writes():
+    """Queue a notification for each followed save that was rejected, stop following applied ones"""
+    tracked = st.session_state.get('tracked_writes', {})
+    if not tracked:
+        return
     
-    return fig
+    for write_id, (status, reason) in get_write_results(list(tracked)).items():
+        if status == 'pending':
+            continue
+        write = tracked.pop(write_id)
+        if status == 'failed':
+            logger.warning(f"{write['label']} for order {write['orden_compra']} was rejected: {reason}")
+            queue_notification(
+                'error',
+                f"❌ {write['label']} no se guardó en Google Sheets",
+                [f"Orden de Compra: {write['orden_compra']}", reason or "Error desconocido"],
+                seconds=REJECTION_SECONDS
+            )
 
-def create_hourly_delay_chart(hourly_data):
-    """Create chart for hourly delay metrics"""
-    if hourly_data.empty:
-        return None
-    
-    fig = go.Figure()
-    
-    # Color bars based on positive/negative delay
-    colors = ['#E74C3C' if x >= 0 else '#27AE60' for x in hourly_data['Tiempo_retraso']]
-    
-    fig.add_trace(go.Bar(
-        x=hourly_data['hora_de_reserva'],
-        y=hourly_data['Tiempo_retraso'],
-        name='Tiempo de Retraso',
-        marker_color=colors
-    ))
-    
-    # Add zero line
-    fig.add_hline(y=0, line_dash="dash", line_color="gray", opacity=0.5)
-    
-    fig.update_layout(
-        title='Tiempo de Retraso Promedio por Hora de Reserva',
-        xaxis_title='Hora de Reserva',
-        yaxis_title='Tiempo (minutos)'
-    )
-    
-    return fig
+@st.fragment(run_every=WRITE_STATUS_POLL_SECONDS)
+def watch_tracked_writes():
+    """While saves are pending, rerun the app as soon as one is rejected so the operator sees it"""
+    tracked = st.session_state.get('tracked_writes', {})
+    if tracked and any(status == 'failed' for status, _ in get_write_results(list(tracked)).values()):
+        st.rerun(scope="app")
+
+def show_notifications():
+    """Render pending confirmations; each one is dismissed by the browser when its time runs out"""
+    check_tracked_writes()
+    now = time.time()
+    notifications = [n for n in st.session_state.get('notifications', []) if n['expires_at'] > now]
+    st.session_state.notifications = notifications
+    
+    for notification in notifications:
+        body = '<br>'.join([f"<strong>{notification['title']}</strong>"] + notification['lines'])
+        remaining = notification['expires_at'] - now
+        st.markdown(
+            f'<div class="save-notification save-notification-{notification["kind"]}" '
+            f'style="animation-delay: {remaining:.1f}s">{body}</div>',
+            unsafe_allow_html=True
+        )
 
 # ─────────────────────────────────────────────────────────────
-# 5. Management Functions - WITH LOGGING
+# 3. Main App - WITH LOGGING
 # ─────────────────────────────────────────────────────────────
-def get_existing_arrivals(gestion_df):
-    """Get orders that already have arrival registered today but not yet completed"""
-    today = get_bolivia_today().strftime('%Y-%m-%d')
-    if gestion_df.empty:
-        logger.info("No gestion data available for existing arrivals check")
-        return []
-
-    if 'Orden_de_compra' in gestion_df.columns:
-        gestion_df['Orden_de_compra'] = gestion_df['Orden_de_compra'].astype(str)
-    
-    # Filter records with arrival time from today
-    today_arrivals = gestion_df[
-        gestion_df['Hora_llegada'].astype(str).str.contains(today, na=False)
-    ]
-    
-    logger.info(f"Found {len(today_arrivals)} arrivals registered for today ({today})")
-    
-    # Only return orders that don't have service times completed
-    pending_service = today_arrivals[
-        (today_arrivals['Hora_inicio_atencion'].isna()) | 
-        (today_arrivals['Hora_inicio_atencion'].astype(str).isin(['', 'nan', 'None'])) |
-        (today_arrivals['Hora_fin_atencion'].isna()) |
-        (today_arrivals['Hora_fin_atencion'].astype(str).isin(['', 'nan', 'None']))
-    ]
-    
-    pending_orders = sorted(pending_service['Orden_de_compra'].astype(str).tolist())
-    logger.info(f"Found {len(pending_orders)} orders pending service: {pending_orders}")
-    
-    return pending_orders
-
-def get_completed_orders(gestion_df):
-    """Get orders that have both arrival and service registered today"""
-    today = get_bolivia_today().strftime('%Y-%m-%d')
-    if gestion_df.empty:
-        logger.info("No gestion data available for completed orders check")
-        return []
-    
-    # Filter records with arrival time from today
-    today_records = gestion_df[
-        gestion_df['Hora_llegada'].astype(str).str.contains(today, na=False)
-    ]
-    
-    # Return orders that have both arrival and service times
-    completed = today_records[
-        (today_records['Hora_inicio_atencion'].notna()) & 
-        (~today_records['Hora_inicio_atencion'].astype(str).isin(['', 'nan', 'None'])) &
-        (today_records['Hora_fin_atencion'].notna()) &
-        (~today_records['Hora_fin_atencion'].astype(str).isin(['', 'nan', 'None']))
-    ]
-    
-    completed_orders = completed['Orden_de_compra'].astype(str).tolist()
-    logger.info(f"Found {len(completed_orders)} completed orders for today: {completed_orders}")
-    
-    return completed_orders
-
-def get_pending_arrivals(today_reservations, gestion_df):
-    """Get orders that haven't registered arrival yet"""
-    existing_arrivals = get_existing_arrivals(gestion_df)
-    completed_orders = get_completed_orders(gestion_df)
-    
-    # Combine both lists to exclude from dropdown
-    processed_orders = existing_arrivals + completed_orders
-    logger.info(f"Total processed orders (existing + completed): {len(processed_orders)}")
-    
-    # Return orders that haven't been processed at all
-    pending = today_reservations[
-        ~today_reservations['Orden_de_compra'].isin(processed_orders)
-    ]
-    
-    pending_orders = sorted(pending['Orden_de_compra'].astype(str).tolist())
-    logger.info(f"Found {len(pending_orders)} orders pending arrival: {pending_orders}")
-    
-    return pending_orders
-
-def get_arrival_record(gestion_df, orden_compra):
-    """Get existing arrival record for an order"""
-    logger.info(f"Searching for arrival record for order: {orden_compra}")
-    
-    if gestion_df.empty:
-        logger.warning("No gestion data available for arrival record search")
-        return None
-    
-    # Ensure both sides are strings and strip whitespace
-    orden_compra_clean = str(orden_compra).strip()
-    
-    # Create a mask for exact string matching
-    mask = gestion_df['Orden_de_compra'].astype(str).str.strip() == orden_compra_clean
-    
-    # Filter the dataframe
-    matching_records = gestion_df[mask]
-    
-    if matching_records.empty:
-        # Debug: show what we're looking for vs what exists
-        available_orders = gestion_df['Orden_de_compra'].astype(str).str.strip().tolist()
-        logger.error(f"No arrival record found for order '{orden_compra_clean}'")
-        logger.error(f"Available orders in gestion: {available_orders[:10]}...")  # Log first 10 to avoid spam
-        st.error(f"No se encontró orden '{orden_compra_clean}' en registros de gestión.")
-        st.error(f"Órdenes disponibles: {available_orders}")
-        return None
-    
-    logger.info(f"Found arrival record for order: {orden_compra_clean}")
-    return matching_records.iloc[0]
-
-def get_arrival_record_silent(gestion_df, orden_compra):
-    """Get existing arrival record for an order - silent version without error messages"""
-    if gestion_df.empty:
-        return None
-    
-    # Ensure both sides are strings and strip whitespace
-    orden_compra_clean = str(orden_compra).strip()
-    
-    # Create a mask for exact string matching
-    mask = gestion_df['Orden_de_compra'].astype(str).str.strip() == orden_compra_clean
-    
-    # Filter the dataframe
-    matching_records = gestion_df[mask]
-    
-    if matching_records.empty:
-        logger.info(f"No arrival record found for order '{orden_compra_clean}' (silent search)")
-        return None
-    
-    logger.info(f"Found arrival record for order '{orden_compra_clean}' (silent search)")
-    return matching_records.iloc[0]
-
-def save_arrival_to_sheets(arrival_data):
-    """Save arrival data to Google Sheets - WITH LOGGING"""
-    orden_compra = arrival_data.get('Orden_de_compra', 'UNKNOWN')
-    logger.info(f"Starting arrival save operation for order: {orden_compra}")
-    
-    try:
-        credentials_df, reservas_df, gestion_df = download_sheets_to_memory()
-        
-        if reservas_df is None:
-            logger.error("Failed to load data for arrival save operation")
-            return False
-        
-        # Check if record already exists
-        existing_record = get_arrival_record_silent(gestion_df, arrival_data['Orden_de_compra'])
-        
-        if existing_record is not None:
-            logger.info(f"Existing record found for order {orden_compra}, updating instead of creating new")
-            # Update existing record
-            update_data = {
-                'Hora_llegada': arrival_data['Hora_llegada'],
-                'numero_de_semana': arrival_data['numero_de_semana'],
-                'hora_de_reserva': arrival_data['hora_de_reserva'],
-                'Tiempo_retraso': arrival_data['Tiempo_retraso']
-            }
-            return update_sheets_record(arrival_data['Orden_de_compra'], update_data)
-        else:
-            logger.info(f"No existing record found for order {orden_compra}, creating new record")
-            # Add new record
-            return save_gestion_to_sheets(arrival_data)
-        
-    except Exception as e:
-        logger.error(f"Error in arrival save operation for order {orden_compra}: {str(e)}")
-        st.error(f"Error guardando llegada: {str(e)}")
-        return False
-
-def update_service_times(orden_compra, service_data):
-    """Update service times for existing arrival record - WITH LOGGING"""
-    logger.info(f"Starting service time update for order: {orden_compra}")
-    logger.info(f"Service data fields: {list(service_data.keys())}")
-    
-    try:
-        credentials_df, reservas_df, gestion_df = download_sheets_to_memory()
-        
-        if gestion_df.empty:
-            logger.error("No data available in gestion sheet for service update")
-            st.error("No hay datos en la hoja de gestión.")
-            return False
-        
-        # Clean the orden_compra for matching
-        orden_compra_clean = str(orden_compra).strip()
-        
-        # Find the record to update with robust string matching
-        mask = gestion_df['Orden_de_compra'].astype(str).str.strip() == orden_compra_clean
-        matching_records = gestion_df[mask]
-        
-        if matching_records.empty:
-            logger.error(f"No matching record found for service update of order: {orden_compra_clean}")
-            available_orders = gestion_df['Orden_de_compra'].astype(str).str.strip().tolist()
-            logger.error(f"Available orders: {available_orders[:10]}...")  # Log first 10
-            st.error(f"No se encontró registro de llegada para la orden: '{orden_compra_clean}'")
-            st.error(f"Órdenes disponibles: {available_orders}")
-            return False
-        
-        logger.info(f"Found matching record for service update of order: {orden_compra_clean}")
-        
-        # Update service times using Google Sheets update function
-        result = update_sheets_record(orden_compra_clean, service_data)
-        
-        if result:
-            logger.info(f"Successfully updated service times for order: {orden_compra_clean}")
-        else:
-            logger.error(f"Failed to update service times for order: {orden_compra_clean}")
-        
-        return result
-        
-    except Exception as e:
-        logger.error(f"Error updating service times for order {orden_compra}: {str(e)}")
-        st.error(f"Error actualizando tiempos de atención: {str(e)}")
-        return False
+VIEW_ARRIVAL = "🚚 REGISTRO DE LLEGADA"
+VIEW_SERVICE = "⚙️ REGISTRO DE ATENCIÓN"
+VIEW_DASHBOARD = "📊 DASHBOARD"
+VIEW_LIVE_BOARD = "📺 TABLERO EN VIVO"
 
-# ─────────────────────────────────────────────────────────────
-# 6. Main App - WITH LOGGING
-# ─────────────────────────────────────────────────────────────
 def main():
     logger.info("=== Provider Control App Starting ===")
     
+    # Wall displays open the app with ?modo=tablero and only get the read-only board
+    if st.query_params.get("modo") == "tablero":
+        logger.info("Starting in read-only live board mode")
+        st.title("📺 Tablero de Andenes")
+        render_live_board()
+        return
+    
     st.title("🚚 Control de Proveedores")
     
     # Manual refresh button - rightmost position
@@ -1105,34 +347,60 @@ def main():
     with col2:
         if st.button("🔄 Actualizar Datos", help="Descargar datos frescos"):
             logger.info("Manual data refresh requested by user")
-            download_sheets_to_memory.clear()
-            st.success("✅ Datos actualizados!")
+            refresh_data_store()
+            queue_notification('success', "✅ Datos actualizados!")
             st.rerun()
     
     st.markdown("---")
     
-    # Load data
+    # Load only what the selected view declares in VIEW_DATA_SPECS
+    data_view = 'dashboard' if st.session_state.get("active_view") == VIEW_DASHBOARD else 'registro'
     with st.spinner("Cargando datos..."):
-        logger.info("Loading data from Google Sheets")
-        credentials_df, reservas_df, gestion_df = download_sheets_to_memory()
+        logger.info(f"Loading data from Google Sheets for view: {data_view}")
+        reservas_df, gestion_df = load_view_data(data_view)
     
     if reservas_df is None:
         logger.error("Failed to load data, showing error to user")
         st.error("No se pudo cargar los datos. Verifique la conexión.")
         if st.button("🔄 Reintentar Conexión"):
             logger.info("User requested connection retry")
-            download_sheets_to_memory.clear()
+            invalidate_data_store()
             st.rerun()
         return
     
-    logger.info(f"Data loaded successfully. Shapes - Credentials: {credentials_df.shape}, Reservas: {reservas_df.shape}, Gestion: {gestion_df.shape}")
-    
-    # Create tabs with enhanced styling
-    tab1, tab2, tab3 = st.tabs(["🚚 REGISTRO DE LLEGADA", "⚙️ REGISTRO DE ATENCIÓN", "📊 DASHBOARD"])
+    logger.info(f"Data loaded successfully. Shapes - Reservas: {reservas_df.shape}, Gestion: {gestion_df.shape}")
+    
+    # Create tab selector with enhanced styling - only the selected view is executed
+    # (the keyed container scopes the tab CSS to this radio)
+    with st.container(key="view_selector"):
+        active_view = st.radio(
+            "Vista:",
+            options=[VIEW_ARRIVAL, VIEW_SERVICE, VIEW_DASHBOARD, VIEW_LIVE_BOARD],
+            horizontal=True,
+            label_visibility="collapsed",
+            key="active_view"
+        )
     
     # Visual separator
     st.markdown('<div class="tab-separator"></div>', unsafe_allow_html=True)
     
+    # Confirmations queued by the previous run's save, and saves rejected since
+    show_notifications()
+    if st.session_state.get('tracked_writes'):
+        watch_tracked_writes()
+    
+    # Saves are acknowledged once logged locally; show what has not reached Google Sheets yet
+    write_log_status = get_write_log_status()
+    if write_log_status['pending']:
+        st.caption(f"⏳ {write_log_status['pending']} registro(s) pendiente(s) de sincronizar con Google Sheets")
+    if write_log_status['failed']:
+        st.error(f"⚠️ {write_log_status['failed']} registro(s) no se pudieron guardar en Google Sheets. Revise {WRITE_LOG_PATH}.failed")
+        if st.button("Marcar como revisados", key="acknowledge_failed_writes"):
+            archive_path = acknowledge_failed_writes()
+            logger.info(f"User acknowledged failed writes, archived to {archive_path}")
+            queue_notification('info', "Registros no guardados archivados", [f"Archivo: {archive_path}"])
+            st.rerun()
+    
     # Get today's reservations
     today_reservations = get_today_reservations(reservas_df)
     
@@ -1150,7 +418,7 @@ def main():
         if pending_arrivals_orders:
             pending_reservations = today_reservations[
                 today_reservations['Orden_de_compra'].isin(pending_arrivals_orders)
-            ].copy()
+            ]
             
             # Extract first time from Hora column for proper sorting
             def extract_first_time(hora_str):
@@ -1168,7 +436,6 @@ def main():
                         first_time = ':'.join(first_time.split(':')[:2])
                     
                     # Convert to time object for proper sorting
-                    from datetime import datetime
                     return datetime.strptime(first_time, '%H:%M').time()
                 except:
                     # Fallback: return a default time if parsing fails
@@ -1203,7 +470,7 @@ def main():
             # Get arrival records with hora_llegada for sorting
             existing_records = gestion_df[
                 gestion_df['Orden_de_compra'].astype(str).str.strip().isin([str(x).strip() for x in existing_arrivals_orders])
-            ].copy()
+            ]
             
             # Convert Hora_llegada to datetime for proper sorting
             def convert_to_datetime(datetime_str):
@@ -1212,7 +479,6 @@ def main():
                     return parse_datetime_flexible(datetime_str)
                 except:
                     # Fallback: return a very late time if parsing fails
-                    from datetime import datetime
                     return datetime(2099, 12, 31, 23, 59, 59)
             
             existing_records['sort_datetime'] = existing_records['Hora_llegada'].apply(convert_to_datetime)
@@ -1249,7 +515,7 @@ def main():
     # ─────────────────────────────────────────────────────────────
     # TAB 1: Arrival Registration - WITH LOGGING
     # ─────────────────────────────────────────────────────────────
-    with tab1:
+    if active_view == VIEW_ARRIVAL:
         logger.info("User accessed Arrival Registration tab")
         st.markdown("*Registre la hora de llegada del proveedor*")
         
@@ -1398,87 +664,31 @@ def main():
                         arrival_datetime = combine_date_time(get_bolivia_today(), arrival_time)
                         logger.info(f"Processing arrival for order {selected_order_tab1} at {arrival_datetime}")
                         
-                        # Calculate delay and extract reservation hour - UNCHANGED LOGIC
-                        tiempo_retraso = 0  # Default to 0 if can't calculate
-                        hora_de_reserva = None
-                        
-                        # Get the actual time value from reservations
-                        hora_str = str(order_details['Hora']).strip()
-                        
-                        # Try parsing as combined slots first, then single time, then range
-                        booked_start_time = parse_combined_time_slots(hora_str)
-                        if not booked_start_time:
-                            booked_start_time = parse_single_time(hora_str)
-                        if not booked_start_time:
-                            booked_start_time = parse_time_range(hora_str)
-                        
-                        if booked_start_time:
-                            booked_datetime = combine_date_time(get_bolivia_today(), booked_start_time)
-                            calculated_delay = calculate_time_difference(booked_datetime, arrival_datetime)
-                            if calculated_delay is not None:
-                                tiempo_retraso = calculated_delay
-                            # Extract hour for hora_de_reserva (e.g., 10 for "10:00:00")
-                            hora_de_reserva = booked_start_time.hour
-                            logger.info(f"Delay calculation successful: {tiempo_retraso} minutes, reservation hour: {hora_de_reserva}")
-                        else:
-                            # Fallback: manual calculation for formats like "10:00:00"
-                            try:
-                                if ':' in hora_str:
-                                    time_parts = hora_str.split(':')
-                                    booked_hour = int(time_parts[0])
-                                    booked_minute = int(time_parts[1]) if len(time_parts) > 1 else 0
-                                    booked_second = int(time_parts[2]) if len(time_parts) > 2 else 0
-                                    
-                                    # Create booked datetime manually
-                                    booked_datetime = datetime.combine(
-                                        get_bolivia_today(), 
-                                        dt_time(booked_hour, booked_minute, booked_second)
-                                    )
-                                    
-                                    # Calculate delay manually
-                                    tiempo_retraso = calculate_time_difference(booked_datetime, arrival_datetime)
-                                    hora_de_reserva = booked_hour
-                                    logger.info(f"Manual delay calculation successful: {tiempo_retraso} minutes, reservation hour: {hora_de_reserva}")
-                            except Exception as e:
-                                # If all else fails, set to defaults
-                                hora_de_reserva = None
-                                tiempo_retraso = 0
-                                logger.warning(f"Delay calculation failed, using defaults: {str(e)}")
-                        
-                        # Prepare arrival data - MAINTAIN EXACT DATE FORMAT
-                        arrival_data = {
-                            'Orden_de_compra': selected_order_tab1,
-                            'Proveedor': order_details['Proveedor'],
-                            'Numero_de_bultos': order_details['Numero_de_bultos'],
-                            'Hora_llegada': format_datetime_no_zero_padding(arrival_datetime),  # EXACT FORMAT
-                            'Hora_inicio_atencion': '',
-                            'Hora_fin_atencion': '',
-                            'Tiempo_espera': '',
-                            'Tiempo_atencion': '',
-                            'Tiempo_total': '',
-                            'Tiempo_retraso': tiempo_retraso,
-                            'numero_de_semana': arrival_datetime.isocalendar()[1],
-                            'hora_de_reserva': hora_de_reserva
-                        }
+                        # Calculate delay and extract reservation hour, prepare arrival data
+                        arrival_data = build_arrival_data(order_details, arrival_datetime)
+                        tiempo_retraso = arrival_data['Tiempo_retraso']
                         
                         logger.info(f"Prepared arrival data: {arrival_data}")
                         
                         # Save to Google Sheets
                         with st.spinner("Guardando llegada..."):
                             logger.info(f"Attempting to save arrival data for order: {selected_order_tab1}")
-                            if save_arrival_to_sheets(arrival_data):
+                            base_record = get_arrival_record_silent(gestion_df, selected_order_tab1)
+                            write_id = save_arrival_to_sheets(arrival_data, base_record)
+                            if write_id:
                                 logger.info(f"Successfully saved arrival for order: {selected_order_tab1}")
-                                st.success("✅ Llegada registrada exitosamente!")
+                                track_write(write_id, selected_order_tab1, "La llegada")
                                 if tiempo_retraso > 0:
-                                    st.warning(f"⏰ Retraso: {tiempo_retraso} minutos")
+                                    kind, delay_line = 'warning', f"⏰ Retraso: {tiempo_retraso} minutos"
                                 elif tiempo_retraso < 0:
-                                    st.info(f"⚡ Adelanto: {abs(tiempo_retraso)} minutos")
+                                    kind, delay_line = 'info', f"⚡ Adelanto: {abs(tiempo_retraso)} minutos"
                                 else:
-                                    st.success("🎯 Llegada puntual")
-                                
-                                # Wait 5 seconds before refreshing
-                                with st.spinner("Actualizando datos..."):
-                                    time.sleep(5)
+                                    kind, delay_line = 'success', "🎯 Llegada puntual"
+                                queue_notification(
+                                    kind,
+                                    "✅ Llegada registrada exitosamente!",
+                                    [f"Orden de Compra: {selected_order_tab1}", delay_line]
+                                )
                                 st.rerun()
                             else:
                                 logger.error(f"Failed to save arrival for order: {selected_order_tab1}")
@@ -1490,7 +700,7 @@ def main():
     # ─────────────────────────────────────────────────────────────
     # TAB 2: Service Registration - WITH LOGGING
     # ─────────────────────────────────────────────────────────────
-    with tab2:
+    if active_view == VIEW_SERVICE:
         logger.info("User accessed Service Registration tab")
         st.markdown("*Registre los tiempos de inicio y fin de atención*")
         
@@ -1520,6 +730,8 @@ def main():
             
             if existing_arrivals_display and selected_order_tab2:
                 logger.info(f"User selected order for service: {selected_order_tab2}")
+                # Per-bulto service model, fitted once per data version
+                service_model = get_service_time_model(gestion_df, get_shared_data_store().version)
                 # Get arrival record
                 arrival_record = get_arrival_record(gestion_df, selected_order_tab2)
                 
@@ -1552,6 +764,8 @@ def main():
                             st.metric("Tiempo de Atención", f"{arrival_record['Tiempo_atencion']} min")
                         with col2:
                             st.metric("Tiempo Total", f"{arrival_record['Tiempo_total']} min")
+                        if service_model.is_slow(arrival_record['Proveedor'], arrival_record['Numero_de_bultos'], arrival_record['Tiempo_atencion']):
+                            st.warning("🐢 Atención inusualmente lenta para el número de bultos")
                     else:
                         logger.info(f"Service not yet registered for order: {selected_order_tab2}")
                         st.warning("⏳ Pendiente de registrar atención")
@@ -1567,6 +781,16 @@ def main():
                         
                         logger.info(f"Setting default service times based on arrival: {default_hour:02d}:{default_minute:02d}")
                         
+                        # Default end time: start plus the service time expected for this provider and bultos
+                        expected_atencion = service_model.predict(arrival_record['Proveedor'], arrival_record['Numero_de_bultos'])
+                        default_end = combine_date_time(get_bolivia_today(), dt_time(default_hour, default_minute))
+                        if expected_atencion is not None:
+                            default_end = min(
+                                default_end + timedelta(minutes=round(expected_atencion)),
+                                combine_date_time(default_end.date(), dt_time(18, 59))
+                            )
+                            logger.info(f"Expected service time for order {selected_order_tab2}: {expected_atencion:.1f} min")
+                        
                         with col1:
                             st.write("**Hora de Inicio de Atención:**")
                             
@@ -1606,7 +830,7 @@ def main():
                                 service_hours = list(range(9, 19))  # 09, 10, 11, 12, 13, 14, 15, 16, 17, 18
                                 # Find the index for default hour
                                 try:
-                                    end_hour_index = service_hours.index(default_hour)
+                                    end_hour_index = service_hours.index(default_end.hour)
                                 except ValueError:
                                     end_hour_index = 0  # Default to first option if not in range
                                 
@@ -1622,12 +846,15 @@ def main():
                                 end_minute = st.selectbox(
                                     "Minutos:",
                                     options=list(range(0, 60, 1)),  # 1-minute intervals
-                                    index=default_minute,  # Direct minute value
+                                    index=default_end.minute,  # Direct minute value
                                     format_func=lambda x: f"{x:02d}",
                                     key=f"end_minute_tab2_{selected_display_tab2}"
                                 )
                             
                             end_time = dt_time(end_hour, end_minute)
+                            
+                            if expected_atencion is not None:
+                                st.caption(f"Atención estimada: {round(expected_atencion)} min para {arrival_record['Numero_de_bultos']} bultos")
                         
                         # Save service times button - only show when not registered
                         if st.button("Guardar Atención", type="primary", key="save_service"):
@@ -1643,37 +870,28 @@ def main():
                                 arrival_datetime = parse_datetime_flexible(str(arrival_record['Hora_llegada']))
                                 
                                 # Validate times - UNCHANGED LOGIC
-                                if hora_inicio >= hora_fin:
-                                    logger.warning(f"Invalid service times for order {selected_order_tab2}: start >= end")
-                                    st.error("La hora de fin debe ser posterior a la hora de inicio.")
-                                elif hora_inicio < arrival_datetime:
-                                    logger.warning(f"Invalid service times for order {selected_order_tab2}: start before arrival")
-                                    st.error("La hora de inicio de atención no puede ser anterior a la hora de llegada.")
+                                validation_error = validate_service_times(arrival_datetime, hora_inicio, hora_fin)
+                                if validation_error:
+                                    logger.warning(f"Invalid service times for order {selected_order_tab2}: {validation_error}")
+                                    st.error(validation_error)
                                 else:
-                                    # Calculate times - UNCHANGED LOGIC
-                                    tiempo_espera = calculate_time_difference(arrival_datetime, hora_inicio)
-                                    tiempo_atencion = calculate_time_difference(hora_inicio, hora_fin)
-                                    tiempo_total = calculate_time_difference(arrival_datetime, hora_fin)
+                                    # Calculate times and prepare service data - UNCHANGED LOGIC
+                                    service_data = build_service_data(arrival_datetime, hora_inicio, hora_fin)
+                                    tiempo_espera = service_data['Tiempo_espera']
+                                    tiempo_atencion = service_data['Tiempo_atencion']
+                                    tiempo_total = service_data['Tiempo_total']
                                     
                                     logger.info(f"Calculated service metrics for order {selected_order_tab2} - Espera: {tiempo_espera}, Atencion: {tiempo_atencion}, Total: {tiempo_total}")
                                     
-                                    # Prepare service data - MAINTAIN EXACT DATE FORMAT
-                                    service_data = {
-                                        'Hora_inicio_atencion': format_datetime_no_zero_padding(hora_inicio),
-                                        'Hora_fin_atencion': format_datetime_no_zero_padding(hora_fin),
-                                        'Tiempo_espera': tiempo_espera,
-                                        'Tiempo_atencion': tiempo_atencion,
-                                        'Tiempo_total': tiempo_total
-                                    }
-                                    
                                     logger.info(f"Prepared service data: {service_data}")
                                     
                                     # Save to Google Sheets
                                     with st.spinner("Guardando atención..."):
                                         logger.info(f"Attempting to save service data for order: {selected_order_tab2}")
-                                        if update_service_times(selected_order_tab2, service_data):
+                                        write_id = update_service_times(selected_order_tab2, service_data, arrival_record)
+                                        if write_id:
                                             logger.info(f"Successfully saved service times for order: {selected_order_tab2}")
-                                            st.success("✅ Atención registrada exitosamente!")
+                                            track_write(write_id, selected_order_tab2, "La atención")
                                             
                                             # Calculate delay for summary - UNCHANGED LOGIC
                                             arrival_datetime = parse_datetime_flexible(str(arrival_record['Hora_llegada']))
@@ -1685,60 +903,25 @@ def main():
                                             
                                             tiempo_retraso_display = 0  # Default to 0 if can't calculate
                                             if not order_reserva.empty:
-                                                booked_time_range = str(order_reserva.iloc[0]['Hora'])
-                                                # Try parsing as combined slots first, then single time, then range
-                                                booked_start_time = parse_combined_time_slots(booked_time_range)
-                                                if not booked_start_time:
-                                                    booked_start_time = parse_single_time(booked_time_range)
-                                                if not booked_start_time:
-                                                    booked_start_time = parse_time_range(booked_time_range)                                                
-                                                
-                                                if booked_start_time:
-                                                    booked_datetime = combine_date_time(arrival_datetime.date(), booked_start_time)
-                                                    calculated_delay = calculate_time_difference(booked_datetime, arrival_datetime)
-                                                    if calculated_delay is not None:
-                                                        tiempo_retraso_display = calculated_delay
-                                                else:
-                                                    # Fallback: manual calculation for formats like "10:00:00"
-                                                    try:
-                                                        if ':' in booked_time_range:
-                                                            time_parts = booked_time_range.split(':')
-                                                            booked_hour = int(time_parts[0])
-                                                            booked_minute = int(time_parts[1]) if len(time_parts) > 1 else 0
-                                                            booked_second = int(time_parts[2]) if len(time_parts) > 2 else 0
-                                                            
-                                                            # Create booked datetime manually
-                                                            booked_datetime = datetime.combine(
-                                                                arrival_datetime.date(), 
-                                                                dt_time(booked_hour, booked_minute, booked_second)
-                                                            )
-                                                            
-                                                            # Calculate delay manually
-                                                            tiempo_retraso_display = calculate_time_difference(booked_datetime, arrival_datetime)
-                                                    except Exception:
-                                                        # Keep default value of 0
-                                                        pass
+                                                tiempo_retraso_display, _ = calculate_arrival_delay(order_reserva.iloc[0]['Hora'], arrival_datetime)
                                             
                                             logger.info(f"Display delay for order {selected_order_tab2}: {tiempo_retraso_display} minutes")
                                             
-                                            # Show summary
-                                            col1, col2 = st.columns(2)
-                                            with col1:
-                                                st.metric("Tiempo de Espera", f"{tiempo_espera} min")
-                                                st.metric("Tiempo de Atención", f"{tiempo_atencion} min")
-                                            with col2:
-                                                st.metric("Tiempo Total", f"{tiempo_total} min")
-                                                # Display calculated delay
-                                                if tiempo_retraso_display > 0:
-                                                    st.metric("Tiempo de Retraso", f"{tiempo_retraso_display} min")
-                                                elif tiempo_retraso_display < 0:
-                                                    st.metric("Tiempo de Adelanto", f"{abs(tiempo_retraso_display)} min")
-                                                else:
-                                                    st.metric("Tiempo de Retraso", f"{tiempo_retraso_display} min")
-                                            
-                                            # Wait 10 seconds before refreshing
-                                            with st.spinner("Actualizando datos..."):
-                                                time.sleep(10)
+                                            # Summary shown after the rerun
+                                            summary = [
+                                                f"Orden de Compra: {selected_order_tab2}",
+                                                f"Tiempo de Espera: {tiempo_espera} min",
+                                                f"Tiempo de Atención: {tiempo_atencion} min",
+                                                f"Tiempo Total: {tiempo_total} min",
+                                                f"Tiempo de Adelanto: {abs(tiempo_retraso_display)} min" if tiempo_retraso_display < 0
+                                                else f"Tiempo de Retraso: {tiempo_retraso_display} min"
+                                            ]
+                                            kind = 'success'
+                                            if service_model.is_slow(arrival_record['Proveedor'], arrival_record['Numero_de_bultos'], tiempo_atencion):
+                                                logger.info(f"Unusually slow service for order {selected_order_tab2}: {tiempo_atencion} min")
+                                                kind = 'warning'
+                                                summary.append("🐢 Atención inusualmente lenta para el número de bultos")
+                                            queue_notification(kind, "✅ Atención registrada exitosamente!", summary)
                                             st.rerun()
                                         else:
                                             logger.error(f"Failed to save service times for order: {selected_order_tab2}")
@@ -1756,156 +939,21 @@ def main():
     # ─────────────────────────────────────────────────────────────
     # TAB 3: Dashboard - WITH BASIC LOGGING
     # ─────────────────────────────────────────────────────────────
-    with tab3:
-        logger.info("User accessed Dashboard tab")
-        st.markdown("*Análisis y tendencias de rendimiento de proveedores*")
-        
-        # Check if we have data
-        if gestion_df.empty:
-            logger.info("No data available for dashboard")
-            st.warning("📊 No hay datos disponibles para mostrar gráficos.")
-            return
-        
-        # Filter controls
-        st.subheader("🔧 Controles de Filtrado")
+    if active_view == VIEW_DASHBOARD:
+        with st.expander("🔌 Estado de conexión con Google Sheets"):
+            st.json(get_sheets_connection_health())
         
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Provider filter
-            providers = ["Todos"] + sorted(gestion_df['Proveedor'].dropna().unique().tolist())
-            selected_provider = st.selectbox(
-                "Proveedor:",
-                options=providers,
-                key="dashboard_provider"
-            )
-        
-        with col2:
-            # Week range filter
-            week_options = {
-                "1 semana": 1,
-                "2 semanas": 2, 
-                "4 semanas": 4,
-                "12 semanas": 12,
-                "24 semanas": 24
-            }
-            selected_weeks_label = st.selectbox(
-                "Período (semanas completas):",
-                options=list(week_options.keys()),
-                key="dashboard_weeks"
-            )
-            selected_weeks = week_options[selected_weeks_label]
-        
-        logger.info(f"Dashboard filters - Provider: {selected_provider}, Weeks: {selected_weeks}")
-        
-        st.markdown("---")
-        
-        # Get filtered data
-        filtered_data = get_completed_weeks_data(gestion_df, selected_weeks)
-        
-        # Display number of entries being used for dashboard
-        stats_data_count = filtered_data.copy()
-        if selected_provider != "Todos":
-            stats_data_count = stats_data_count[stats_data_count['Proveedor'] == selected_provider]
-        st.caption(f"📊 Mostrando {len(stats_data_count)} registros para el análisis")
-        logger.info(f"Dashboard showing {len(stats_data_count)} records for analysis")
-
-        
-        if filtered_data.empty:
-            logger.info(f"No completed data available for last {selected_weeks} weeks")
-            st.warning(f"📊 No hay datos completos para las últimas {selected_weeks} semanas.")
-            return
-        
-        # Summary stats - MOVED TO BEGINNING
-        st.subheader("📊 Estadísticas del Período")
-        
-        # Filter by provider for stats
-        stats_data = filtered_data.copy()
-        if selected_provider != "Todos":
-            stats_data = stats_data[stats_data['Proveedor'] == selected_provider]
-        
-        if not stats_data.empty:
-            col1, col2, col3, col4 = st.columns(4)
-            
-            # Convert to numeric for calculations
-            for col in ['Tiempo_espera', 'Tiempo_atencion', 'Tiempo_total', 'Tiempo_retraso']:
-                stats_data[col] = pd.to_numeric(stats_data[col], errors='coerce')
-            
-            with col1:
-                avg_wait = stats_data['Tiempo_espera'].mean()
-                st.metric("Espera Promedio", f"{avg_wait:.1f} min")
-            
-            with col2:
-                avg_service = stats_data['Tiempo_atencion'].mean()
-                st.metric("Atención Promedio", f"{avg_service:.1f} min")
-            
-            with col3:
-                avg_total = stats_data['Tiempo_total'].mean()
-                st.metric("Total Promedio", f"{avg_total:.1f} min")
-            
-            with col4:
-                avg_delay = stats_data['Tiempo_retraso'].mean()
-                st.metric("Retraso Promedio", f"{avg_delay:.1f} min")
-        
-        st.markdown("---")
-        
-        # Graph 1: Weekly Time Metrics
-        st.subheader("📈 Gráfico 1: Tiempos por Semana")
-        weekly_data = aggregate_by_week(filtered_data, selected_provider)
-        
-        if not weekly_data.empty:
-            fig1 = create_weekly_times_chart(weekly_data)
-            if fig1:
-                st.plotly_chart(fig1, use_container_width=True)
-                logger.info("Displayed weekly times chart")
-        else:
-            st.info("No hay datos para el proveedor seleccionado en el período especificado.")
-        
-        st.markdown("---")
-        
-        # Graph 2: Weekly Delay Metrics  
-        st.subheader("⏰ Gráfico 2: Retrasos por Semana")
-        
-        if not weekly_data.empty:
-            fig2 = create_weekly_delay_chart(weekly_data)
-            if fig2:
-                st.plotly_chart(fig2, use_container_width=True)
-                logger.info("Displayed weekly delay chart")
-        else:
-            st.info("No hay datos para el proveedor seleccionado en el período especificado.")
-        
-        st.markdown("---")
-        
-        # Graph 3: Hourly Time Metrics
-        st.subheader("🕐 Gráfico 3: Tiempos por Hora de Reserva")
-        hourly_data = aggregate_by_hour_from_filtered(filtered_data, selected_provider)
-        
-        if not hourly_data.empty:
-            fig3 = create_hourly_times_chart(hourly_data)
-            if fig3:
-                st.plotly_chart(fig3, use_container_width=True)
-                logger.info("Displayed hourly times chart")
-        else:
-            if selected_provider != "Todos":
-                st.info(f"No hay datos de horas de reserva para el proveedor {selected_provider} en el período especificado.")
-            else:
-                st.info("No hay datos de horas de reserva para el período especificado.")
-        
-        st.markdown("---")
-        
-        # Graph 4: Hourly Delay Metrics
-        st.subheader("⚡ Gráfico 4: Retrasos por Hora de Reserva")
-        
-        if not hourly_data.empty:
-            fig4 = create_hourly_delay_chart(hourly_data)
-            if fig4:
-                st.plotly_chart(fig4, use_container_width=True)
-                logger.info("Displayed hourly delay chart")
-        else:
-            if selected_provider != "Todos":
-                st.info(f"No hay datos de horas de reserva para el proveedor {selected_provider} en el período especificado.")
-            else:
-                st.info("No hay datos de horas de reserva para el período especificado.")
+        # Dashboard module (and plotly) is imported only when this view is rendered
+        import dashboard
+        dashboard.render_dashboard(gestion_df, reservas_df, get_shared_data_store().version)
+    
+    # ─────────────────────────────────────────────────────────────
+    # TAB 4: Live Dock Board
+    # ─────────────────────────────────────────────────────────────
+    if active_view == VIEW_LIVE_BOARD:
+        logger.info("User accessed Live Board tab")
+        st.markdown("*Estado de los andenes en tiempo real (enlace para pantallas: `?modo=tablero`)*")
+        render_live_board()
     
     logger.info("=== Provider Control App Session Complete ===")
 
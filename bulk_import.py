@@ -0,0 +1,135 @@
+import argparse
+import logging
+import sys
+
+import pandas as pd
+
+from sheets_data import (
+    GESTION_COLUMNS, BULK_WRITE_CHUNK_ROWS, RESERVAS_SHEET, GESTION_SHEET,
+    load_sheets, compute_gestion_metrics, parse_datetime_series,
+    gestion_frame_to_rows, append_gestion_rows
+)
+
+# ─────────────────────────────────────────────────────────────
+# Bulk import of historical arrivals (CSV or Excel) into proveedor_gestion
+# Usage: python bulk_import.py historico.xlsx [--dry-run] [--chunk-size 500]
+# Reads .streamlit/secrets.toml like the Streamlit app.
+# ─────────────────────────────────────────────────────────────
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger('provider_control_app')
+
+# Loaded frames stay cached in the data store; copies must not write through
+pd.options.mode.copy_on_write = True
+
+REQUIRED_COLUMNS = ['Orden_de_compra', 'Hora_llegada']
+
+def read_import_file(path):
+    """Read a CSV or Excel file with every cell as text"""
+    if path.lower().endswith(('.xlsx', '.xlsm', '.xls')):
+        df = pd.read_excel(path, dtype=str)
+    else:
+        df = pd.read_csv(path, dtype=str)
+    df.columns = [str(col).strip() for col in df.columns]
+    return df.fillna('')
+
+def validate_import_rows(import_df, reservas_df):
+    """Return (valid rows, list of error messages) for the import file"""
+    errors = []
+    df = import_df.copy()
+    df['Orden_de_compra'] = df['Orden_de_compra'].astype(str).str.strip()
+    for col in ['Hora_inicio_atencion', 'Hora_fin_atencion', 'Proveedor', 'Numero_de_bultos']:
+        if col not in df.columns:
+            df[col] = ''
+
+    # Fill provider and bultos from reservas where the file leaves them empty
+    reservas = reservas_df.copy()
+    reservas['Orden_de_compra'] = reservas['Orden_de_compra'].astype(str).str.strip()
+    reservas = reservas.drop_duplicates('Orden_de_compra', keep='last').set_index('Orden_de_compra')
+    for col in ['Proveedor', 'Numero_de_bultos']:
+        from_reservas = df['Orden_de_compra'].map(reservas[col]).fillna('').astype(str)
+        df[col] = df[col].where(df[col].astype(str).str.strip() != '', from_reservas)
+
+    llegada = parse_datetime_series(df['Hora_llegada'])
+    inicio = parse_datetime_series(df['Hora_inicio_atencion'])
+    fin = parse_datetime_series(df['Hora_fin_atencion'])
+    has_inicio = df['Hora_inicio_atencion'].astype(str).str.strip() != ''
+    has_fin = df['Hora_fin_atencion'].astype(str).str.strip() != ''
+
+    checks = [
+        (df['Orden_de_compra'] == '', "Orden_de_compra vacía"),
+        (llegada.isna(), "Hora_llegada inválida"),
+        (has_inicio & inicio.isna(), "Hora_inicio_atencion inválida"),
+        (has_fin & fin.isna(), "Hora_fin_atencion inválida"),
+        (has_inicio != has_fin, "Atención incompleta (falta inicio o fin)"),
+        (inicio.notna() & fin.notna() & (inicio >= fin), "La hora de fin debe ser posterior a la hora de inicio"),
+        (inicio.notna() & llegada.notna() & (inicio < llegada), "La atención no puede iniciar antes de la llegada"),
+        (df['Proveedor'].astype(str).str.strip() == '', "Proveedor desconocido"),
+    ]
+    invalid = pd.Series(False, index=df.index)
+    for mask, message in checks:
+        for row_index in df.index[mask]:
+            # +2: header row and 1-based row numbers in the source file
+            errors.append(f"Fila {row_index + 2} ({df.at[row_index, 'Orden_de_compra']}): {message}")
+        invalid |= mask
+
+    not_booked = ~df['Orden_de_compra'].isin(reservas.index) & ~invalid
+    if not_booked.any():
+        logger.warning(f"{int(not_booked.sum())} orders have no reservation, Tiempo_retraso will be 0")
+
+    return df[~invalid], errors
+
+def run_import(path, dry_run=False, chunk_size=BULK_WRITE_CHUNK_ROWS):
+    reservas_df, gestion_df = load_sheets(RESERVAS_SHEET, GESTION_SHEET)
+    if reservas_df is None:
+        logger.error("Could not load data from Google Sheets, aborting import")
+        return 1
+
+    import_df = read_import_file(path)
+    missing = [col for col in REQUIRED_COLUMNS if col not in import_df.columns]
+    if missing:
+        logger.error(f"Missing required columns in {path}: {missing}")
+        return 1
+    logger.info(f"Read {len(import_df)} rows from {path}")
+
+    valid_df, errors = validate_import_rows(import_df, reservas_df)
+    for error in errors:
+        logger.warning(error)
+
+    # Dedupe: last row wins inside the file, orders already in gestion are skipped
+    valid_df = valid_df.drop_duplicates('Orden_de_compra', keep='last')
+    existing_orders = set(gestion_df['Orden_de_compra'].astype(str).str.strip()) if not gestion_df.empty else set()
+    already_saved = valid_df['Orden_de_compra'].isin(existing_orders)
+    new_df = valid_df[~already_saved].reindex(columns=GESTION_COLUMNS, fill_value='')
+
+    new_df = compute_gestion_metrics(new_df, reservas_df)
+    rows = gestion_frame_to_rows(new_df)
+    logger.info(
+        f"Import summary: {len(import_df)} read, {len(errors)} errors, "
+        f"{int(already_saved.sum())} already in gestion, {len(rows)} to write"
+    )
+
+    if dry_run:
+        logger.info("Dry run, nothing written")
+        return 0
+
+    written = append_gestion_rows(rows, chunk_size=chunk_size)
+    logger.info(f"Bulk import complete: {written} rows written")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Importar llegadas históricas a proveedor_gestion")
+    parser.add_argument("path", help="Archivo CSV o Excel con Orden_de_compra y Hora_llegada")
+    parser.add_argument("--dry-run", action="store_true", help="Validar y calcular sin escribir en Google Sheets")
+    parser.add_argument("--chunk-size", type=int, default=BULK_WRITE_CHUNK_ROWS, help="Filas por escritura")
+    args = parser.parse_args()
+    return run_import(args.path, dry_run=args.dry_run, chunk_size=args.chunk_size)
+
+if __name__ == "__main__":
+    sys.exit(main())
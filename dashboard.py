@@ -0,0 +1,844 @@
+import logging
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+from datetime import timedelta
+
+from forecast import FORECAST_DAYS, FORECAST_HISTORY_WEEKS, FORECAST_BUCKET_MINUTES, forecast_dock_occupancy
+from occupancy import RESERVATION_SLOT_MINUTES, build_day_occupancy, dock_capacity, get_reservation_index
+from sheets_data import RESERVAS_SHEET, get_shared_data_store, load_sheets, parse_datetime_series
+from sketches import METRIC_COLUMNS, MetricSketchIndex, ProviderScorecardRollup
+from time_utils import get_bolivia_now, get_bolivia_today, parse_datetime_flexible
+
+logger = logging.getLogger('provider_control_app')
+
+# ─────────────────────────────────────────────────────────────
+# 1. Dashboard Helper Functions - UNCHANGED
+# ─────────────────────────────────────────────────────────────
+def get_current_week():
+    """Get current week number"""
+    return get_bolivia_now().isocalendar()[1]
+
+def get_completed_weeks_data(gestion_df, weeks_back):
+    """Get data for completed weeks only"""
+    if gestion_df.empty:
+        return pd.DataFrame()
+    
+    # Get current datetime and calculate cutoff date
+    current_date = get_bolivia_now()
+    # Go back to start of current week (Monday)
+    current_week_start = current_date - timedelta(days=current_date.weekday())
+    # Calculate cutoff: start of current week minus weeks_back
+    cutoff_date = current_week_start - timedelta(weeks=weeks_back)
+    
+    # Filter records that have completion times and are within date range
+    filtered_df = gestion_df[
+        (gestion_df['Tiempo_total'].notna()) &  # Only completed records
+        (gestion_df['Hora_llegada'].notna())
+    ]
+    
+    # Parse arrival dates and filter by date range
+    def parse_arrival_date(datetime_str):
+        """Parse arrival datetime and return date"""
+        dt = parse_datetime_flexible(datetime_str)
+        return dt.date() if dt else None
+    
+    filtered_df['arrival_date'] = filtered_df['Hora_llegada'].apply(parse_arrival_date)
+    
+    # Filter by date range: from cutoff_date up to (but not including) current week
+    filtered_df = filtered_df[
+        (filtered_df['arrival_date'].notna()) &
+        (filtered_df['arrival_date'] >= cutoff_date.date()) &
+        (filtered_df['arrival_date'] < current_week_start.date())
+    ]
+    
+    # Remove temporary column
+    filtered_df = filtered_df.drop('arrival_date', axis=1)
+    
+    return filtered_df
+
+def get_completed_week_labels(weeks_back):
+    """Week labels (YYYY-WW) of the completed weeks used by get_completed_weeks_data"""
+    current_date = get_bolivia_now()
+    current_week_start = current_date - timedelta(days=current_date.weekday())
+    week_labels = []
+    for weeks_ago in range(weeks_back, 0, -1):
+        year, week, _ = (current_week_start - timedelta(weeks=weeks_ago)).isocalendar()
+        week_labels.append(f"{year}-W{week:02d}")
+    return week_labels
+
+@st.cache_resource
+def get_metric_sketch_index():
+    """Process-wide quantile sketch index shared by all dashboard sessions"""
+    logger.info("Creating metric sketch index")
+    return MetricSketchIndex()
+
+def get_period_percentiles(gestion_df, data_version, weeks_back, provider_filter=None):
+    """p50/p90/p99 of each Tiempo_* metric for the selected period and provider"""
+    sketch_index = get_metric_sketch_index()
+    sketch_index.ingest(gestion_df, data_version)
+    merged = sketch_index.query(get_completed_week_labels(weeks_back), provider_filter)
+    
+    rows = []
+    for metric in METRIC_COLUMNS:
+        sketch = merged[metric]
+        row = {'Métrica': metric, 'Registros': sketch.count}
+        for label, q in [('p50', 0.5), ('p90', 0.9), ('p99', 0.99)]:
+            value = sketch.quantile(q)
+            row[label] = round(value, 1) if value is not None else None
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+@st.cache_resource
+def get_provider_scorecard_rollup():
+    """Process-wide provider scorecard rollup shared by all dashboard sessions"""
+    logger.info("Creating provider scorecard rollup")
+    return ProviderScorecardRollup()
+
+def get_provider_scorecards(gestion_df, data_version, weeks_back):
+    """Provider ranking for the period, best on-time rate first"""
+    rollup = get_provider_scorecard_rollup()
+    rollup.ingest(gestion_df, data_version)
+    
+    # Previous period of the same length, right before the selected one
+    week_labels = get_completed_week_labels(2 * weeks_back)
+    rows = rollup.scorecards(week_labels[weeks_back:], week_labels[:weeks_back])
+    if not rows:
+        return pd.DataFrame()
+    
+    scorecards = pd.DataFrame(rows)
+    return scorecards.sort_values(['Puntualidad_%', 'Retraso_promedio'], ascending=[False, True], na_position='last')
+
+def aggregate_by_week(df, provider_filter=None):
+    """Aggregate data by week"""
+    if df.empty:
+        return pd.DataFrame()
+    
+    # Filter by provider if specified
+    if provider_filter and provider_filter != "Todos":
+        df = df[df['Proveedor'] == provider_filter]
+    
+    if df.empty:
+        return pd.DataFrame()
+    
+    # Convert numeric columns
+    for col in ['Tiempo_espera', 'Tiempo_atencion', 'Tiempo_total', 'Tiempo_retraso']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    
+    # Parse arrival dates and create week identifiers
+    def get_week_label(datetime_str):
+        """Get week label from datetime string (YYYY-WW format)"""
+        dt = parse_datetime_flexible(datetime_str)
+        if dt:
+            year, week, _ = dt.isocalendar()
+            return f"{year}-W{week:02d}"
+        return None
+    
+    df['week_label'] = df['Hora_llegada'].apply(get_week_label)
+    
+    # Filter out rows without valid week labels
+    df = df[df['week_label'].notna()]
+    
+    if df.empty:
+        return pd.DataFrame()
+    
+    # Aggregate by week
+    weekly_data = df.groupby('week_label').agg({
+        'Tiempo_espera': 'mean',
+        'Tiempo_atencion': 'mean', 
+        'Tiempo_total': 'mean',
+        'Tiempo_retraso': 'mean'
+    }).round(1).reset_index()
+    
+    # Sort by week label to ensure proper chronological order
+    weekly_data = weekly_data.sort_values('week_label')
+    
+    return weekly_data
+
+def aggregate_by_hour_from_filtered(filtered_df, provider_filter=None):
+    """Aggregate data by reservation hour from already filtered data"""
+    if filtered_df.empty:
+        return pd.DataFrame()
+    
+    # Filter by provider if specified
+    if provider_filter and provider_filter != "Todos":
+        filtered_df = filtered_df[filtered_df['Proveedor'] == provider_filter]
+    
+    if filtered_df.empty:
+        return pd.DataFrame()
+    
+    # Convert numeric columns
+    for col in ['Tiempo_espera', 'Tiempo_atencion', 'Tiempo_total', 'Tiempo_retraso']:
+        filtered_df[col] = pd.to_numeric(filtered_df[col], errors='coerce')
+    
+    # Filter out records without reservation hour
+    filtered_df = filtered_df[filtered_df['hora_de_reserva'].notna()]
+    
+    if filtered_df.empty:
+        return pd.DataFrame()
+    
+    # Aggregate by hour
+    hourly_data = filtered_df.groupby('hora_de_reserva').agg({
+        'Tiempo_espera': 'mean',
+        'Tiempo_atencion': 'mean',
+        'Tiempo_total': 'mean', 
+        'Tiempo_retraso': 'mean'
+    }).round(1).reset_index()
+    
+    return hourly_data
+
+def create_weekly_times_chart(weekly_data):
+    """Create chart for weekly time metrics"""
+    if weekly_data.empty:
+        return None
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scatter(
+        x=weekly_data['week_label'],
+        y=weekly_data['Tiempo_espera'],
+        mode='lines+markers',
+        name='Tiempo de Espera',
+        line=dict(color='#FF6B6B')
+    ))
+    
+    fig.add_trace(go.Scatter(
+        x=weekly_data['week_label'],
+        y=weekly_data['Tiempo_atencion'],
+        mode='lines+markers', 
+        name='Tiempo de Atención',
+        line=dict(color='#4ECDC4')
+    ))
+    
+    fig.add_trace(go.Scatter(
+        x=weekly_data['week_label'],
+        y=weekly_data['Tiempo_total'],
+        mode='lines+markers',
+        name='Tiempo Total', 
+        line=dict(color='#45B7D1')
+    ))
+    
+    fig.update_layout(
+        title='Tiempos Promedio por Semana',
+        xaxis_title='Semana (Año-Semana)',
+        yaxis_title='Tiempo (minutos)',
+        hovermode='x unified'
+    )
+    
+    return fig
+
+def create_weekly_delay_chart(weekly_data):
+    """Create chart for weekly delay metrics"""
+    if weekly_data.empty:
+        return None
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scatter(
+        x=weekly_data['week_label'],
+        y=weekly_data['Tiempo_retraso'],
+        mode='lines+markers',
+        name='Tiempo de Retraso',
+        line=dict(color='#E74C3C')
+    ))
+    
+    # Add zero line
+    fig.add_hline(y=0, line_dash="dash", line_color="gray", opacity=0.5)
+    
+    fig.update_layout(
+        title='Tiempo de Retraso Promedio por Semana',
+        xaxis_title='Semana (Año-Semana)',
+        yaxis_title='Tiempo (minutos)',
+        hovermode='x unified'
+    )
+    
+    return fig
+
+def create_hourly_times_chart(hourly_data):
+    """Create chart for hourly time metrics"""
+    if hourly_data.empty:
+        return None
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Bar(
+        x=hourly_data['hora_de_reserva'],
+        y=hourly_data['Tiempo_espera'],
+        name='Tiempo de Espera',
+        marker_color='#FF6B6B'
+    ))
+    
+    fig.add_trace(go.Bar(
+        x=hourly_data['hora_de_reserva'],
+        y=hourly_data['Tiempo_atencion'],
+        name='Tiempo de Atención',
+        marker_color='#4ECDC4'
+    ))
+    
+    fig.add_trace(go.Bar(
+        x=hourly_data['hora_de_reserva'],
+        y=hourly_data['Tiempo_total'],
+        name='Tiempo Total',
+        marker_color='#45B7D1'
+    ))
+    
+    fig.update_layout(
+        title='Tiempos Promedio por Hora de Reserva',
+        xaxis_title='Hora de Reserva',
+        yaxis_title='Tiempo (minutos)',
+        barmode='group'
+    )
+    
+    return fig
+
+def create_hourly_delay_chart(hourly_data):
+    """Create chart for hourly delay metrics"""
+    if hourly_data.empty:
+        return None
+    
+    fig = go.Figure()
+    
+    # Color bars based on positive/negative delay
+    colors = ['#E74C3C' if x >= 0 else '#27AE60' for x in hourly_data['Tiempo_retraso']]
+    
+    fig.add_trace(go.Bar(
+        x=hourly_data['hora_de_reserva'],
+        y=hourly_data['Tiempo_retraso'],
+        name='Tiempo de Retraso',
+        marker_color=colors
+    ))
+    
+    # Add zero line
+    fig.add_hline(y=0, line_dash="dash", line_color="gray", opacity=0.5)
+    
+    fig.update_layout(
+        title='Tiempo de Retraso Promedio por Hora de Reserva',
+        xaxis_title='Hora de Reserva',
+        yaxis_title='Tiempo (minutos)'
+    )
+    
+    return fig
+
+MAX_CHART_POINTS = 2000  # Per-arrival series above this are downsampled with LTTB
+
+def lttb_downsample(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indexes of the points that keep the shape of y(x)"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    bucket_edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    previous = 0
+    
+    for bucket in range(threshold - 2):
+        start, end = bucket_edges[bucket], bucket_edges[bucket + 1]
+        next_end = bucket_edges[bucket + 2] if bucket + 2 < len(bucket_edges) else n
+        # Average of the next bucket is the third vertex of the triangle
+        next_x = x[end:next_end].mean() if next_end > end else x[n - 1]
+        next_y = y[end:next_end].mean() if next_end > end else y[n - 1]
+        
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas)) if end > start else start
+        selected[bucket + 1] = previous
+    
+    return selected
+
+def prepare_arrival_points(filtered_df, provider_filter=None):
+    """Completed arrivals with parsed arrival datetime and numeric metrics, sorted by time"""
+    if filtered_df.empty:
+        return pd.DataFrame()
+    
+    if provider_filter and provider_filter != "Todos":
+        filtered_df = filtered_df[filtered_df['Proveedor'] == provider_filter]
+    
+    points = filtered_df[['Orden_de_compra', 'Proveedor', 'Hora_llegada'] + METRIC_COLUMNS].copy()
+    points['arrival_datetime'] = parse_datetime_series(points['Hora_llegada'])
+    for col in METRIC_COLUMNS:
+        points[col] = pd.to_numeric(points[col], errors='coerce')
+    
+    return points[points['arrival_datetime'].notna()].sort_values('arrival_datetime')
+
+def create_arrival_scatter_chart(points, metrics):
+    """WebGL scatter of one point per arrival, downsampled for long ranges"""
+    if points.empty or not metrics:
+        return None
+    
+    colors = {
+        'Tiempo_espera': '#FF6B6B',
+        'Tiempo_atencion': '#4ECDC4',
+        'Tiempo_total': '#45B7D1',
+        'Tiempo_retraso': '#E74C3C'
+    }
+    
+    fig = go.Figure()
+    
+    for metric in metrics:
+        series = points[points[metric].notna()]
+        x = series['arrival_datetime'].to_numpy(dtype='datetime64[ns]').astype(np.int64).astype(float)
+        y = series[metric].to_numpy(dtype=float)
+        keep = lttb_downsample(x, y, MAX_CHART_POINTS)
+        series = series.iloc[keep]
+        
+        fig.add_trace(go.Scattergl(
+            x=series['arrival_datetime'],
+            y=series[metric],
+            mode='markers',
+            name=f"{metric} ({len(series)}/{len(x)})" if len(series) < len(x) else metric,
+            marker=dict(color=colors.get(metric), size=5, opacity=0.7),
+            customdata=series[['Proveedor', 'Orden_de_compra']].to_numpy(),
+            hovertemplate='%{customdata[0]} - %{customdata[1]}<br>%{x}<br>%{y} min<extra></extra>'
+        ))
+    
+    fig.update_layout(
+        title='Tiempos por Llegada',
+        xaxis_title='Hora de Llegada',
+        yaxis_title='Tiempo (minutos)',
+        hovermode='closest'
+    )
+    
+    return fig
+
+def create_occupancy_forecast_chart(forecast):
+    """Expected arrivals (bars) with expected queue and trucks in service (lines) per bucket"""
+    if forecast.empty:
+        return None
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Bar(
+        x=forecast['Bucket'],
+        y=forecast['Llegadas_esperadas'],
+        name='Llegadas Esperadas',
+        marker_color='#BDC3C7',
+        opacity=0.6
+    ))
+    
+    fig.add_trace(go.Scatter(
+        x=forecast['Bucket'],
+        y=forecast['Cola_esperada'],
+        mode='lines',
+        name='Cola Esperada',
+        line=dict(color='#FF6B6B', shape='hv')
+    ))
+    
+    fig.add_trace(go.Scatter(
+        x=forecast['Bucket'],
+        y=forecast['Ocupacion_esperada'],
+        mode='lines',
+        name='Camiones en Atención',
+        line=dict(color='#4ECDC4', shape='hv')
+    ))
+    
+    fig.update_layout(
+        title=f'Ocupación Esperada por Bloque de {FORECAST_BUCKET_MINUTES} Minutos',
+        xaxis_title='Hora',
+        yaxis_title='Camiones',
+        hovermode='x unified'
+    )
+    
+    return fig
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def get_day_occupancy(_gestion_df, data_version, day, now=None):
+    """Intervals and occupancy timeline of one day, computed once per data version (and minute for today)"""
+    return build_day_occupancy(_gestion_df, day, now)
+
+OCCUPANCY_STATE_COLORS = {'En espera': '#FF6B6B', 'En atención': '#4ECDC4'}
+
+def create_dock_gantt_chart(intervals):
+    """One row per order with its waiting and in-service bars"""
+    if intervals.empty:
+        return None
+    
+    fig = go.Figure()
+    
+    for estado, color in OCCUPANCY_STATE_COLORS.items():
+        state_intervals = intervals[intervals['Estado'] == estado]
+        fig.add_trace(go.Bar(
+            y=state_intervals['Orden_de_compra'] + ' - ' + state_intervals['Proveedor'],
+            x=(state_intervals['Fin'] - state_intervals['Inicio']).dt.total_seconds() * 1000,
+            base=state_intervals['Inicio'],
+            orientation='h',
+            name=estado,
+            marker_color=color,
+            customdata=(state_intervals['Fin'] - state_intervals['Inicio']).dt.total_seconds() / 60,
+            hovertemplate='%{y}<br>%{base|%H:%M} (%{customdata:.0f} min)<extra>' + estado + '</extra>'
+        ))
+    
+    fig.update_layout(
+        title='Llegadas del Día',
+        xaxis=dict(type='date', title='Hora'),
+        yaxis=dict(autorange='reversed', title=''),
+        barmode='overlay',
+        height=max(300, 22 * intervals['Orden_de_compra'].nunique() + 120)
+    )
+    
+    return fig
+
+def create_dock_occupancy_chart(timeline):
+    """Trucks waiting and in service over the day, as step lines"""
+    if timeline.empty:
+        return None
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scatter(
+        x=timeline['Hora'],
+        y=timeline['En_espera'],
+        mode='lines',
+        name='En Espera',
+        line=dict(color=OCCUPANCY_STATE_COLORS['En espera'], shape='hv')
+    ))
+    
+    fig.add_trace(go.Scatter(
+        x=timeline['Hora'],
+        y=timeline['En_atencion'],
+        mode='lines',
+        name='En Atención',
+        line=dict(color=OCCUPANCY_STATE_COLORS['En atención'], shape='hv')
+    ))
+    
+    fig.update_layout(
+        title='Camiones Simultáneos',
+        xaxis_title='Hora',
+        yaxis_title='Camiones',
+        hovermode='x unified'
+    )
+    
+    return fig
+
+OVERBOOKING_WEEKS = 2   # Weeks ahead checked for overbooked slots by default
+
+def get_all_reservations_index():
+    """Reservation index over the whole reservas sheet (every week), None when it cannot be loaded"""
+    reservas_all = load_sheets(RESERVAS_SHEET)[0]
+    if reservas_all is None:
+        return None
+    return get_reservation_index(reservas_all, get_shared_data_store().version)
+
+def create_slot_load_chart(slot_load, capacity):
+    """Reservations booked at once per slot, over-capacity slots highlighted"""
+    if slot_load.empty:
+        return None
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Bar(
+        x=slot_load['Slot'],
+        y=slot_load['Simultaneas'],
+        name='Reservas Simultáneas',
+        marker_color=np.where(slot_load['Simultaneas'] > capacity, '#FF6B6B', '#4ECDC4')
+    ))
+    
+    fig.add_hline(y=capacity, line_dash='dash', line_color='#45B7D1', annotation_text='Capacidad')
+    
+    fig.update_layout(
+        title=f'Reservas por Bloque de {RESERVATION_SLOT_MINUTES} Minutos',
+        xaxis_title='Hora',
+        yaxis_title='Reservas',
+        hovermode='x unified'
+    )
+    
+    return fig
+
+# ─────────────────────────────────────────────────────────────
+# 2. Dashboard View
+# ─────────────────────────────────────────────────────────────
+def render_dashboard(gestion_df, reservas_df, data_version):
+    """Render the dashboard tab"""
+    logger.info("User accessed Dashboard tab")
+    st.markdown("*Análisis y tendencias de rendimiento de proveedores*")
+    
+    # Check if we have data
+    if gestion_df.empty:
+        logger.info("No data available for dashboard")
+        st.warning("📊 No hay datos disponibles para mostrar gráficos.")
+        return
+    
+    # Filter controls
+    st.subheader("🔧 Controles de Filtrado")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Provider filter
+        providers = ["Todos"] + sorted(gestion_df['Proveedor'].dropna().unique().tolist())
+        selected_provider = st.selectbox(
+            "Proveedor:",
+            options=providers,
+            key="dashboard_provider"
+        )
+    
+    with col2:
+        # Week range filter
+        week_options = {
+            "1 semana": 1,
+            "2 semanas": 2, 
+            "4 semanas": 4,
+            "12 semanas": 12,
+            "24 semanas": 24
+        }
+        selected_weeks_label = st.selectbox(
+            "Período (semanas completas):",
+            options=list(week_options.keys()),
+            key="dashboard_weeks"
+        )
+        selected_weeks = week_options[selected_weeks_label]
+    
+    logger.info(f"Dashboard filters - Provider: {selected_provider}, Weeks: {selected_weeks}")
+    
+    st.markdown("---")
+    
+    # Get filtered data
+    filtered_data = get_completed_weeks_data(gestion_df, selected_weeks)
+    
+    # Display number of entries being used for dashboard
+    stats_data_count = filtered_data
+    if selected_provider != "Todos":
+        stats_data_count = stats_data_count[stats_data_count['Proveedor'] == selected_provider]
+    st.caption(f"📊 Mostrando {len(stats_data_count)} registros para el análisis")
+    logger.info(f"Dashboard showing {len(stats_data_count)} records for analysis")
+    
+    if filtered_data.empty:
+        logger.info(f"No completed data available for last {selected_weeks} weeks")
+        st.warning(f"📊 No hay datos completos para las últimas {selected_weeks} semanas.")
+        return
+    
+    # Summary stats - MOVED TO BEGINNING
+    st.subheader("📊 Estadísticas del Período")
+    
+    # Filter by provider for stats
+    stats_data = filtered_data
+    if selected_provider != "Todos":
+        stats_data = stats_data[stats_data['Proveedor'] == selected_provider]
+    
+    if not stats_data.empty:
+        col1, col2, col3, col4 = st.columns(4)
+        
+        # Convert to numeric for calculations
+        for col in ['Tiempo_espera', 'Tiempo_atencion', 'Tiempo_total', 'Tiempo_retraso']:
+            stats_data[col] = pd.to_numeric(stats_data[col], errors='coerce')
+        
+        with col1:
+            avg_wait = stats_data['Tiempo_espera'].mean()
+            st.metric("Espera Promedio", f"{avg_wait:.1f} min")
+        
+        with col2:
+            avg_service = stats_data['Tiempo_atencion'].mean()
+            st.metric("Atención Promedio", f"{avg_service:.1f} min")
+        
+        with col3:
+            avg_total = stats_data['Tiempo_total'].mean()
+            st.metric("Total Promedio", f"{avg_total:.1f} min")
+        
+        with col4:
+            avg_delay = stats_data['Tiempo_retraso'].mean()
+            st.metric("Retraso Promedio", f"{avg_delay:.1f} min")
+        
+        # Tail of the distribution - means hide trucks waiting an hour at the dock
+        st.markdown("**Percentiles (minutos)**")
+        percentiles = get_period_percentiles(gestion_df, data_version, selected_weeks, selected_provider)
+        st.dataframe(percentiles, hide_index=True, use_container_width=True)
+    
+    st.markdown("---")
+    
+    # Provider ranking - all providers, independent of the provider filter
+    st.subheader("🏆 Ranking de Proveedores")
+    scorecards = get_provider_scorecards(gestion_df, data_version, selected_weeks)
+    if not scorecards.empty:
+        st.caption("Puntualidad: llegada a la hora reservada o antes. Δ: cambio respecto al período anterior de igual duración.")
+        st.dataframe(scorecards, hide_index=True, use_container_width=True)
+    else:
+        st.info("No hay datos de proveedores para el período especificado.")
+    
+    st.markdown("---")
+    
+    # Graph 1: Weekly Time Metrics
+    st.subheader("📈 Gráfico 1: Tiempos por Semana")
+    weekly_data = aggregate_by_week(filtered_data, selected_provider)
+    
+    if not weekly_data.empty:
+        fig1 = create_weekly_times_chart(weekly_data)
+        if fig1:
+            st.plotly_chart(fig1, use_container_width=True)
+            logger.info("Displayed weekly times chart")
+    else:
+        st.info("No hay datos para el proveedor seleccionado en el período especificado.")
+    
+    st.markdown("---")
+    
+    # Graph 2: Weekly Delay Metrics  
+    st.subheader("⏰ Gráfico 2: Retrasos por Semana")
+    
+    if not weekly_data.empty:
+        fig2 = create_weekly_delay_chart(weekly_data)
+        if fig2:
+            st.plotly_chart(fig2, use_container_width=True)
+            logger.info("Displayed weekly delay chart")
+    else:
+        st.info("No hay datos para el proveedor seleccionado en el período especificado.")
+    
+    st.markdown("---")
+    
+    # Graph 3: Hourly Time Metrics
+    st.subheader("🕐 Gráfico 3: Tiempos por Hora de Reserva")
+    hourly_data = aggregate_by_hour_from_filtered(filtered_data, selected_provider)
+    
+    if not hourly_data.empty:
+        fig3 = create_hourly_times_chart(hourly_data)
+        if fig3:
+            st.plotly_chart(fig3, use_container_width=True)
+            logger.info("Displayed hourly times chart")
+    else:
+        if selected_provider != "Todos":
+            st.info(f"No hay datos de horas de reserva para el proveedor {selected_provider} en el período especificado.")
+        else:
+            st.info("No hay datos de horas de reserva para el período especificado.")
+    
+    st.markdown("---")
+    
+    # Graph 4: Hourly Delay Metrics
+    st.subheader("⚡ Gráfico 4: Retrasos por Hora de Reserva")
+    
+    if not hourly_data.empty:
+        fig4 = create_hourly_delay_chart(hourly_data)
+        if fig4:
+            st.plotly_chart(fig4, use_container_width=True)
+            logger.info("Displayed hourly delay chart")
+    else:
+        if selected_provider != "Todos":
+            st.info(f"No hay datos de horas de reserva para el proveedor {selected_provider} en el período especificado.")
+        else:
+            st.info("No hay datos de horas de reserva para el período especificado.")
+    
+    st.markdown("---")
+    
+    # Graph 5: Per-arrival drill-down
+    st.subheader("🔍 Gráfico 5: Detalle por Llegada")
+    selected_metrics = st.multiselect(
+        "Métricas:",
+        options=METRIC_COLUMNS,
+        default=['Tiempo_espera', 'Tiempo_atencion'],
+        key="dashboard_arrival_metrics"
+    )
+    arrival_points = prepare_arrival_points(filtered_data, selected_provider)
+    
+    if not arrival_points.empty:
+        fig5 = create_arrival_scatter_chart(arrival_points, selected_metrics)
+        if fig5:
+            st.plotly_chart(fig5, use_container_width=True)
+            logger.info(f"Displayed arrival scatter chart with {len(arrival_points)} arrivals")
+    else:
+        st.info("No hay llegadas para el proveedor seleccionado en el período especificado.")
+    
+    st.markdown("---")
+    
+    # Graph 6: Dock occupancy forecast - all providers, history of the last completed weeks
+    st.subheader("📅 Gráfico 6: Pronóstico de Ocupación de Andenes")
+    history = get_completed_weeks_data(gestion_df, FORECAST_HISTORY_WEEKS)
+    forecast, bookings = forecast_dock_occupancy(reservas_df, history, get_bolivia_today(), FORECAST_DAYS)
+    
+    if not forecast.empty:
+        peak = forecast.loc[forecast['Cola_esperada'].idxmax()]
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Reservas", len(bookings))
+        col2.metric("Cola Máxima Esperada", f"{peak['Cola_esperada']:.1f}")
+        col3.metric("Hora de Cola Máxima", peak['Bucket'].strftime('%d/%m %H:%M'))
+        st.caption(
+            f"Proyección con retraso, espera y atención promedio por proveedor y hora de reserva "
+            f"de las últimas {FORECAST_HISTORY_WEEKS} semanas completas."
+        )
+        fig6 = create_occupancy_forecast_chart(forecast)
+        if fig6:
+            st.plotly_chart(fig6, use_container_width=True)
+            logger.info(f"Displayed occupancy forecast for {len(bookings)} bookings")
+    elif not bookings.empty:
+        st.info(f"No hay historial de las últimas {FORECAST_HISTORY_WEEKS} semanas para proyectar las reservas.")
+    else:
+        st.info(f"No hay reservas para los próximos {FORECAST_DAYS} días.")
+    
+    st.markdown("---")
+    
+    # Graph 7: Actual dock occupancy of one day - all providers
+    st.subheader("🚛 Gráfico 7: Ocupación de Andenes por Día")
+    today = get_bolivia_today()
+    occupancy_day = st.date_input("Día:", value=today, max_value=today, key="dashboard_occupancy_day")
+    # Open intervals run until now only today; minute precision keeps the cache useful
+    now = get_bolivia_now().replace(second=0, microsecond=0) if occupancy_day == today else None
+    intervals, timeline = get_day_occupancy(gestion_df, data_version, occupancy_day, now)
+    
+    if not timeline.empty:
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Llegadas", intervals['Orden_de_compra'].nunique())
+        col2.metric("Cola Máxima", int(timeline['En_espera'].max()))
+        col3.metric("Hora de Cola Máxima", timeline.loc[timeline['En_espera'].idxmax(), 'Hora'].strftime('%H:%M'))
+        
+        fig7 = create_dock_occupancy_chart(timeline)
+        if fig7:
+            st.plotly_chart(fig7, use_container_width=True)
+        fig8 = create_dock_gantt_chart(intervals)
+        if fig8:
+            st.plotly_chart(fig8, use_container_width=True)
+        logger.info(f"Displayed dock occupancy for {occupancy_day}: {len(intervals)} intervals")
+    else:
+        st.info(f"No hay llegadas registradas el {occupancy_day.strftime('%d/%m/%Y')}.")
+    
+    st.markdown("---")
+    
+    # Graph 8: Overbooked reservation slots - whole reservas sheet, all providers
+    st.subheader("⚠️ Gráfico 8: Sobrerreservas de Andenes")
+    reservation_index = get_all_reservations_index()
+    
+    if reservation_index is not None and len(reservation_index) > 0:
+        col1, col2 = st.columns(2)
+        with col1:
+            overbooking_range = st.date_input(
+                "Período:",
+                value=(today, today + timedelta(weeks=OVERBOOKING_WEEKS)),
+                key="dashboard_overbooking_range"
+            )
+        with col2:
+            capacity = st.number_input(
+                "Reservas simultáneas permitidas:",
+                min_value=1,
+                value=dock_capacity(),
+                key="dashboard_overbooking_capacity"
+            )
+        
+        if len(overbooking_range) == 2:
+            range_start = pd.Timestamp(overbooking_range[0])
+            range_end = pd.Timestamp(overbooking_range[1]) + timedelta(days=1)
+            overbooked = reservation_index.overbooked(capacity, range_start, range_end)
+            slot_load = reservation_index.slot_load(range_start, range_end)
+            
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Reservas", len(reservation_index.conflicts(range_start, range_end)['Orden_de_compra'].unique()))
+            col2.metric("Períodos Sobrerreservados", len(overbooked))
+            col3.metric("Máximo Simultáneas", int(slot_load['Simultaneas'].max()) if not slot_load.empty else 0)
+            
+            if not overbooked.empty:
+                st.dataframe(
+                    overbooked.assign(
+                        Inicio=overbooked['Inicio'].dt.strftime('%d/%m/%Y %H:%M'),
+                        Fin=overbooked['Fin'].dt.strftime('%H:%M')
+                    ),
+                    use_container_width=True,
+                    hide_index=True
+                )
+            else:
+                st.success("No hay períodos con más reservas que la capacidad.")
+            
+            # Only the booked part of the period, so days without reservations do not flatten the chart
+            fig9 = create_slot_load_chart(slot_load[slot_load['Reservas'] > 0], capacity)
+            if fig9:
+                st.plotly_chart(fig9, use_container_width=True)
+            logger.info(f"Displayed overbooking check: {len(overbooked)} overbooked periods")
+    else:
+        st.info("No hay reservas para revisar.")
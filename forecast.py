@@ -0,0 +1,185 @@
+import logging
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from sheets_data import booked_offset_series
+
+logger = logging.getLogger('provider_control_app')
+
+FORECAST_BUCKET_MINUTES = 15
+FORECAST_DAYS = 3            # Today and the next two days
+FORECAST_HISTORY_WEEKS = 8   # Completed weeks of history behind the expected times
+
+# ─────────────────────────────────────────────────────────────
+# 1. Expected Times from History
+# ─────────────────────────────────────────────────────────────
+EXPECTED_COLUMNS = ['Tiempo_retraso', 'Tiempo_espera', 'Tiempo_atencion']
+
+def expected_times(history_df):
+    """Mean delay, wait and service minutes per (Proveedor, hora_de_reserva), per Proveedor and overall"""
+    history = pd.DataFrame({
+        'Proveedor': history_df['Proveedor'].astype(str).str.strip(),
+        'hora_de_reserva': pd.to_numeric(history_df['hora_de_reserva'], errors='coerce'),
+        **{col: pd.to_numeric(history_df[col], errors='coerce') for col in EXPECTED_COLUMNS}
+    })
+    by_provider_hora = history.groupby(['Proveedor', 'hora_de_reserva'])[EXPECTED_COLUMNS].mean()
+    by_provider = history.groupby('Proveedor')[EXPECTED_COLUMNS].mean()
+    overall = history[EXPECTED_COLUMNS].mean().fillna(0)
+    return by_provider_hora, by_provider, overall
+
+def attach_expected_times(bookings, history_df):
+    """Add expected minutes to each booking, falling back from provider+hour to provider to overall"""
+    by_provider_hora, by_provider, overall = expected_times(history_df)
+    provider_hora_key = pd.MultiIndex.from_arrays([bookings['Proveedor'], bookings['hora_de_reserva']])
+
+    for col in EXPECTED_COLUMNS:
+        expected = pd.Series(by_provider_hora[col].reindex(provider_hora_key).to_numpy(), index=bookings.index)
+        expected = expected.fillna(bookings['Proveedor'].map(by_provider[col]))
+        bookings[col] = expected.fillna(overall[col])
+    return bookings
+
+# ─────────────────────────────────────────────────────────────
+# 2. Occupancy Forecast
+# ─────────────────────────────────────────────────────────────
+def upcoming_bookings(reservas_df, start_date, days):
+    """Reservations from start_date for the given number of days, with booked start datetime"""
+    fecha = pd.to_datetime(
+        reservas_df['Fecha'].astype(str).str.extract(r'(\d{4}-\d{2}-\d{2})', expand=False), errors='coerce'
+    )
+    start = pd.Timestamp(start_date)
+    in_window = (fecha >= start) & (fecha < start + timedelta(days=days))
+
+    bookings = pd.DataFrame({
+        'Orden_de_compra': reservas_df.loc[in_window, 'Orden_de_compra'].astype(str).str.strip(),
+        'Proveedor': reservas_df.loc[in_window, 'Proveedor'].astype(str).str.strip(),
+        'booked_offset': booked_offset_series(reservas_df.loc[in_window, 'Hora']),
+        'fecha': fecha[in_window]
+    })
+    bookings = bookings[bookings['booked_offset'].notna()].drop_duplicates('Orden_de_compra', keep='last')
+    bookings['booked_start'] = bookings['fecha'] + bookings['booked_offset']
+    bookings['hora_de_reserva'] = bookings['booked_offset'].dt.total_seconds() // 3600
+    return bookings
+
+def bucket_overlap(starts, ends, bucket_starts, bucket_minutes):
+    """Expected number of intervals in each bucket (time overlap / bucket length), as a buckets x intervals sum"""
+    bucket_ends = bucket_starts + bucket_minutes
+    overlap = (
+        np.minimum(ends[None, :], bucket_ends[:, None])
+        - np.maximum(starts[None, :], bucket_starts[:, None])
+    )
+    return np.clip(overlap, 0, None).sum(axis=1) / bucket_minutes
+
+def forecast_dock_occupancy(reservas_df, history_df, start_date, days=FORECAST_DAYS,
+                            bucket_minutes=FORECAST_BUCKET_MINUTES):
+    """Expected arrivals, queue length and trucks in service per time bucket
+
+    Each booking is projected as arrival = booked start + expected delay,
+    then waiting for the expected wait and in service for the expected
+    service time. Buckets hold the expected number of trucks in each
+    state, averaged over the bucket.
+    """
+    bookings = upcoming_bookings(reservas_df, start_date, days)
+    if bookings.empty or history_df.empty:
+        # Without history there are no expected times to project with
+        return pd.DataFrame(), bookings
+    bookings = attach_expected_times(bookings, history_df)
+
+    # Minutes from start_date midnight
+    origin = pd.Timestamp(start_date)
+    booked = ((bookings['booked_start'] - origin).dt.total_seconds() / 60).to_numpy()
+    arrival = booked + bookings['Tiempo_retraso'].to_numpy()
+    service_start = arrival + bookings['Tiempo_espera'].clip(lower=0).to_numpy()
+    service_end = service_start + bookings['Tiempo_atencion'].clip(lower=0).to_numpy()
+    bookings['expected_arrival'] = origin + pd.to_timedelta(arrival, unit='m')
+    bookings['expected_end'] = origin + pd.to_timedelta(service_end, unit='m')
+
+    first = np.floor(arrival.min() / bucket_minutes) * bucket_minutes
+    # Past the bucket of the last arrival too: an arrival on a boundary opens a bucket of its own
+    last = max(np.ceil(service_end.max() / bucket_minutes), np.floor(arrival.max() / bucket_minutes) + 1) * bucket_minutes
+    bucket_starts = np.arange(first, last, bucket_minutes)
+    arrival_bucket = np.clip(np.floor((arrival - first) / bucket_minutes).astype(np.int64), 0, len(bucket_starts) - 1)
+
+    forecast = pd.DataFrame({
+        'Bucket': origin + pd.to_timedelta(bucket_starts, unit='m'),
+        'Llegadas_esperadas': np.bincount(arrival_bucket, minlength=len(bucket_starts)),
+        'Cola_esperada': bucket_overlap(arrival, service_start, bucket_starts, bucket_minutes),
+        'Ocupacion_esperada': bucket_overlap(service_start, service_end, bucket_starts, bucket_minutes)
+    })
+    logger.info(f"Forecast {len(bookings)} bookings over {len(bucket_starts)} buckets")
+    return forecast, bookings
+
+# ─────────────────────────────────────────────────────────────
+# 3. Service Time Model per Bulto
+# ─────────────────────────────────────────────────────────────
+SERVICE_MODEL_MIN_SAMPLES = 5   # Completed services needed for a provider-specific fit
+SERVICE_ANOMALY_SIGMA = 2.0     # Residual standard deviations above the fit flagged as slow
+
+def fit_service_line(bultos, atencion):
+    """Least-squares fit atencion = setup + per_bulto * bultos, with the residual std"""
+    design = np.column_stack([np.ones_like(bultos), bultos])
+    (setup, per_bulto), _, rank, _ = np.linalg.lstsq(design, atencion, rcond=None)
+    if rank < 2:
+        # Every record has the same bultos: no slope, mean service time as setup
+        setup, per_bulto = atencion.mean(), 0.0
+    residuals = atencion - (setup + per_bulto * bultos)
+    return {
+        'setup': float(setup),
+        'per_bulto': float(per_bulto),
+        'residual_std': float(residuals.std()),
+        'samples': len(atencion)
+    }
+
+class ServiceTimeModel:
+    """Expected Tiempo_atencion from Numero_de_bultos, per provider with an overall fallback"""
+
+    def __init__(self, coefficients, overall):
+        self.coefficients = coefficients  # Proveedor -> fit dict
+        self.overall = overall            # Fit over every provider, None without data
+
+    def _fit_for(self, provider):
+        return self.coefficients.get(str(provider).strip(), self.overall)
+
+    def predict(self, provider, bultos):
+        """Expected service minutes (at least 1), None without a usable fit or bultos"""
+        fit = self._fit_for(provider)
+        bultos = pd.to_numeric(bultos, errors='coerce')
+        if fit is None or pd.isna(bultos):
+            return None
+        return max(1.0, fit['setup'] + fit['per_bulto'] * float(bultos))
+
+    def is_slow(self, provider, bultos, tiempo_atencion):
+        """True when the service took unusually long for its bultos"""
+        expected = self.predict(provider, bultos)
+        tiempo_atencion = pd.to_numeric(tiempo_atencion, errors='coerce')
+        if expected is None or pd.isna(tiempo_atencion):
+            return False
+        fit = self._fit_for(provider)
+        return float(tiempo_atencion) > expected + SERVICE_ANOMALY_SIGMA * max(fit['residual_std'], 1.0)
+
+def fit_service_time_model(gestion_df):
+    """Fit the per-bulto service model on completed records with bultos and service time"""
+    records = pd.DataFrame({
+        'Proveedor': gestion_df['Proveedor'].astype(str).str.strip(),
+        'bultos': pd.to_numeric(gestion_df['Numero_de_bultos'], errors='coerce'),
+        'atencion': pd.to_numeric(gestion_df['Tiempo_atencion'], errors='coerce')
+    }) if not gestion_df.empty else pd.DataFrame(columns=['Proveedor', 'bultos', 'atencion'])
+    records = records[(records['bultos'] > 0) & (records['atencion'] > 0)]
+    if records.empty:
+        return ServiceTimeModel({}, None)
+
+    overall = fit_service_line(records['bultos'].to_numpy(dtype=float), records['atencion'].to_numpy(dtype=float))
+    coefficients = {
+        provider: fit_service_line(group['bultos'].to_numpy(dtype=float), group['atencion'].to_numpy(dtype=float))
+        for provider, group in records.groupby('Proveedor')
+        if len(group) >= SERVICE_MODEL_MIN_SAMPLES
+    }
+    logger.info(f"Fitted service time model for {len(coefficients)} providers on {len(records)} records")
+    return ServiceTimeModel(coefficients, overall)
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def get_service_time_model(_gestion_df, data_version):
+    """Service time model fitted once per data version and shared by all sessions"""
+    return fit_service_time_model(_gestion_df)
@@ -0,0 +1,258 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from sheets_data import parse_booked_start_time, parse_datetime_series
+from time_utils import parse_single_time, parse_time_range, parse_time_slots
+
+logger = logging.getLogger('provider_control_app')
+
+# ─────────────────────────────────────────────────────────────
+# 1. Sweep-Line Occupancy
+# ─────────────────────────────────────────────────────────────
+def sweep_line_counts(starts, ends):
+    """Concurrent interval count as a step function: (change times, count from each time on)
+
+    One sort over the 2n endpoints and a cumulative sum, O(n log n). At
+    equal times ends are applied before starts, so back-to-back intervals
+    do not overlap.
+    """
+    starts = np.asarray(starts, dtype='datetime64[ns]')
+    ends = np.asarray(ends, dtype='datetime64[ns]')
+    if starts.size == 0:
+        return np.array([], dtype='datetime64[ns]'), np.array([], dtype=np.int64)
+
+    times = np.concatenate([starts, ends])
+    deltas = np.concatenate([np.ones(starts.size, dtype=np.int64), -np.ones(ends.size, dtype=np.int64)])
+    order = np.lexsort((deltas, times))
+    times, counts = times[order], np.cumsum(deltas[order])
+
+    # Keep the count after the last change at each distinct time
+    last_at_time = np.append(times[1:] != times[:-1], True)
+    return times[last_at_time], counts[last_at_time]
+
+def counts_at(times, step_times, step_counts):
+    """Value of a step function at the given times (0 before its first change)"""
+    positions = np.searchsorted(step_times, times, side='right') - 1
+    return np.where(positions >= 0, step_counts[np.clip(positions, 0, None)], 0)
+
+def day_intervals(gestion_df, day, now=None):
+    """Waiting and in-service intervals of the orders that arrived on day
+
+    Intervals still open (no service start or end yet) run until now when
+    it falls on that day, and are left out otherwise.
+    """
+    llegada = parse_datetime_series(gestion_df['Hora_llegada'])
+    on_day = llegada.dt.date == day
+    records = gestion_df[on_day]
+    llegada = llegada[on_day]
+    inicio = parse_datetime_series(records['Hora_inicio_atencion'])
+    fin = parse_datetime_series(records['Hora_fin_atencion'])
+
+    # Sheet times are naive Bolivia local times
+    open_end = pd.Timestamp(now.replace(tzinfo=None)) if now is not None and now.date() == day else pd.NaT
+    intervals = pd.concat([
+        pd.DataFrame({
+            'Orden_de_compra': records['Orden_de_compra'].astype(str),
+            'Proveedor': records['Proveedor'].astype(str),
+            'Estado': 'En espera',
+            'Inicio': llegada,
+            'Fin': inicio.fillna(open_end)
+        }),
+        pd.DataFrame({
+            'Orden_de_compra': records['Orden_de_compra'].astype(str),
+            'Proveedor': records['Proveedor'].astype(str),
+            'Estado': 'En atención',
+            'Inicio': inicio,
+            'Fin': fin.where(inicio.notna()).fillna(open_end)
+        })
+    ], ignore_index=True)
+
+    intervals = intervals[intervals['Inicio'].notna() & intervals['Fin'].notna() & (intervals['Fin'] >= intervals['Inicio'])]
+    return intervals.sort_values(['Inicio', 'Estado']).reset_index(drop=True)
+
+def occupancy_timeline(intervals):
+    """Trucks waiting and in service after every change in the day, from the interval endpoints"""
+    if intervals.empty:
+        return pd.DataFrame(columns=['Hora', 'En_espera', 'En_atencion'])
+
+    steps = {}
+    for estado in ['En espera', 'En atención']:
+        state_intervals = intervals[intervals['Estado'] == estado]
+        steps[estado] = sweep_line_counts(state_intervals['Inicio'].to_numpy(), state_intervals['Fin'].to_numpy())
+
+    times = np.unique(np.concatenate([step_times for step_times, _ in steps.values()]))
+    return pd.DataFrame({
+        'Hora': times,
+        'En_espera': counts_at(times, *steps['En espera']),
+        'En_atencion': counts_at(times, *steps['En atención'])
+    })
+
+def build_day_occupancy(gestion_df, day, now=None):
+    """Intervals and occupancy timeline for one day"""
+    intervals = day_intervals(gestion_df, day, now)
+    timeline = occupancy_timeline(intervals)
+    logger.info(f"Occupancy timeline for {day}: {len(intervals)} intervals, {len(timeline)} changes")
+    return intervals, timeline
+
+# ─────────────────────────────────────────────────────────────
+# 2. Reservation Interval Index
+# ─────────────────────────────────────────────────────────────
+RESERVATION_SLOT_MINUTES = 30   # Length of one bookable slot
+DEFAULT_DOCK_CAPACITY = 1       # Reservations the docks take at once, without a DOCK_CAPACITY secret
+
+def dock_capacity():
+    """Concurrent reservations the docks can take (DOCK_CAPACITY secret)"""
+    return int(st.secrets.get("DOCK_CAPACITY", DEFAULT_DOCK_CAPACITY))
+
+def reservation_slots(hora_str, slot_minutes=RESERVATION_SLOT_MINUTES):
+    """Booked intervals of a reservas Hora value as (start, end) minutes from midnight
+
+    "09:00, 09:30, 10:00" books every listed slot, "09:00-10:00" the whole
+    range and a single time one slot. Back-to-back slots are merged.
+    """
+    hora_str = str(hora_str).strip()
+    slot_times = parse_time_slots(hora_str)
+    if slot_times:
+        intervals = [(t.hour * 60 + t.minute, t.hour * 60 + t.minute + slot_minutes) for t in slot_times]
+    else:
+        start = parse_single_time(hora_str) or parse_time_range(hora_str) or parse_booked_start_time(hora_str)
+        if start is None:
+            return []
+        end = parse_single_time(hora_str.split('-')[-1]) if '-' in hora_str else None
+        start_minutes = start.hour * 60 + start.minute
+        end_minutes = end.hour * 60 + end.minute if end else start_minutes + slot_minutes
+        intervals = [(start_minutes, max(end_minutes, start_minutes + slot_minutes))]
+
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def expand_reservations(reservas_df, slot_minutes=RESERVATION_SLOT_MINUTES):
+    """One row per booked interval of every reservation: Orden_de_compra, Proveedor, Inicio, Fin"""
+    columns = ['Orden_de_compra', 'Proveedor', 'Inicio', 'Fin']
+    if reservas_df is None or reservas_df.empty:
+        return pd.DataFrame(columns=columns)
+
+    fecha = pd.to_datetime(
+        reservas_df['Fecha'].astype(str).str.extract(r'(\d{4}-\d{2}-\d{2})', expand=False), errors='coerce'
+    )
+    hora_text = reservas_df['Hora'].astype(str).str.strip()
+    # Parse each distinct Hora string only once
+    slots_by_hora = {hora_str: reservation_slots(hora_str, slot_minutes) for hora_str in hora_text.unique()}
+
+    bookings = pd.DataFrame({
+        'Orden_de_compra': reservas_df['Orden_de_compra'].astype(str).str.strip(),
+        'Proveedor': reservas_df['Proveedor'].astype(str).str.strip(),
+        'fecha': fecha,
+        'slots': hora_text.map(slots_by_hora)
+    })
+    bookings = bookings[bookings['fecha'].notna()].drop_duplicates('Orden_de_compra', keep='last')
+    bookings = bookings.explode('slots').dropna(subset=['slots'])
+    if bookings.empty:
+        return pd.DataFrame(columns=columns)
+
+    minutes = np.array(bookings['slots'].tolist(), dtype=float)
+    bookings['Inicio'] = bookings['fecha'] + pd.to_timedelta(minutes[:, 0], unit='m')
+    bookings['Fin'] = bookings['fecha'] + pd.to_timedelta(minutes[:, 1], unit='m')
+    return bookings[columns].reset_index(drop=True)
+
+class ReservationIndex:
+    """Booked intervals in sorted arrays for conflict, load and capacity queries
+
+    Intervals are sorted by start. None is longer than max_duration, so
+    the ones overlapping [start, end) have their start in
+    [start - max_duration, end), found with two binary searches. The
+    concurrent load is a sweep-line step function built once.
+    """
+
+    def __init__(self, intervals):
+        self.intervals = intervals.sort_values(['Inicio', 'Fin']).reset_index(drop=True)
+        self.starts = self.intervals['Inicio'].to_numpy(dtype='datetime64[ns]')
+        self.ends = self.intervals['Fin'].to_numpy(dtype='datetime64[ns]')
+        self.sorted_ends = np.sort(self.ends)
+        self.max_duration = (self.ends - self.starts).max() if len(self.starts) else np.timedelta64(0, 'ns')
+        self.step_times, self.step_counts = sweep_line_counts(self.starts, self.ends)
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def overlapping(self, start, end):
+        """Positions of the intervals overlapping [start, end)"""
+        start, end = np.datetime64(pd.Timestamp(start), 'ns'), np.datetime64(pd.Timestamp(end), 'ns')
+        lo = np.searchsorted(self.starts, start - self.max_duration, side='left')
+        hi = np.searchsorted(self.starts, end, side='left')
+        return lo + np.flatnonzero(self.ends[lo:hi] > start)
+
+    def conflicts(self, start, end, exclude_orden=None):
+        """Reservations booked at some point of [start, end), optionally leaving one order out"""
+        conflicts = self.intervals.iloc[self.overlapping(start, end)]
+        if exclude_orden is not None:
+            conflicts = conflicts[conflicts['Orden_de_compra'] != str(exclude_orden).strip()]
+        return conflicts
+
+    def load_at(self, times):
+        """Reservations booked at each of the given times"""
+        return counts_at(np.asarray(times, dtype='datetime64[ns]'), self.step_times, self.step_counts)
+
+    def slot_load(self, start, end, slot_minutes=RESERVATION_SLOT_MINUTES):
+        """Reservations overlapping each slot of [start, end), and the peak booked at once within it"""
+        slot_starts = pd.date_range(start, end, freq=f'{slot_minutes}min', inclusive='left').to_numpy(dtype='datetime64[ns]')
+        slot_ends = slot_starts + np.timedelta64(slot_minutes, 'm')
+        # Started before the slot ends minus ended by the time it starts
+        reservas = (
+            np.searchsorted(self.starts, slot_ends, side='left')
+            - np.searchsorted(self.sorted_ends, slot_starts, side='right')
+        )
+
+        # Peak = load at the slot start or at any change inside the slot
+        peak = self.load_at(slot_starts)
+        if len(self.step_times):
+            change_slot = np.searchsorted(slot_starts, self.step_times, side='right') - 1
+            inside = (change_slot >= 0) & (self.step_times < slot_ends[np.clip(change_slot, 0, None)])
+            np.maximum.at(peak, change_slot[inside], self.step_counts[inside])
+        return pd.DataFrame({'Slot': slot_starts, 'Reservas': reservas, 'Simultaneas': peak})
+
+    def overbooked(self, capacity, start=None, end=None):
+        """Windows where more than capacity reservations are booked at once, with the orders involved"""
+        columns = ['Inicio', 'Fin', 'Reservas', 'Ordenes']
+        over = self.step_counts > capacity
+        if not over.any():
+            return pd.DataFrame(columns=columns)
+
+        # A window runs from an over-capacity change to the next change back within capacity
+        window_start = over & np.append(True, ~over[:-1])
+        window_end = ~over & np.append(False, over[:-1])
+        starts = self.step_times[window_start]
+        ends = self.step_times[window_end]
+        window_ids = np.cumsum(window_start)[over] - 1
+        peaks = np.zeros(len(starts), dtype=np.int64)
+        np.maximum.at(peaks, window_ids, self.step_counts[over])
+
+        windows = pd.DataFrame({'Inicio': starts, 'Fin': ends, 'Reservas': peaks})
+        if start is not None:
+            windows = windows[windows['Fin'] > pd.Timestamp(start)]
+        if end is not None:
+            windows = windows[windows['Inicio'] < pd.Timestamp(end)]
+        windows['Ordenes'] = [
+            ', '.join(self.intervals['Orden_de_compra'].iloc[self.overlapping(s, e)].unique())
+            for s, e in zip(windows['Inicio'], windows['Fin'])
+        ]
+        return windows.reset_index(drop=True)
+
+def build_reservation_index(reservas_df, slot_minutes=RESERVATION_SLOT_MINUTES):
+    """Interval index over every reservation in reservas_df"""
+    index = ReservationIndex(expand_reservations(reservas_df, slot_minutes))
+    logger.info(f"Reservation index: {len(index)} booked intervals")
+    return index
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def get_reservation_index(_reservas_df, data_version):
+    """Reservation index built once per data version and shared by all sessions"""
+    return build_reservation_index(_reservas_df)
@@ -0,0 +1,49 @@
+import argparse
+import logging
+import sys
+
+import pandas as pd
+
+from sheets_data import BULK_UPDATE_CHUNK_CELLS, EVENTS_SHEET, event_sourcing_enabled, recompute_gestion_metrics
+
+# ─────────────────────────────────────────────────────────────
+# Recompute Tiempo_espera/atencion/total/retraso, numero_de_semana and
+# hora_de_reserva for the whole gestion sheet after reservation fixes
+# Usage: python recompute_metrics.py [--dry-run] [--chunk-size 1000]
+# ─────────────────────────────────────────────────────────────
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger('provider_control_app')
+
+# Same pandas mode as the app, so the metric code behaves identically here
+pd.options.mode.copy_on_write = True
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcular métricas derivadas de proveedor_gestion")
+    parser.add_argument("--dry-run", action="store_true", help="Mostrar cambios sin escribir en Google Sheets")
+    parser.add_argument("--chunk-size", type=int, default=BULK_UPDATE_CHUNK_CELLS, help="Celdas por escritura")
+    args = parser.parse_args()
+
+    cell_updates = recompute_gestion_metrics(dry_run=args.dry_run, chunk_size=args.chunk_size)
+    if event_sourcing_enabled():
+        # Event rows: [Evento_id, Tipo, Orden_de_compra, Registrado, Datos]
+        for event in cell_updates[:20]:
+            logger.info(f"{event[2]} -> {event[4]}")
+        unit = f"orders via {EVENTS_SHEET} events"
+    else:
+        for update in cell_updates[:20]:
+            logger.info(f"{update['range']} -> {update['values'][0][0]}")
+        unit = "cells"
+    if len(cell_updates) > 20:
+        logger.info(f"... and {len(cell_updates) - 20} more")
+    logger.info(f"{'Would update' if args.dry_run else 'Updated'} {len(cell_updates)} {unit}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
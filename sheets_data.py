@@ -0,0 +1,1790 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as dt_time, timezone
+
+import gspread
+import numpy as np
+import pandas as pd
+import requests
+import streamlit as st
+from google.auth.transport.requests import AuthorizedSession, Request as GoogleAuthRequest
+from google.oauth2.service_account import Credentials
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from write_log import WriteAheadLog
+from time_utils import (
+    get_bolivia_now, get_bolivia_today,
+    parse_time_range, parse_single_time, parse_combined_time_slots,
+    calculate_time_difference, combine_date_time,
+    format_datetime_no_zero_padding, parse_datetime_flexible
+)
+
+logger = logging.getLogger('provider_control_app')
+
+# ─────────────────────────────────────────────────────────────
+# 1. Google Sheets Configuration - WITH LOGGING
+# ─────────────────────────────────────────────────────────────
+SHEETS_POOL_SIZE = 10               # Keep-alive connections per Google host
+SHEETS_HTTP_TIMEOUT = 30            # Seconds before a Sheets call is abandoned
+TOKEN_REFRESH_MARGIN_SECONDS = 300  # Refresh the access token this long before it expires
+
+class SheetsConnection:
+    """Authorized gspread client on an explicitly pooled keep-alive HTTP session"""
+
+    def __init__(self, credentials):
+        self.credentials = credentials
+        self.session = AuthorizedSession(credentials)
+        self.adapter = HTTPAdapter(
+            pool_connections=SHEETS_POOL_SIZE,
+            pool_maxsize=SHEETS_POOL_SIZE,
+            max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+        )
+        self.session.mount("https://", self.adapter)
+        self.client = gspread.Client(auth=credentials, session=self.session)
+        self.client.set_timeout(SHEETS_HTTP_TIMEOUT)
+        # Token refreshes go through a plain session: the authorized one would
+        # attach the current bearer token and could try to refresh itself
+        self.token_session = requests.Session()
+        self.token_refreshes = 0
+        self._token_lock = threading.Lock()
+
+    def _token_expiring(self):
+        expiry = self.credentials.expiry
+        if not self.credentials.token or expiry is None:
+            return True
+        # google-auth stores expiry as naive UTC
+        remaining = (expiry - datetime.now(timezone.utc).replace(tzinfo=None)).total_seconds()
+        return remaining < TOKEN_REFRESH_MARGIN_SECONDS
+
+    def ensure_token_fresh(self):
+        """Refresh the access token ahead of expiry so no save pays for it"""
+        if not self._token_expiring():
+            return
+        with self._token_lock:
+            if self._token_expiring():
+                self.credentials.refresh(GoogleAuthRequest(self.token_session))
+                self.token_refreshes += 1
+                logger.info(f"Refreshed Google access token (refresh #{self.token_refreshes}), expires {self.credentials.expiry}")
+
+    def health(self):
+        """Token and connection pool metrics for monitoring"""
+        pools = [self.adapter.poolmanager.pools[key] for key in self.adapter.poolmanager.pools.keys()]
+        connections_opened = sum(pool.num_connections for pool in pools)
+        requests_sent = sum(pool.num_requests for pool in pools)
+        expiry = self.credentials.expiry
+        return {
+            'token_valid': bool(self.credentials.valid),
+            'token_seconds_left': int((expiry - datetime.now(timezone.utc).replace(tzinfo=None)).total_seconds()) if expiry else None,
+            'token_refreshes': self.token_refreshes,
+            'pool_size': SHEETS_POOL_SIZE,
+            'hosts': len(pools),
+            'connections_opened': connections_opened,
+            'requests_sent': requests_sent,
+            'connection_reuse': round(1 - connections_opened / requests_sent, 3) if requests_sent else None,
+        }
+
+@st.cache_resource
+def setup_google_sheets():
+    """Configurar conexión a Google Sheets"""
+    logger.info("Starting Google Sheets connection setup")
+    try:
+        credentials_info = dict(st.secrets["google_service_account"])
+        logger.info("Successfully loaded Google service account credentials from secrets")
+        
+        scopes = [
+            "https://www.googleapis.com/auth/spreadsheets",
+            "https://www.googleapis.com/auth/drive"
+        ]
+        
+        credentials = Credentials.from_service_account_info(credentials_info, scopes=scopes)
+        logger.info("Successfully created credentials with required scopes")
+        
+        connection = SheetsConnection(credentials)
+        connection.ensure_token_fresh()
+        logger.info(f"Successfully authorized gspread client on pooled session (pool size {SHEETS_POOL_SIZE}, timeout {SHEETS_HTTP_TIMEOUT}s)")
+        
+        return connection
+    except KeyError as e:
+        logger.error(f"Missing required secret key: {str(e)}")
+        st.error(f"❌ Error: Missing configuration - {str(e)}")
+        return None
+    except Exception as e:
+        logger.error(f"Error setting up Google Sheets connection: {str(e)}")
+        st.error(f"❌ Error conectando: {str(e)}")
+        return None
+
+def get_sheets_connection_health():
+    """Health and pool metrics of the shared Google Sheets connection"""
+    connection = setup_google_sheets()
+    if not connection:
+        return {'connected': False}
+    return {'connected': True, **connection.health()}
+
+# ─────────────────────────────────────────────────────────────
+# 2. Google Sheets Download Functions - WITH LOGGING
+# ─────────────────────────────────────────────────────────────
+GESTION_COLUMNS = [
+    'Orden_de_compra', 'Proveedor', 'Numero_de_bultos',
+    'Hora_llegada', 'Hora_inicio_atencion', 'Hora_fin_atencion',
+    'Tiempo_espera', 'Tiempo_atencion', 'Tiempo_total', 'Tiempo_retraso',
+    'numero_de_semana', 'hora_de_reserva'
+]
+
+# Columns that update_sheets_record may change (0-based index, D..L)
+GESTION_UPDATABLE_COLUMNS = {
+    col: GESTION_COLUMNS.index(col) for col in GESTION_COLUMNS[3:]
+}
+
+DATA_CACHE_TTL_SECONDS = 60  # Reduced TTL for real-time management; a freshness probe runs when it lapses
+
+CREDENTIALS_SHEET = "proveedor_credencial"
+RESERVAS_SHEET = "proveedor_reservas"
+GESTION_SHEET = "proveedor_gestion"
+ALL_SHEETS = (CREDENTIALS_SHEET, RESERVAS_SHEET, GESTION_SHEET)
+
+# Each sheet is cached on its own; credentials rarely change and no view reads them
+SHEET_TTL_SECONDS = {
+    CREDENTIALS_SHEET: 3600,
+    RESERVAS_SHEET: DATA_CACHE_TTL_SECONDS,
+    GESTION_SHEET: DATA_CACHE_TTL_SECONDS,
+}
+
+RESERVAS_COLUMNS = ['Fecha', 'Hora', 'Proveedor', 'Numero_de_bultos', 'Orden_de_compra']
+
+# What each view reads: sheet -> columns and, for reservas, a window of
+# days from today (start, end exclusive). None means the whole sheet.
+VIEW_DATA_SPECS = {
+    'registro': {
+        RESERVAS_SHEET: {'columns': RESERVAS_COLUMNS, 'days': (0, 1)},
+        GESTION_SHEET: {'columns': GESTION_COLUMNS, 'days': None},
+    },
+    'dashboard': {
+        # Today plus the days covered by the occupancy forecast
+        RESERVAS_SHEET: {'columns': RESERVAS_COLUMNS, 'days': (0, 3)},
+        GESTION_SHEET: {'columns': GESTION_COLUMNS, 'days': None},
+    },
+}
+
+class SharedDataStore:
+    """Process-wide read-only snapshots of the sheets, shared by every session
+
+    Each sheet is loaded on first use and expires on its own TTL, so a
+    reader only pays for the sheets it asks for. version increases
+    whenever any sheet is reloaded and keys the derived caches.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.frames = {}          # sheet -> DataFrame
+        self.loaded_at = {}       # sheet -> monotonic time of the last load or probe
+        self.stale = set(ALL_SHEETS)
+        self.modified_time = {}   # sheet -> Drive modifiedTime seen before its last load
+        self.version = 0
+        self._views = {}          # view -> (cache key, frames)
+        self._order_index = (None, {})  # (version, Orden_de_compra -> gestion row position)
+
+    def _is_fresh(self, sheet):
+        return (
+            sheet not in self.stale
+            and sheet in self.frames
+            and (time.monotonic() - self.loaded_at[sheet]) < SHEET_TTL_SECONDS[sheet]
+        )
+
+    def is_fresh(self, sheets=(RESERVAS_SHEET, GESTION_SHEET)):
+        """True while the given sheets are loaded, not invalidated and within their TTL"""
+        return all(self._is_fresh(sheet) for sheet in sheets)
+
+    def get_sheets(self, sheets):
+        """Return zero-copy views of the requested frames, reloading stale ones once; None on failure"""
+        if not self.is_fresh(sheets):
+            with self._lock:
+                # Another session may have reloaded while we waited for the lock
+                expired = [sheet for sheet in sheets if not self._is_fresh(sheet)]
+                to_load, modified_time = self._changed_since_load(expired) if expired else ([], None)
+                if to_load and not self._reload(to_load, modified_time):
+                    return None
+
+        # Shallow copies share memory with the store; under copy-on-write any
+        # mutation by a session copies the touched column instead of the store
+        return [self.frames[sheet].copy(deep=False) for sheet in sheets]
+
+    def get_view_frames(self, view):
+        """Frames for a view, projected to its columns and date window, in VIEW_DATA_SPECS order"""
+        spec = VIEW_DATA_SPECS[view]
+        frames = self.get_sheets(list(spec))
+        if frames is None:
+            return None
+        
+        cache_key = (self.version, get_bolivia_today())
+        cached = self._views.get(view)
+        if cached and cached[0] == cache_key:
+            return [frame.copy(deep=False) for frame in cached[1]]
+        
+        view_frames = [project_view_frame(frame, spec[sheet]) for sheet, frame in zip(spec, frames)]
+        self._views[view] = (cache_key, view_frames)
+        return [frame.copy(deep=False) for frame in view_frames]
+
+    def cached_gestion_record(self, orden_compra):
+        """First gestion row for an order from the snapshot already in memory (no network call), or None"""
+        # Frame and version must come from the same load, or the index points into the wrong rows
+        with self._lock:
+            gestion_df = self.frames.get(GESTION_SHEET)
+            data_version = self.version
+        if gestion_df is None:
+            return None
+        
+        version, index = self._order_index
+        if version != data_version:
+            orders = gestion_df['Orden_de_compra'].astype(str).str.strip()
+            # First row wins, like update_sheets_record and get_arrival_record_silent
+            index = dict(zip(orders[::-1], range(len(orders) - 1, -1, -1)))
+            self._order_index = (data_version, index)
+        
+        position = index.get(str(orden_compra).strip())
+        return gestion_df.iloc[position] if position is not None else None
+
+    def _changed_since_load(self, sheets):
+        """(sheets that must be reloaded, probed modifiedTime); expired sheets stay if it is unchanged
+
+        Sheets invalidated by the app's own writes always reload, since
+        Drive may report the new modifiedTime a few seconds late. The
+        modifiedTime is only recorded once the reload succeeds.
+        """
+        modified_time = probe_spreadsheet_modified_time()
+        to_load = []
+        for sheet in sheets:
+            unchanged = (
+                sheet not in self.stale
+                and sheet in self.frames
+                and modified_time is not None
+                and modified_time == self.modified_time.get(sheet)
+            )
+            if unchanged:
+                self.loaded_at[sheet] = time.monotonic()
+                logger.info(f"Spreadsheet unchanged since {modified_time}, keeping {sheet}")
+            else:
+                to_load.append(sheet)
+        return to_load, modified_time
+
+    def _reload(self, sheets, modified_time=None):
+        frames = _fetch_sheets_from_google(sheets)
+        if frames is None:
+            logger.error(f"Shared data store reload of {sheets} failed, keeping them stale")
+            return False
+
+        now = time.monotonic()
+        self.frames.update(frames)
+        for sheet in sheets:
+            self.loaded_at[sheet] = now
+            self.modified_time[sheet] = modified_time
+            self.stale.discard(sheet)
+        self.version += 1
+        logger.info(f"Shared data store reloaded {sheets}, version {self.version}")
+        return True
+
+    def invalidate(self, sheets=ALL_SHEETS):
+        """Mark sheets stale so the next reader reloads them"""
+        self.stale.update(sheets)
+        logger.info(f"Shared data store invalidated {list(sheets)} at version {self.version}")
+
+    def expire(self):
+        """End every TTL early so the next reader probes for changes and reloads only if needed"""
+        for sheet in self.loaded_at:
+            self.loaded_at[sheet] = 0.0
+
+def project_view_frame(frame, sheet_spec):
+    """Keep only a view's columns and, when it has one, its reservas date window"""
+    if sheet_spec['days'] is not None and 'Fecha' in frame.columns:
+        fecha = pd.to_datetime(
+            frame['Fecha'].astype(str).str.extract(r'(\d{4}-\d{2}-\d{2})', expand=False), errors='coerce'
+        )
+        today = pd.Timestamp(get_bolivia_today())
+        start_days, end_days = sheet_spec['days']
+        frame = frame[(fecha >= today + pd.Timedelta(days=start_days)) & (fecha < today + pd.Timedelta(days=end_days))]
+    columns = [col for col in sheet_spec['columns'] if col in frame.columns]
+    return frame[columns]
+
+@st.cache_resource
+def get_shared_data_store():
+    """Single SharedDataStore instance for the whole server process"""
+    logger.info("Creating shared data store")
+    return SharedDataStore()
+
+def load_sheets(*sheets):
+    """Get only the given sheets from the shared data store (a None per sheet on failure)"""
+    frames = get_shared_data_store().get_sheets(sheets)
+    return tuple(frames) if frames is not None else (None,) * len(sheets)
+
+def load_view_data(view):
+    """Reservas and gestion frames as declared for the view in VIEW_DATA_SPECS
+
+    Writes still waiting in the write-ahead log are applied on top of
+    gestion, so a saved arrival or service shows up right away.
+    """
+    frames = get_shared_data_store().get_view_frames(view)
+    if frames is None:
+        return (None,) * len(VIEW_DATA_SPECS[view])
+    
+    frames = dict(zip(VIEW_DATA_SPECS[view], frames))
+    if GESTION_SHEET in frames:
+        frames[GESTION_SHEET] = apply_pending_writes(frames[GESTION_SHEET], get_write_log_replayer().pending())
+    return tuple(frames.values())
+
+def invalidate_data_store(sheets=ALL_SHEETS):
+    """Force the next read of the given sheets to fetch fresh data"""
+    get_shared_data_store().invalidate(sheets)
+
+def refresh_data_store():
+    """Make the next read check for changes made outside the app"""
+    get_shared_data_store().expire()
+
+SHEETS_IO_WORKERS = 4  # Concurrent Google Sheets requests per server process
+
+@st.cache_resource
+def get_sheets_executor():
+    """Shared worker pool that multiplexes Google Sheets calls from all sessions"""
+    logger.info(f"Creating Google Sheets I/O pool with {SHEETS_IO_WORKERS} workers")
+    return ThreadPoolExecutor(max_workers=SHEETS_IO_WORKERS, thread_name_prefix="sheets-io")
+
+@st.cache_resource
+def get_spreadsheet():
+    """Open the configured spreadsheet once and reuse the handle for every call"""
+    connection = setup_google_sheets()
+    if not connection:
+        # Raise so cache_resource does not remember the failure
+        raise ConnectionError("Google Sheets connection not available")
+    
+    spreadsheet_name = st.secrets["GOOGLE_SHEET_NAME"]
+    logger.info(f"Attempting to open spreadsheet: {spreadsheet_name}")
+    spreadsheet = connection.client.open(spreadsheet_name)
+    logger.info(f"Successfully opened spreadsheet: {spreadsheet_name}")
+    return spreadsheet
+
+def open_worksheet(title):
+    """Get a worksheet from the shared spreadsheet, refreshing the token first if needed"""
+    setup_google_sheets().ensure_token_fresh()
+    return get_spreadsheet().worksheet(title)
+
+def probe_spreadsheet_modified_time():
+    """Drive modifiedTime of the spreadsheet (one small metadata call), None if unavailable"""
+    try:
+        setup_google_sheets().ensure_token_fresh()
+        return get_spreadsheet().get_lastUpdateTime()
+    except Exception as e:
+        logger.warning(f"Spreadsheet freshness probe failed, falling back to a full reload: {str(e)}")
+        return None
+
+# Columns read as numbers (ints stay ints, blanks stay ''), like get_all_records did;
+# every other column is text
+SHEET_NUMBER_COLUMNS = {
+    CREDENTIALS_SHEET: [],
+    RESERVAS_SHEET: ['Numero_de_bultos'],
+    GESTION_SHEET: [
+        'Numero_de_bultos', 'Tiempo_espera', 'Tiempo_atencion', 'Tiempo_total',
+        'Tiempo_retraso', 'numero_de_semana', 'hora_de_reserva'
+    ],
+}
+
+# Range fetched per sheet (None reads every used column)
+SHEET_RANGES = {
+    CREDENTIALS_SHEET: None,
+    RESERVAS_SHEET: None,
+    GESTION_SHEET: 'A:L',
+}
+
+def numericise_series(series):
+    """Numbers where the text parses as one (integral values as int), the text itself otherwise"""
+    numbers = pd.to_numeric(series, errors='coerce')
+    result = series.astype(object)
+    is_number = numbers.notna()
+    is_integer = is_number & (numbers % 1 == 0)
+    result[is_integer] = numbers[is_integer].astype(np.int64).astype(object)
+    result[is_number & ~is_integer] = numbers[is_number & ~is_integer].astype(object)
+    return result
+
+def columns_to_frame(columns, number_columns, empty_columns):
+    """DataFrame from column-major sheet values (header first), one array per column"""
+    columns = [column for column in columns if column and str(column[0]).strip()]
+    if not columns or max(len(column) for column in columns) <= 1:
+        return pd.DataFrame(columns=empty_columns)
+    
+    # The API trims trailing empty cells, so pad every column to the row count
+    row_count = max(len(column) for column in columns) - 1
+    data = {}
+    for column in columns:
+        values = column[1:] + [''] * (row_count - len(column) + 1)
+        name = str(column[0]).strip()
+        series = pd.Series(values, dtype=object)
+        data[name] = numericise_series(series) if name in number_columns else series.astype(str)
+    return pd.DataFrame(data)
+
+def _load_sheet_frame(spreadsheet, sheet, empty_columns):
+    """Read one worksheet's values in a single column-major call and build its DataFrame"""
+    worksheet = spreadsheet.worksheet(sheet)
+    columns = worksheet.get(SHEET_RANGES[sheet], major_dimension='COLUMNS')
+    df = columns_to_frame(columns, SHEET_NUMBER_COLUMNS[sheet], empty_columns)
+    logger.info(f"Loaded {sheet} DataFrame with shape: {df.shape}")
+    return df
+
+GESTION_STREAM_CHUNK_ROWS = 5000   # Rows per range request when streaming gestion
+GESTION_STREAM_MIN_ROWS = 20000    # Gestion sheets with more grid rows are streamed
+
+def iter_sheet_chunks(worksheet, last_column, last_row, chunk_rows):
+    """Yield (row count, column-major values) of successive row ranges below the header, up to last_row
+
+    Blank rows inside a range are trimmed by the API only at its end, so the
+    row count tells the caller how far to pad to keep positions.
+    """
+    for first_row in range(2, last_row + 1, chunk_rows):
+        chunk_last_row = min(first_row + chunk_rows - 1, last_row)
+        columns = worksheet.get(f"A{first_row}:{last_column}{chunk_last_row}", major_dimension='COLUMNS')
+        yield chunk_last_row - first_row + 1, columns
+
+def stream_sheet_frame(worksheet, header, number_columns, chunk_rows=GESTION_STREAM_CHUNK_ROWS):
+    """Build a DataFrame chunk by chunk into preallocated arrays, keeping one chunk of raw values in memory
+
+    header is positional, one name per sheet column; columns with a blank
+    name are skipped like columns_to_frame does.
+    """
+    # Column A always holds the order, so its length is the last used row
+    last_row = len(worksheet.col_values(1))
+    capacity = max(last_row - 1, 0)
+    last_column = gspread.utils.rowcol_to_a1(1, len(header)).rstrip('0123456789')
+    arrays = {name: np.empty(capacity, dtype=object) for name in header if name}
+    filled = 0
+    
+    for chunk_len, columns in iter_sheet_chunks(worksheet, last_column, last_row, chunk_rows):
+        # Trailing empty cells and columns are trimmed by the API
+        columns = columns + [[]] * (len(header) - len(columns))
+        for name, column in zip(header, columns):
+            if not name:
+                continue
+            values = pd.Series(column + [''] * (chunk_len - len(column)), dtype=object)
+            if name in number_columns:
+                values = numericise_series(values)
+            arrays[name][filled:filled + chunk_len] = values.to_numpy(dtype=object)
+        filled += chunk_len
+        logger.info(f"Streamed {worksheet.title}: {filled} of {capacity} rows loaded")
+    
+    return pd.DataFrame({
+        name: values if name in number_columns else pd.Series(values).astype(str)
+        for name, values in arrays.items()
+    })
+
+def _load_credentials_sheet(spreadsheet):
+    """Load proveedor_credencial into a DataFrame"""
+    logger.info("Loading credentials sheet...")
+    try:
+        return _load_sheet_frame(spreadsheet, CREDENTIALS_SHEET, ['usuario', 'password', 'Email', 'cc'])
+    except gspread.WorksheetNotFound:
+        logger.warning("Credentials worksheet not found, creating empty DataFrame")
+        return pd.DataFrame(columns=['usuario', 'password', 'Email', 'cc'])
+
+def _load_reservas_sheet(spreadsheet):
+    """Load proveedor_reservas into a DataFrame"""
+    logger.info("Loading reservas sheet...")
+    try:
+        return _load_sheet_frame(spreadsheet, RESERVAS_SHEET, RESERVAS_COLUMNS)
+    except gspread.WorksheetNotFound:
+        logger.warning("Reservas worksheet not found, creating empty DataFrame")
+        return pd.DataFrame(columns=RESERVAS_COLUMNS)
+
+def _load_gestion_sheet(spreadsheet):
+    """Load or create proveedor_gestion; returns (DataFrame, warning message or None)"""
+    logger.info("Loading gestion sheet...")
+    try:
+        gestion_ws = spreadsheet.worksheet(GESTION_SHEET)
+        if gestion_ws.row_count > GESTION_STREAM_MIN_ROWS:
+            # Large history: bounded-memory load in row chunks
+            header = [str(name).strip() for name in gestion_ws.row_values(1)[:len(GESTION_COLUMNS)]]
+            gestion_df = stream_sheet_frame(gestion_ws, header if any(header) else GESTION_COLUMNS, SHEET_NUMBER_COLUMNS[GESTION_SHEET])
+            logger.info(f"Loaded {GESTION_SHEET} DataFrame with shape: {gestion_df.shape}")
+        else:
+            gestion_df = _load_sheet_frame(spreadsheet, GESTION_SHEET, GESTION_COLUMNS)
+    except gspread.WorksheetNotFound:
+        logger.warning("Gestion worksheet not found, attempting to create it")
+        # Create gestion sheet if it doesn't exist
+        try:
+            gestion_ws = spreadsheet.add_worksheet("proveedor_gestion", rows=200, cols=12)
+            logger.info("Successfully created new gestion worksheet")
+            
+            # Add headers
+            headers = GESTION_COLUMNS
+            gestion_ws.update(values=[headers], range_name='A1:L1')
+            logger.info("Successfully added headers to new gestion worksheet")
+            
+            gestion_df = pd.DataFrame(columns=headers)
+        except Exception as e:
+            logger.error(f"Failed to create gestion worksheet: {str(e)}")
+            return pd.DataFrame(columns=GESTION_COLUMNS), f"No se pudo crear hoja de gestión: {e}"
+    return gestion_df, None
+
+def _load_current_gestion_sheet(spreadsheet):
+    """Current gestion state (materialized from events when enabled); returns (DataFrame, warning or None)"""
+    if event_sourcing_enabled():
+        return get_gestion_materializer().refresh(spreadsheet)
+    return _load_gestion_sheet(spreadsheet)
+
+SHEET_LOADERS = {
+    CREDENTIALS_SHEET: _load_credentials_sheet,
+    RESERVAS_SHEET: _load_reservas_sheet,
+    GESTION_SHEET: _load_current_gestion_sheet,
+}
+
+def _fetch_sheets_from_google(sheets=ALL_SHEETS):
+    """Download the given sheets from Google Sheets; dict of sheet -> DataFrame, None on failure"""
+    logger.info(f"Starting data download from Google Sheets: {list(sheets)}")
+    try:
+        spreadsheet = get_spreadsheet()
+        setup_google_sheets().ensure_token_fresh()
+        
+        # The worksheets are independent, so read them concurrently
+        executor = get_sheets_executor()
+        futures = {sheet: executor.submit(SHEET_LOADERS[sheet], spreadsheet) for sheet in sheets}
+        frames = {sheet: future.result() for sheet, future in futures.items()}
+        if GESTION_SHEET in frames:
+            # Pool workers have no Streamlit script context, so warn from the calling thread
+            frames[GESTION_SHEET], gestion_warning = frames[GESTION_SHEET]
+            if gestion_warning:
+                st.warning(gestion_warning)
+        
+        logger.info(f"Data download complete. DataFrames - {', '.join(f'{sheet}: {frame.shape}' for sheet, frame in frames.items())}")
+        return frames
+        
+    except Exception as e:
+        logger.error(f"Critical error during data download: {str(e)}")
+        st.error(f"Error descargando datos: {str(e)}")
+        return None
+
+class WriteRejected(Exception):
+    """A logged write that must not be applied (conflict or missing record); the message is for the operator"""
+
+def save_gestion_to_sheets(new_record):
+    """Save new management record to Google Sheets (called by the write log replayer) - WITH LOGGING"""
+    logger.info(f"Starting save operation for new gestion record: {new_record.get('Orden_de_compra', 'UNKNOWN_ORDER')}")
+    
+    try:
+        # Load current data
+        reservas_df, gestion_df = load_sheets(RESERVAS_SHEET, GESTION_SHEET)
+        
+        if reservas_df is None:
+            logger.error("Failed to load data for save operation")
+            return False
+        
+        logger.info("Successfully loaded current data for save operation")
+        
+        gestion_ws = open_worksheet("proveedor_gestion")
+        
+        logger.info(f"Successfully opened gestion worksheet for order: {new_record.get('Orden_de_compra')}")
+        
+        # Prepare new row data - MAINTAIN EXACT FORMAT
+        new_row_data = [
+            new_record.get('Orden_de_compra', ''),           # A: Orden_de_compra
+            new_record.get('Proveedor', ''),                 # B: Proveedor
+            str(new_record.get('Numero_de_bultos', '')),     # C: Numero_de_bultos
+            new_record.get('Hora_llegada', ''),              # D: Hora_llegada
+            new_record.get('Hora_inicio_atencion', ''),      # E: Hora_inicio_atencion
+            new_record.get('Hora_fin_atencion', ''),         # F: Hora_fin_atencion
+            str(new_record.get('Tiempo_espera', '')),        # G: Tiempo_espera
+            str(new_record.get('Tiempo_atencion', '')),      # H: Tiempo_atencion
+            str(new_record.get('Tiempo_total', '')),         # I: Tiempo_total
+            str(new_record.get('Tiempo_retraso', '')),       # J: Tiempo_retraso
+            str(new_record.get('numero_de_semana', '')),     # K: numero_de_semana
+            str(new_record.get('hora_de_reserva', ''))       # L: hora_de_reserva
+        ]
+        
+        logger.info(f"Prepared new row data for order {new_record.get('Orden_de_compra')}: columns={len(new_row_data)}")
+        
+        # Get current row count to determine next row
+        all_values = gestion_ws.get_all_values()
+        next_row = len(all_values) + 1
+        col_range = f'A{next_row}:L{next_row}'
+        
+        logger.info(f"Inserting new record at row {next_row} (range: {col_range})")
+        
+        # Update specific row instead of append
+        gestion_ws.update(
+            range_name=col_range,
+            values=[new_row_data],
+            value_input_option='RAW'
+        )
+        
+        logger.info(f"Successfully saved new gestion record for order: {new_record.get('Orden_de_compra')}")
+        
+        # Clear cache after successful save
+        invalidate_data_store([GESTION_SHEET])
+        logger.info("Cache cleared after successful save operation")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error saving new gestion record for order {new_record.get('Orden_de_compra', 'UNKNOWN')}: {str(e)}")
+        return False
+
+def normalize_cell_value(value):
+    """Normalize a cell value for comparison ('' for empty, None or NaN)"""
+    if value is None or str(value).strip().lower() in ['none', 'nan', '']:
+        return ''
+    return str(value).strip()
+
+def find_update_conflicts(current_row, update_data, base_record, col_mapping):
+    """Return fields changed in the sheet by someone else since base_record was read"""
+    conflicts = []
+    for field, value in update_data.items():
+        if field not in col_mapping or field not in base_record:
+            continue
+        col_index = col_mapping[field]
+        current_value = normalize_cell_value(current_row[col_index])
+        base_value = normalize_cell_value(base_record[field])
+        new_value = normalize_cell_value(value)
+        # Untouched since read, or another writer already stored the same value
+        if current_value == base_value or current_value == new_value:
+            continue
+        conflicts.append(f"{field}: esperado '{base_value}', actual '{current_value}'")
+    return conflicts
+
+def build_cell_updates(row_number, current_row, update_data, col_mapping):
+    """Build batch_update entries for the cells whose value differs from current_row"""
+    cell_updates = []
+    for field, value in update_data.items():
+        if field not in col_mapping:
+            continue
+        col_index = col_mapping[field]
+        old_value = normalize_cell_value(current_row[col_index])
+        new_value = normalize_cell_value(value)
+        if old_value == new_value:
+            continue
+        cell_updates.append({
+            'range': gspread.utils.rowcol_to_a1(row_number, col_index + 1),
+            'values': [[new_value]]
+        })
+        logger.info(f"Updated field {field} at column {col_index}: '{old_value}' -> '{new_value}'")
+    return cell_updates
+
+def update_sheets_record(orden_compra, update_data, base_record=None):
+    """Update existing record in Google Sheets - WITH LOGGING
+
+    base_record holds the values the operator read before editing. When given,
+    the write is rejected if another writer changed any of the updated fields
+    in the meantime; changes to other fields of the row are kept.
+    
+    Runs in the write log replayer thread, so nothing is shown here:
+    returns False for errors worth retrying and raises WriteRejected for
+    writes that must not be applied.
+    """
+    logger.info(f"Starting update operation for order: {orden_compra}")
+    logger.info(f"Update data: {list(update_data.keys())}")
+    
+    try:
+        gestion_ws = open_worksheet("proveedor_gestion")
+        
+        logger.info(f"Successfully opened gestion worksheet for update of order: {orden_compra}")
+        
+        # Locate the row from the order column alone
+        orders = gestion_ws.col_values(1)
+        logger.info(f"Retrieved {len(orders)} order cells from gestion worksheet")
+        
+        orden_compra = str(orden_compra).strip()
+        row_number = next(
+            (number for number, value in enumerate(orders[1:], start=2) if str(value).strip() == orden_compra),
+            None
+        )
+        
+        if row_number is None:
+            logger.error(f"No matching record found for order: {orden_compra}")
+            raise WriteRejected("No se encontró el registro para actualizar")
+        
+        # Read back just that row right before writing, so the check sees its latest values
+        current_row = gestion_ws.row_values(row_number)
+        if not current_row or str(current_row[0]).strip() != orden_compra:
+            # Rows were inserted or deleted in between; retry with a fresh lookup
+            logger.warning(f"Row {row_number} no longer holds order {orden_compra}, retrying")
+            return False
+        logger.info(f"Found order {orden_compra} at row {row_number} with {len(current_row)} columns")
+        
+        # Ensure row has enough columns (12 columns total)
+        while len(current_row) < 12:
+            current_row.append('')
+        
+        col_mapping = GESTION_UPDATABLE_COLUMNS
+        
+        # Optimistic concurrency check against the values the caller started from
+        if base_record is not None:
+            conflicts = find_update_conflicts(current_row, update_data, base_record, col_mapping)
+            if conflicts:
+                # The other writer moved modifiedTime, so the next refresh reloads gestion anyway
+                logger.warning(f"Write conflict for order {orden_compra}: {conflicts}")
+                raise WriteRejected(
+                    f"Otro usuario modificó este registro. Campos en conflicto: {'; '.join(conflicts)}"
+                )
+        
+        # Build one small range per cell that actually changes
+        cell_updates = build_cell_updates(row_number, current_row, update_data, col_mapping)
+        
+        if not cell_updates:
+            logger.info(f"No cell changes needed for order: {orden_compra}")
+            return True
+        
+        logger.info(f"Updating {len(cell_updates)} cells in row {row_number} for order {orden_compra}: {[u['range'] for u in cell_updates]}")
+        
+        # Send all changed cells in a single request
+        gestion_ws.batch_update(cell_updates, value_input_option='RAW')
+        
+        logger.info(f"Successfully updated record for order: {orden_compra}")
+        
+        # Clear cache after successful update
+        invalidate_data_store([GESTION_SHEET])
+        logger.info("Cache cleared after successful update operation")
+        
+        return True
+        
+    except WriteRejected:
+        raise
+    except Exception as e:
+        logger.error(f"Error updating record for order {orden_compra}: {str(e)}")
+        return False
+
+
+# ─────────────────────────────────────────────────────────────
+# 3. Helper Functions - UNCHANGED TIME PARSING AND CALCULATIONS
+# ─────────────────────────────────────────────────────────────
+def get_today_reservations(reservas_df):
+    """Get today's reservations"""
+    today = get_bolivia_today().strftime('%Y-%m-%d')
+    today_reservations = reservas_df[reservas_df['Fecha'].astype(str).str.contains(today, na=False)]
+    logger.info(f"Found {len(today_reservations)} reservations for today ({today})")
+    return today_reservations
+
+# ─────────────────────────────────────────────────────────────
+# 4. Management Functions - WITH LOGGING
+# ─────────────────────────────────────────────────────────────
+def get_existing_arrivals(gestion_df):
+    """Get orders that already have arrival registered today but not yet completed"""
+    today = get_bolivia_today().strftime('%Y-%m-%d')
+    if gestion_df.empty:
+        logger.info("No gestion data available for existing arrivals check")
+        return []
+
+    # Filter records with arrival time from today
+    today_arrivals = gestion_df[
+        gestion_df['Hora_llegada'].astype(str).str.contains(today, na=False)
+    ]
+    
+    logger.info(f"Found {len(today_arrivals)} arrivals registered for today ({today})")
+    
+    # Only return orders that don't have service times completed
+    pending_service = today_arrivals[
+        (today_arrivals['Hora_inicio_atencion'].isna()) | 
+        (today_arrivals['Hora_inicio_atencion'].astype(str).isin(['', 'nan', 'None'])) |
+        (today_arrivals['Hora_fin_atencion'].isna()) |
+        (today_arrivals['Hora_fin_atencion'].astype(str).isin(['', 'nan', 'None']))
+    ]
+    
+    pending_orders = sorted(pending_service['Orden_de_compra'].astype(str).tolist())
+    logger.info(f"Found {len(pending_orders)} orders pending service: {pending_orders}")
+    
+    return pending_orders
+
+def get_completed_orders(gestion_df):
+    """Get orders that have both arrival and service registered today"""
+    today = get_bolivia_today().strftime('%Y-%m-%d')
+    if gestion_df.empty:
+        logger.info("No gestion data available for completed orders check")
+        return []
+    
+    # Filter records with arrival time from today
+    today_records = gestion_df[
+        gestion_df['Hora_llegada'].astype(str).str.contains(today, na=False)
+    ]
+    
+    # Return orders that have both arrival and service times
+    completed = today_records[
+        (today_records['Hora_inicio_atencion'].notna()) & 
+        (~today_records['Hora_inicio_atencion'].astype(str).isin(['', 'nan', 'None'])) &
+        (today_records['Hora_fin_atencion'].notna()) &
+        (~today_records['Hora_fin_atencion'].astype(str).isin(['', 'nan', 'None']))
+    ]
+    
+    completed_orders = completed['Orden_de_compra'].astype(str).tolist()
+    logger.info(f"Found {len(completed_orders)} completed orders for today: {completed_orders}")
+    
+    return completed_orders
+
+def get_pending_arrivals(today_reservations, gestion_df):
+    """Get orders that haven't registered arrival yet"""
+    existing_arrivals = get_existing_arrivals(gestion_df)
+    completed_orders = get_completed_orders(gestion_df)
+    
+    # Combine both lists to exclude from dropdown
+    processed_orders = existing_arrivals + completed_orders
+    logger.info(f"Total processed orders (existing + completed): {len(processed_orders)}")
+    
+    # Return orders that haven't been processed at all
+    pending = today_reservations[
+        ~today_reservations['Orden_de_compra'].isin(processed_orders)
+    ]
+    
+    pending_orders = sorted(pending['Orden_de_compra'].astype(str).tolist())
+    logger.info(f"Found {len(pending_orders)} orders pending arrival: {pending_orders}")
+    
+    return pending_orders
+
+def get_arrival_record(gestion_df, orden_compra):
+    """Get existing arrival record for an order"""
+    logger.info(f"Searching for arrival record for order: {orden_compra}")
+    
+    if gestion_df.empty:
+        logger.warning("No gestion data available for arrival record search")
+        return None
+    
+    # Ensure both sides are strings and strip whitespace
+    orden_compra_clean = str(orden_compra).strip()
+    
+    # Create a mask for exact string matching
+    mask = gestion_df['Orden_de_compra'].astype(str).str.strip() == orden_compra_clean
+    
+    # Filter the dataframe
+    matching_records = gestion_df[mask]
+    
+    if matching_records.empty:
+        # Debug: show what we're looking for vs what exists
+        available_orders = gestion_df['Orden_de_compra'].astype(str).str.strip().tolist()
+        logger.error(f"No arrival record found for order '{orden_compra_clean}'")
+        logger.error(f"Available orders in gestion: {available_orders[:10]}...")  # Log first 10 to avoid spam
+        st.error(f"No se encontró orden '{orden_compra_clean}' en registros de gestión.")
+        st.error(f"Órdenes disponibles: {available_orders}")
+        return None
+    
+    logger.info(f"Found arrival record for order: {orden_compra_clean}")
+    return matching_records.iloc[0]
+
+def get_arrival_record_silent(gestion_df, orden_compra):
+    """Get existing arrival record for an order - silent version without error messages"""
+    if gestion_df.empty:
+        return None
+    
+    # Ensure both sides are strings and strip whitespace
+    orden_compra_clean = str(orden_compra).strip()
+    
+    # Create a mask for exact string matching
+    mask = gestion_df['Orden_de_compra'].astype(str).str.strip() == orden_compra_clean
+    
+    # Filter the dataframe
+    matching_records = gestion_df[mask]
+    
+    if matching_records.empty:
+        logger.info(f"No arrival record found for order '{orden_compra_clean}' (silent search)")
+        return None
+    
+    logger.info(f"Found arrival record for order '{orden_compra_clean}' (silent search)")
+    return matching_records.iloc[0]
+
+def write_arrival_to_sheets(arrival_data, base=None):
+    """Write arrival data to Google Sheets (called by the write log replayer) - WITH LOGGING
+
+    base holds the values the operator saw; without it (entries logged
+    before bases were kept) the current record is used.
+    """
+    orden_compra = arrival_data.get('Orden_de_compra', 'UNKNOWN')
+    logger.info(f"Starting arrival save operation for order: {orden_compra}")
+    
+    try:
+        reservas_df, gestion_df = load_sheets(RESERVAS_SHEET, GESTION_SHEET)
+        
+        if reservas_df is None:
+            logger.error("Failed to load data for arrival save operation")
+            return False
+        
+        # Check if record already exists
+        existing_record = get_arrival_record_silent(gestion_df, arrival_data['Orden_de_compra'])
+        
+        if existing_record is not None:
+            logger.info(f"Existing record found for order {orden_compra}, updating instead of creating new")
+            # Update existing record
+            update_data = {
+                'Hora_llegada': arrival_data['Hora_llegada'],
+                'numero_de_semana': arrival_data['numero_de_semana'],
+                'hora_de_reserva': arrival_data['hora_de_reserva'],
+                'Tiempo_retraso': arrival_data['Tiempo_retraso']
+            }
+            base_record = base if base is not None else existing_record
+            return update_sheets_record(arrival_data['Orden_de_compra'], update_data, base_record=base_record)
+        else:
+            logger.info(f"No existing record found for order {orden_compra}, creating new record")
+            # Add new record
+            return save_gestion_to_sheets(arrival_data)
+        
+    except WriteRejected:
+        raise
+    except Exception as e:
+        logger.error(f"Error in arrival save operation for order {orden_compra}: {str(e)}")
+        return False
+
+def write_service_times(orden_compra, service_data, base=None):
+    """Write service times to the existing arrival record (called by the write log replayer) - WITH LOGGING
+
+    base holds the values the operator saw, as in write_arrival_to_sheets.
+    """
+    logger.info(f"Starting service time update for order: {orden_compra}")
+    logger.info(f"Service data fields: {list(service_data.keys())}")
+    
+    try:
+        reservas_df, gestion_df = load_sheets(RESERVAS_SHEET, GESTION_SHEET)
+        
+        if gestion_df.empty:
+            logger.error("No data available in gestion sheet for service update")
+            raise WriteRejected("No hay datos en la hoja de gestión.")
+        
+        # Clean the orden_compra for matching
+        orden_compra_clean = str(orden_compra).strip()
+        
+        # Find the record to update with robust string matching
+        mask = gestion_df['Orden_de_compra'].astype(str).str.strip() == orden_compra_clean
+        matching_records = gestion_df[mask]
+        
+        if matching_records.empty:
+            logger.error(f"No matching record found for service update of order: {orden_compra_clean}")
+            available_orders = gestion_df['Orden_de_compra'].astype(str).str.strip().tolist()
+            logger.error(f"Available orders: {available_orders[:10]}...")  # Log first 10
+            raise WriteRejected(f"No se encontró registro de llegada para la orden: '{orden_compra_clean}'")
+        
+        logger.info(f"Found matching record for service update of order: {orden_compra_clean}")
+        
+        # Update service times using Google Sheets update function
+        base_record = base if base is not None else matching_records.iloc[0]
+        result = update_sheets_record(orden_compra_clean, service_data, base_record=base_record)
+        
+        if result:
+            logger.info(f"Successfully updated service times for order: {orden_compra_clean}")
+        else:
+            logger.error(f"Failed to update service times for order: {orden_compra_clean}")
+        
+        return result
+        
+    except WriteRejected:
+        raise
+    except Exception as e:
+        logger.error(f"Error updating service times for order {orden_compra}: {str(e)}")
+        return False
+
+BOARD_CHANGE_HISTORY = 500   # Deltas kept for board sessions that fall behind
+
+BOARD_STATES = ["Pendiente", "En espera", "En atención", "Atendido"]
+
+def is_blank_value(value):
+    """True for empty cells, None and NaN"""
+    return pd.isna(value) or str(value).strip() in ['', 'nan', 'None']
+
+def build_dock_board(reservas_df, gestion_df):
+    """Current state of every order booked for today, keyed by Orden_de_compra"""
+    today_reservations = get_today_reservations(reservas_df)
+    now = get_bolivia_now().replace(tzinfo=None)
+    
+    gestion_by_order = {}
+    if not gestion_df.empty:
+        for record in gestion_df.to_dict('records'):
+            gestion_by_order.setdefault(str(record['Orden_de_compra']).strip(), record)
+    
+    board = {}
+    for reservation in today_reservations.to_dict('records'):
+        orden_compra = str(reservation['Orden_de_compra']).strip()
+        record = gestion_by_order.get(orden_compra)
+        row = {
+            'Orden_de_compra': orden_compra,
+            'Proveedor': str(reservation['Proveedor']),
+            'Hora': str(reservation['Hora']),
+            'Llegada': '',
+            'Fin': '',
+            'Estado': 'Pendiente'
+        }
+        
+        if record is not None and not is_blank_value(record.get('Hora_llegada')):
+            arrival = parse_datetime_flexible(record['Hora_llegada'])
+            row['Llegada'] = arrival.strftime('%H:%M') if arrival else ''
+            
+            if is_blank_value(record.get('Hora_inicio_atencion')) or is_blank_value(record.get('Hora_fin_atencion')):
+                row['Estado'] = 'En espera'
+            else:
+                service_end = parse_datetime_flexible(record['Hora_fin_atencion'])
+                row['Fin'] = service_end.strftime('%H:%M') if service_end else ''
+                row['Estado'] = 'En atención' if service_end and service_end > now else 'Atendido'
+        
+        board[orden_compra] = row
+    
+    return board
+
+class DockBoardFeed:
+    """Single server-side change feed for the live dock board
+
+    Every board session polls this feed instead of Google Sheets. The board
+    is recomputed once per data version (or day, or minute for the
+    in-service -> served transition) and only the changed orders are
+    recorded as deltas with an increasing sequence number.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.board = {}
+        self.sequence = 0
+        self.changes = deque(maxlen=BOARD_CHANGE_HISTORY)  # (sequence, orden_compra, row or None)
+        self._source_key = None
+
+    def sync(self):
+        """Refresh the board from the shared data store if anything could have changed"""
+        reservas_df, gestion_df = load_sheets(RESERVAS_SHEET, GESTION_SHEET)
+        if reservas_df is None:
+            return
+        
+        now = get_bolivia_now()
+        source_key = (get_shared_data_store().version, now.date(), now.strftime('%H:%M'))
+        with self._lock:
+            if source_key == self._source_key:
+                return
+            self._source_key = source_key
+            
+            new_board = build_dock_board(reservas_df, gestion_df)
+            changed_orders = [order for order, row in new_board.items() if self.board.get(order) != row]
+            removed_orders = [order for order in self.board if order not in new_board]
+            
+            for order in changed_orders:
+                self.sequence += 1
+                self.changes.append((self.sequence, order, new_board[order]))
+            for order in removed_orders:
+                self.sequence += 1
+                self.changes.append((self.sequence, order, None))
+            
+            self.board = new_board
+            if changed_orders or removed_orders:
+                logger.info(f"Dock board feed at sequence {self.sequence}: {len(changed_orders)} changed, {len(removed_orders)} removed")
+
+    def changes_since(self, sequence):
+        """Deltas after sequence, or None if the caller is too far behind (or ahead) and must resync"""
+        with self._lock:
+            if sequence > self.sequence:
+                # A sequence from before a restart reset the feed
+                return self.sequence, None
+            if sequence == self.sequence:
+                return self.sequence, []
+            if not self.changes or self.changes[0][0] > sequence + 1:
+                return self.sequence, None
+            return self.sequence, [change for change in self.changes if change[0] > sequence]
+
+    def snapshot(self):
+        """Full board for sessions that connect or fall behind"""
+        with self._lock:
+            return self.sequence, dict(self.board)
+
+@st.cache_resource
+def get_dock_board_feed():
+    """Process-wide DockBoardFeed shared by all board sessions"""
+    logger.info("Creating dock board feed")
+    return DockBoardFeed()
+
+def parse_booked_start_time(hora_str):
+    """Parse the booked start time from a reservas Hora value, None if unparseable"""
+    hora_str = str(hora_str).strip()
+    
+    # Try parsing as combined slots first, then single time, then range
+    booked_start_time = parse_combined_time_slots(hora_str)
+    if not booked_start_time:
+        booked_start_time = parse_single_time(hora_str)
+    if not booked_start_time:
+        booked_start_time = parse_time_range(hora_str)
+    if booked_start_time:
+        return booked_start_time
+    
+    # Fallback: manual parsing for formats like "10:00:00"
+    try:
+        if ':' in hora_str:
+            time_parts = hora_str.split(':')
+            booked_hour = int(time_parts[0])
+            booked_minute = int(time_parts[1]) if len(time_parts) > 1 else 0
+            booked_second = int(time_parts[2]) if len(time_parts) > 2 else 0
+            return dt_time(booked_hour, booked_minute, booked_second)
+    except (ValueError, IndexError):
+        pass
+    return None
+
+def calculate_arrival_delay(hora_str, arrival_datetime):
+    """Return (tiempo_retraso, hora_de_reserva) for an arrival against its booked Hora"""
+    booked_start_time = parse_booked_start_time(hora_str)
+    if not booked_start_time:
+        logger.warning(f"Delay calculation failed for reservation time '{hora_str}', using defaults")
+        return 0, None
+    
+    booked_datetime = combine_date_time(arrival_datetime.date(), booked_start_time)
+    tiempo_retraso = calculate_time_difference(booked_datetime, arrival_datetime)
+    if tiempo_retraso is None:
+        tiempo_retraso = 0
+    # Extract hour for hora_de_reserva (e.g., 10 for "10:00:00")
+    return tiempo_retraso, booked_start_time.hour
+
+def build_arrival_data(order_details, arrival_datetime):
+    """Build the gestion record for a new arrival - MAINTAIN EXACT DATE FORMAT"""
+    tiempo_retraso, hora_de_reserva = calculate_arrival_delay(order_details['Hora'], arrival_datetime)
+    logger.info(f"Delay calculation: {tiempo_retraso} minutes, reservation hour: {hora_de_reserva}")
+    return {
+        'Orden_de_compra': str(order_details['Orden_de_compra']),
+        'Proveedor': order_details['Proveedor'],
+        'Numero_de_bultos': order_details['Numero_de_bultos'],
+        'Hora_llegada': format_datetime_no_zero_padding(arrival_datetime),  # EXACT FORMAT
+        'Hora_inicio_atencion': '',
+        'Hora_fin_atencion': '',
+        'Tiempo_espera': '',
+        'Tiempo_atencion': '',
+        'Tiempo_total': '',
+        'Tiempo_retraso': tiempo_retraso,
+        'numero_de_semana': arrival_datetime.isocalendar()[1],
+        'hora_de_reserva': hora_de_reserva
+    }
+
+def validate_service_times(arrival_datetime, hora_inicio, hora_fin):
+    """Return an error message for invalid service times, None when valid"""
+    if hora_inicio >= hora_fin:
+        return "La hora de fin debe ser posterior a la hora de inicio."
+    if hora_inicio < arrival_datetime:
+        return "La hora de inicio de atención no puede ser anterior a la hora de llegada."
+    return None
+
+def build_service_data(arrival_datetime, hora_inicio, hora_fin):
+    """Build the gestion update for a completed service - MAINTAIN EXACT DATE FORMAT"""
+    return {
+        'Hora_inicio_atencion': format_datetime_no_zero_padding(hora_inicio),
+        'Hora_fin_atencion': format_datetime_no_zero_padding(hora_fin),
+        'Tiempo_espera': calculate_time_difference(arrival_datetime, hora_inicio),
+        'Tiempo_atencion': calculate_time_difference(hora_inicio, hora_fin),
+        'Tiempo_total': calculate_time_difference(arrival_datetime, hora_fin)
+    }
+
+# ─────────────────────────────────────────────────────────────
+# 5. Bulk Operations - WITH LOGGING
+# ─────────────────────────────────────────────────────────────
+BULK_WRITE_CHUNK_ROWS = 500  # Rows per append request during bulk writes
+
+def format_sheet_value(value):
+    """Cell text for a bulk-written value ('' for missing)"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ''
+    return str(value)
+
+def parse_datetime_series(series):
+    """Vectorized parse of timestamps with single or double digit hours (NaT if invalid)"""
+    text = series.astype(str).str.strip()
+    text = text.where(~text.isin(['', 'nan', 'None', 'NaT']))
+    return pd.to_datetime(text, format='mixed', errors='coerce')
+
+def format_datetime_series(series):
+    """Vectorized format_datetime_no_zero_padding ('' for NaT)"""
+    formatted = (
+        series.dt.strftime('%Y-%m-%d ')
+        + series.dt.hour.astype('Int64').astype(str)
+        + series.dt.strftime(':%M:%S')
+    )
+    return formatted.where(series.notna(), '')
+
+def minutes_between(start, end):
+    """Vectorized calculate_time_difference: whole minutes truncated toward zero"""
+    minutes = np.trunc((end - start).dt.total_seconds() / 60)
+    return pd.Series(minutes, index=start.index).astype('Int64')
+
+def booked_offset_series(hora_series):
+    """Booked start time of each reservas Hora value as a Timedelta from midnight (NaT if unparseable)"""
+    hora_text = hora_series.astype(str)
+    booked_by_hora = {}
+    # Parse each distinct Hora string only once
+    for hora_str in hora_text.unique():
+        booked = parse_booked_start_time(hora_str)
+        booked_by_hora[hora_str] = (
+            pd.Timedelta(hours=booked.hour, minutes=booked.minute, seconds=booked.second) if booked else pd.NaT
+        )
+    return pd.to_timedelta(hora_text.map(booked_by_hora))
+
+def compute_gestion_metrics(gestion_df, reservas_df):
+    """Recompute every derived gestion column in one vectorized pass
+
+    Joins gestion with reservas on Orden_de_compra and returns a copy of
+    gestion_df with Tiempo_espera, Tiempo_atencion, Tiempo_total,
+    Tiempo_retraso, numero_de_semana and hora_de_reserva recalculated with
+    the same rules as the arrival and service handlers.
+    """
+    result = gestion_df.copy()
+    result['Orden_de_compra'] = result['Orden_de_compra'].astype(str).str.strip()
+    
+    llegada = parse_datetime_series(result['Hora_llegada'])
+    inicio = parse_datetime_series(result['Hora_inicio_atencion'])
+    fin = parse_datetime_series(result['Hora_fin_atencion'])
+    
+    # Booked start time per order
+    reservas = reservas_df[['Orden_de_compra', 'Hora']].copy()
+    reservas['Orden_de_compra'] = reservas['Orden_de_compra'].astype(str).str.strip()
+    reservas = reservas.drop_duplicates('Orden_de_compra', keep='last')
+    booked_offset = booked_offset_series(reservas['Hora'])
+    booked_offset = pd.to_timedelta(
+        result['Orden_de_compra'].map(pd.Series(booked_offset.values, index=reservas['Orden_de_compra']))
+    )
+    booked_datetime = llegada.dt.normalize() + booked_offset
+    
+    result['Tiempo_espera'] = minutes_between(llegada, inicio)
+    result['Tiempo_atencion'] = minutes_between(inicio, fin)
+    result['Tiempo_total'] = minutes_between(llegada, fin)
+    # Arrivals with an unparseable booking keep the handler default of 0
+    result['Tiempo_retraso'] = minutes_between(booked_datetime, llegada).where(
+        booked_datetime.notna() | llegada.isna(), 0
+    )
+    result['numero_de_semana'] = llegada.dt.isocalendar().week.astype('Int64')
+    result['hora_de_reserva'] = (booked_offset.dt.total_seconds() // 3600).astype('Int64')
+    
+    result['Hora_llegada'] = format_datetime_series(llegada)
+    result['Hora_inicio_atencion'] = format_datetime_series(inicio)
+    result['Hora_fin_atencion'] = format_datetime_series(fin)
+    return result
+
+def gestion_frame_to_rows(gestion_df):
+    """Sheet rows (A:L, as text) for a gestion frame"""
+    values = gestion_df.reindex(columns=GESTION_COLUMNS).astype(object)
+    return [[format_sheet_value(value) for value in row] for row in values.itertuples(index=False, name=None)]
+
+def append_gestion_rows(rows, chunk_size=BULK_WRITE_CHUNK_ROWS):
+    """Append rows to the gestion sheet with one values.append call per chunk
+
+    With event sourcing enabled the rows are appended as 'importacion'
+    events instead, so they are part of the materialized gestion state.
+    """
+    if not rows:
+        return 0
+    
+    if event_sourcing_enabled():
+        events = [
+            build_field_event('importacion', row[0], {
+                col: value for col, value in zip(GESTION_COLUMNS, row) if value != ''
+            })
+            for row in rows
+        ]
+        return append_event_rows(events, chunk_size)
+    
+    gestion_ws = open_worksheet("proveedor_gestion")
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        # values.append places the rows server-side, so concurrent writers never share a range
+        gestion_ws.append_rows(chunk, value_input_option='RAW', table_range='A1')
+        logger.info(f"Bulk appended {len(chunk)} gestion rows")
+    
+    invalidate_data_store([GESTION_SHEET])
+    return len(rows)
+
+DERIVED_GESTION_COLUMNS = [
+    'Tiempo_espera', 'Tiempo_atencion', 'Tiempo_total', 'Tiempo_retraso',
+    'numero_de_semana', 'hora_de_reserva'
+]
+BOOKING_DERIVED_COLUMNS = ['Tiempo_retraso', 'hora_de_reserva']
+BULK_UPDATE_CHUNK_CELLS = 1000  # Ranges per batch_update request
+
+def changed_metric_columns(current_df, recomputed_df, booked_mask):
+    """(column, changed mask, recomputed text) for each derived column
+
+    Blank recomputed values never overwrite existing data, and
+    booking-based columns are only touched for orders that have a
+    reservation.
+    """
+    for col in DERIVED_GESTION_COLUMNS:
+        current = current_df[col].map(normalize_cell_value)
+        recomputed = recomputed_df[col].astype(object).map(format_sheet_value)
+        changed = (recomputed != '') & (recomputed != current)
+        if col in BOOKING_DERIVED_COLUMNS:
+            changed &= booked_mask
+        yield col, changed, recomputed
+
+def find_changed_metric_cells(sheet_df, recomputed_df, booked_mask):
+    """batch_update entries for derived cells whose recomputed value differs from the sheet
+
+    sheet_df rows must be in sheet order starting at row 2.
+    """
+    cell_updates = []
+    for col, changed, recomputed in changed_metric_columns(sheet_df, recomputed_df, booked_mask):
+        col_number = GESTION_COLUMNS.index(col) + 1
+        for position in changed.to_numpy().nonzero()[0]:
+            cell_updates.append({
+                'range': gspread.utils.rowcol_to_a1(int(position) + 2, col_number),
+                'values': [[recomputed.iat[position]]]
+            })
+    return cell_updates
+
+def recompute_gestion_metrics(dry_run=False, chunk_size=BULK_UPDATE_CHUNK_CELLS):
+    """Recompute every derived gestion metric and write back only the changed cells
+
+    Returns the list of cell updates (applied unless dry_run). With event
+    sourcing enabled the materialized state is recomputed instead and the
+    changes are returned (and appended) as 'recalculo' event rows.
+    """
+    logger.info("Starting bulk recompute of gestion metrics")
+    reservas_df, gestion_df = load_sheets(RESERVAS_SHEET, GESTION_SHEET)
+    if reservas_df is None:
+        raise ConnectionError("No se pudo cargar los datos de Google Sheets")
+    
+    if event_sourcing_enabled():
+        return recompute_gestion_metric_events(gestion_df, reservas_df, dry_run, chunk_size)
+    
+    # Read raw values so positions map exactly to sheet rows
+    gestion_ws = open_worksheet("proveedor_gestion")
+    all_values = gestion_ws.get_all_values()
+    if len(all_values) < 2:
+        logger.info("No gestion rows to recompute")
+        return []
+    width = len(all_values[0])
+    sheet_df = pd.DataFrame(
+        [row + [''] * (width - len(row)) for row in all_values[1:]], columns=all_values[0]
+    ).reindex(columns=GESTION_COLUMNS, fill_value='')
+    
+    recomputed_df = compute_gestion_metrics(sheet_df, reservas_df)
+    booked_orders = set(reservas_df['Orden_de_compra'].astype(str).str.strip())
+    booked_mask = recomputed_df['Orden_de_compra'].isin(booked_orders)
+    cell_updates = find_changed_metric_cells(sheet_df, recomputed_df, booked_mask)
+    logger.info(f"Recompute found {len(cell_updates)} changed cells in {len(sheet_df)} gestion rows")
+    
+    if dry_run or not cell_updates:
+        return cell_updates
+    
+    for start in range(0, len(cell_updates), chunk_size):
+        chunk = cell_updates[start:start + chunk_size]
+        gestion_ws.batch_update(chunk, value_input_option='RAW')
+        logger.info(f"Recompute wrote {len(chunk)} cells")
+    
+    invalidate_data_store([GESTION_SHEET])
+    return cell_updates
+
+# ─────────────────────────────────────────────────────────────
+# 6. Write-Ahead Log - WITH LOGGING
+# ─────────────────────────────────────────────────────────────
+WRITE_LOG_PATH = os.environ.get(
+    'PROVIDER_WRITE_LOG',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'pending_writes.jsonl')
+)
+WRITE_LOG_RETRY_SECONDS = 5        # Replay interval, and first retry delay after a failure
+WRITE_LOG_MAX_RETRY_SECONDS = 300  # Backoff cap while Google Sheets is unavailable
+WRITE_LOG_MAX_ATTEMPTS = 3         # Rejections with Sheets reachable before an entry is set aside
+
+def apply_logged_write(entry):
+    """Apply one write log entry to Google Sheets; replaying an applied entry changes nothing
+
+    Conflicts are checked against the values the operator saw (entry
+    base), and raise WriteRejected like a missing record.
+    """
+    if entry['kind'] in IDEMPOTENCY_FIELDS and is_already_saved(entry['kind'], entry['orden_compra'], entry['data']):
+        logger.info(f"{entry['kind']} write for order {entry['orden_compra']} already in the sheet, skipping")
+        return True
+    if event_sourcing_enabled():
+        conflicts = find_event_conflicts(entry)
+        if conflicts:
+            invalidate_data_store([GESTION_SHEET])
+            raise WriteRejected(f"Otro usuario modificó este registro. Campos en conflicto: {'; '.join(conflicts)}")
+        return append_gestion_events(entry)
+    if entry['kind'] == 'arrival':
+        return write_arrival_to_sheets(entry['data'], entry.get('base'))
+    if entry['kind'] == 'service':
+        return write_service_times(entry['orden_compra'], entry['data'], entry.get('base'))
+    raise WriteRejected(f"Tipo de registro desconocido: {entry['kind']}")
+
+class WriteLogReplayer:
+    """Background thread that flushes the write-ahead log to Google Sheets in logged order"""
+
+    def __init__(self, write_log):
+        self.write_log = write_log
+        self._wake = threading.Event()
+        self._attempts = {}      # entry id -> rejected attempts
+        # Idempotency key -> entry id of writes not applied yet (logged here or pending from before)
+        self.keys_lock = threading.Lock()
+        self.keys = {entry.get('key'): entry['id'] for entry in write_log.pending()}
+        self.pending_ids = set(self.keys.values())  # Pending at the last pending() call
+        self._lock_file = None   # Held while this process is the log's replayer
+        self._thread = threading.Thread(target=self._run, name="write-log-replayer", daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        """Flush now instead of at the next interval"""
+        self._wake.set()
+
+    def pending(self):
+        """Entries still pending, noticing the ones applied or rejected since the last call by either process
+
+        Their idempotency keys are dropped, and gestion is invalidated: the
+        pending overlay no longer covers them, so the snapshot must show them.
+        """
+        with self.keys_lock:
+            entries = self.write_log.pending()
+            pending_ids = {entry['id'] for entry in entries}
+            finished = self.pending_ids - pending_ids
+            self.pending_ids = pending_ids
+            self.keys = {key: write_id for key, write_id in self.keys.items() if write_id in pending_ids}
+        if finished:
+            logger.info(f"{len(finished)} logged writes left the write log, invalidating gestion")
+            invalidate_data_store([GESTION_SHEET])
+        return entries
+
+    def _run(self):
+        delay = WRITE_LOG_RETRY_SECONDS
+        while True:
+            if self._lock_file is None:
+                # Another process (app or API) may already replay this log
+                self._lock_file = self.write_log.try_acquire_replayer()
+            flushed = self._lock_file is None or self._flush()
+            delay = WRITE_LOG_RETRY_SECONDS if flushed else min(delay * 2, WRITE_LOG_MAX_RETRY_SECONDS)
+            self._wake.wait(timeout=delay)
+            self._wake.clear()
+
+    def _flush(self):
+        """Apply pending entries in order; False if one must be retried later"""
+        for entry in self.write_log.pending():
+            try:
+                applied = apply_logged_write(entry)
+            except WriteRejected as e:
+                # Retrying cannot help; report it to the operator right away
+                logger.error(f"Rejected {entry['kind']} write for order {entry['orden_compra']}: {e}")
+                self._give_up(entry, str(e))
+                continue
+            except Exception as e:
+                logger.error(f"Error replaying write {entry['id']} for order {entry['orden_compra']}: {str(e)}")
+                applied = False
+            
+            if applied:
+                self.write_log.mark(entry, 'done')
+                self._attempts.pop(entry['id'], None)
+                with self.keys_lock:
+                    # From here on the gestion snapshot catches duplicates
+                    self.keys.pop(entry.get('key'), None)
+                logger.info(f"Replayed {entry['kind']} write for order {entry['orden_compra']}")
+                continue
+            
+            # Keep later writes queued behind this one; outages never use up attempts
+            if probe_spreadsheet_modified_time() is None:
+                logger.warning("Google Sheets unavailable, write log replay paused")
+                return False
+            attempts = self._attempts.get(entry['id'], 0) + 1
+            self._attempts[entry['id']] = attempts
+            if attempts < WRITE_LOG_MAX_ATTEMPTS:
+                return False
+            logger.error(f"Giving up on {entry['kind']} write for order {entry['orden_compra']} after {attempts} attempts")
+            self._give_up(entry, f"Google Sheets rechazó el registro {attempts} veces")
+        return True
+
+    def _give_up(self, entry, reason):
+        """Set an entry aside in the .failed file, where the app reads the reason"""
+        self.write_log.mark(entry, 'failed', reason)
+        self._attempts.pop(entry['id'], None)
+        with self.keys_lock:
+            # Let the operator submit it again
+            self.keys.pop(entry.get('key'), None)
+
+@st.cache_resource
+def get_write_log_replayer():
+    """Single write log and replayer thread for the whole server process"""
+    logger.info(f"Starting write log replayer for {WRITE_LOG_PATH}")
+    return WriteLogReplayer(WriteAheadLog(WRITE_LOG_PATH))
+
+# Fields that identify one submission of each write kind, besides the order
+IDEMPOTENCY_FIELDS = {
+    'arrival': ['Hora_llegada'],
+    'service': ['Hora_inicio_atencion', 'Hora_fin_atencion'],
+}
+
+def idempotency_key(kind, orden_compra, data):
+    """Key of a write: kind, order and the submitted timestamps"""
+    values = [normalize_cell_value(data.get(field)) for field in IDEMPOTENCY_FIELDS[kind]]
+    return '|'.join([kind, str(orden_compra).strip()] + values)
+
+def is_already_saved(kind, orden_compra, data):
+    """True if the in-memory gestion snapshot already holds this write's timestamps"""
+    record = get_shared_data_store().cached_gestion_record(orden_compra)
+    if record is None:
+        return False
+    return all(
+        normalize_cell_value(record.get(field)) == normalize_cell_value(data.get(field))
+        for field in IDEMPOTENCY_FIELDS[kind]
+    )
+
+def operator_base(base_record, data):
+    """Values of the written fields as the operator saw them (blank where there was no record)"""
+    return {
+        field: normalize_cell_value(base_record.get(field)) if base_record is not None else ''
+        for field in data if field in GESTION_UPDATABLE_COLUMNS
+    }
+
+def _log_write(kind, orden_compra, data, base_record):
+    """Log a write; returns the id to follow it with get_write_results, None if it could not be logged"""
+    replayer = get_write_log_replayer()
+    key = idempotency_key(kind, orden_compra, data)
+    
+    # Double clicks and reruns racing a save are dropped before any I/O
+    with replayer.keys_lock:
+        write_id = replayer.keys.get(key)
+        if write_id is not None and write_id not in {entry['id'] for entry in replayer.write_log.pending()}:
+            # Applied or rejected since, possibly by the other process; a resubmission is a new write
+            del replayer.keys[key]
+            write_id = None
+        if write_id is not None:
+            logger.info(f"Duplicate {kind} submission for order {orden_compra} dropped ({key})")
+            return write_id
+        if is_already_saved(kind, orden_compra, data):
+            logger.info(f"{kind} submission for order {orden_compra} already saved ({key})")
+            return key
+        try:
+            entry = replayer.write_log.append(kind, orden_compra, data, key=key, base=operator_base(base_record, data))
+        except OSError as e:
+            logger.error(f"Could not write {kind} for order {orden_compra} to the write log: {str(e)}")
+            st.error(f"Error guardando registro local: {str(e)}")
+            return None
+        replayer.keys[key] = entry['id']
+        replayer.pending_ids.add(entry['id'])
+    
+    replayer.notify()
+    return entry['id']
+
+def save_arrival_to_sheets(arrival_data, base_record=None):
+    """Log an arrival for the background replayer; returns its write id once it is safely on disk
+
+    base_record is the gestion record the operator saw (None if the order
+    had none); the write is rejected if the sheet changed since.
+    """
+    logger.info(f"Logging arrival for order: {arrival_data.get('Orden_de_compra', 'UNKNOWN')}")
+    return _log_write('arrival', arrival_data['Orden_de_compra'], arrival_data, base_record)
+
+def update_service_times(orden_compra, service_data, base_record=None):
+    """Log service times for the background replayer; returns their write id once safely on disk"""
+    logger.info(f"Logging service times for order: {orden_compra}")
+    return _log_write('service', orden_compra, service_data, base_record)
+
+def get_write_results(write_ids):
+    """Write id -> ('pending' | 'done' | 'failed', rejection reason or None) for ids from the save functions"""
+    replayer = get_write_log_replayer()
+    pending = {entry['id'] for entry in replayer.pending()}
+    failed = replayer.write_log.failed_reasons()
+    results = {}
+    for write_id in write_ids:
+        if write_id in pending:
+            results[write_id] = ('pending', None)
+        elif write_id in failed:
+            results[write_id] = ('failed', failed[write_id])
+        else:
+            results[write_id] = ('done', None)
+    return results
+
+def apply_pending_writes(gestion_df, entries):
+    """gestion_df with logged writes that have not reached the sheet applied on top"""
+    if not entries:
+        return gestion_df
+    
+    gestion_df = gestion_df.copy()
+    for entry in entries:
+        mask = gestion_df['Orden_de_compra'].astype(str).str.strip() == entry['orden_compra']
+        if mask.any():
+            for field, value in entry['data'].items():
+                if field in gestion_df.columns:
+                    gestion_df.loc[mask, field] = value if gestion_df[field].dtype == object else str(value)
+        elif entry['kind'] == 'arrival':
+            new_row = pd.DataFrame([entry['data']]).reindex(columns=gestion_df.columns, fill_value='')
+            gestion_df = pd.concat([gestion_df, new_row.astype(gestion_df.dtypes.to_dict())], ignore_index=True)
+    return gestion_df
+
+def get_write_log_status():
+    """Counts of writes waiting for Google Sheets and of writes set aside after repeated rejections"""
+    replayer = get_write_log_replayer()
+    return {'pending': len(replayer.pending()), 'failed': replayer.write_log.failed_count()}
+
+def acknowledge_failed_writes():
+    """Archive the writes set aside so far once someone has reviewed them; returns the archive path"""
+    return get_write_log_replayer().write_log.archive_failed()
+
+# ─────────────────────────────────────────────────────────────
+# 7. Event-Sourced Gestion - WITH LOGGING
+# ─────────────────────────────────────────────────────────────
+# With GESTION_EVENT_SOURCING = true in secrets, arrivals and service
+# start/end are appended to proveedor_eventos as immutable rows instead of
+# inserting and rewriting proveedor_gestion rows. proveedor_gestion stays
+# as the baseline the events are folded onto.
+EVENTS_SHEET = "proveedor_eventos"
+EVENT_COLUMNS = ['Evento_id', 'Tipo', 'Orden_de_compra', 'Registrado', 'Datos']
+MATERIALIZED_REBUILD_SECONDS = 3600  # Full replay interval, picks up direct edits of the baseline
+
+# Gestion fields carried by each event type
+SERVICE_EVENT_FIELDS = {
+    'inicio_atencion': ['Hora_inicio_atencion', 'Tiempo_espera'],
+    'fin_atencion': ['Hora_fin_atencion', 'Tiempo_atencion', 'Tiempo_total'],
+}
+
+def event_sourcing_enabled():
+    """True when gestion writes are stored as events (GESTION_EVENT_SOURCING secret)"""
+    return bool(st.secrets.get("GESTION_EVENT_SOURCING", False))
+
+def build_gestion_events(entry):
+    """Event rows for a write log entry; ids derive from the entry id, so replays repeat them"""
+    registrado = entry.get('created_at', '')
+    if entry['kind'] == 'arrival':
+        events = [('llegada', entry['data'])]
+    else:
+        events = [
+            (event_type, {field: entry['data'][field] for field in fields if field in entry['data']})
+            for event_type, fields in SERVICE_EVENT_FIELDS.items()
+        ]
+    return [
+        [f"{entry['id']}-{n}", event_type, entry['orden_compra'], registrado, json.dumps(fields, ensure_ascii=False, default=str)]
+        for n, (event_type, fields) in enumerate(events)
+    ]
+
+def find_event_conflicts(entry):
+    """Fields of the materialized record changed by someone else since the operator read them"""
+    if not entry.get('base'):
+        return []
+    # The in-memory state, at most one TTL old; events carry no row to re-read
+    record = get_shared_data_store().cached_gestion_record(entry['orden_compra'])
+    current_row = [record.get(col, '') if record is not None else '' for col in GESTION_COLUMNS]
+    return find_update_conflicts(current_row, entry['data'], entry['base'], GESTION_UPDATABLE_COLUMNS)
+
+def open_events_worksheet():
+    """The events worksheet, created with its header on first use"""
+    try:
+        return open_worksheet(EVENTS_SHEET)
+    except gspread.WorksheetNotFound:
+        logger.info("Events worksheet not found, creating it")
+        events_ws = get_spreadsheet().add_worksheet(EVENTS_SHEET, rows=1000, cols=len(EVENT_COLUMNS))
+        events_ws.update(values=[EVENT_COLUMNS], range_name='A1:E1')
+        return events_ws
+
+def append_gestion_events(entry):
+    """Append the entry's events with one values.append call (no row search)"""
+    rows = build_gestion_events(entry)
+    try:
+        open_events_worksheet().append_rows(rows, value_input_option='RAW')
+    except Exception as e:
+        logger.error(f"Error appending events for order {entry['orden_compra']}: {str(e)}")
+        return False
+    logger.info(f"Appended {len(rows)} events for order {entry['orden_compra']}")
+    invalidate_data_store([GESTION_SHEET])
+    return True
+
+class MaterializedGestion:
+    """Current gestion state: the baseline sheet with every event folded on top
+
+    Events are append-only, so each refresh fetches and applies only the
+    rows added since the last one. Duplicate event ids (a replayed write)
+    are applied once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.frame = None
+        self.positions = {}     # Orden_de_compra -> row position in frame
+        self.event_count = 0    # Event rows already read
+        self.event_ids = set()
+        self.built_at = time.monotonic()
+
+    def refresh(self, spreadsheet):
+        """Apply new events (replaying everything periodically); returns (copy of the state, warning or None)"""
+        with self._lock:
+            gestion_warning = None
+            if self.frame is None or time.monotonic() - self.built_at > MATERIALIZED_REBUILD_SECONDS:
+                self._reset()
+                gestion_warning = self._load_baseline(spreadsheet)
+            self._apply_events(self._fetch_new_events(spreadsheet))
+            return self.frame.copy(), gestion_warning
+
+    def _load_baseline(self, spreadsheet):
+        """Load the baseline sheet; returns its creation warning (shown by the caller) or None"""
+        gestion_df, gestion_warning = _load_gestion_sheet(spreadsheet)
+        self.frame = gestion_df.reindex(columns=GESTION_COLUMNS, fill_value='').reset_index(drop=True)
+        orders = self.frame['Orden_de_compra'].astype(str).str.strip()
+        # Events land on the first row of an order, the one every lookup reads
+        self.positions = dict(zip(orders[::-1], range(len(orders) - 1, -1, -1)))
+        logger.info(f"Materialized gestion baseline with {len(self.frame)} rows")
+        return gestion_warning
+
+    def _fetch_new_events(self, spreadsheet):
+        try:
+            events_ws = spreadsheet.worksheet(EVENTS_SHEET)
+        except gspread.WorksheetNotFound:
+            return []
+        first_row = self.event_count + 2  # Row 1 is the header
+        rows = events_ws.get(f"A{first_row}:E", major_dimension='ROWS')
+        self.event_count += len(rows)
+        return rows
+
+    def _apply_events(self, rows):
+        # Fold in order, so later events win per field
+        changes = {}
+        for row in rows:
+            row = list(row) + [''] * (len(EVENT_COLUMNS) - len(row))
+            event_id, event_type, orden_compra, _, data = row[:len(EVENT_COLUMNS)]
+            if not event_id or event_id in self.event_ids:
+                continue
+            self.event_ids.add(event_id)
+            try:
+                fields = json.loads(data) if data else {}
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping event {event_id} with unreadable data")
+                continue
+            changes.setdefault(str(orden_compra).strip(), {}).update(fields)
+        
+        new_records = []
+        for orden_compra, fields in changes.items():
+            position = self.positions.get(orden_compra)
+            if position is None:
+                self.positions[orden_compra] = len(self.frame) + len(new_records)
+                new_records.append({**fields, 'Orden_de_compra': orden_compra})
+                continue
+            for field, value in fields.items():
+                if field in GESTION_COLUMNS:
+                    col = self.frame.columns.get_loc(field)
+                    self.frame.iat[position, col] = value if self.frame[field].dtype == object else str(value)
+        
+        if new_records:
+            new_frame = pd.DataFrame(new_records).reindex(columns=GESTION_COLUMNS, fill_value='')
+            self.frame = pd.concat([self.frame, new_frame.astype(self.frame.dtypes.to_dict())], ignore_index=True)
+        if changes:
+            logger.info(f"Applied {len(rows)} events to materialized gestion ({len(new_records)} new orders)")
+
+def build_field_event(event_type, orden_compra, fields):
+    """One event row setting the given gestion fields of an order"""
+    registrado = get_bolivia_now().strftime('%Y-%m-%d %H:%M:%S')
+    orden_compra = str(orden_compra).strip()
+    return [uuid.uuid4().hex, event_type, orden_compra, registrado, json.dumps(fields, ensure_ascii=False, default=str)]
+
+def append_event_rows(rows, chunk_size=BULK_WRITE_CHUNK_ROWS):
+    """Append bulk event rows with one values.append call per chunk"""
+    events_ws = open_events_worksheet()
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        events_ws.append_rows(chunk, value_input_option='RAW')
+        logger.info(f"Bulk appended {len(chunk)} events")
+    invalidate_data_store([GESTION_SHEET])
+    return len(rows)
+
+def recompute_gestion_metric_events(gestion_df, reservas_df, dry_run=False, chunk_size=BULK_WRITE_CHUNK_ROWS):
+    """'recalculo' event rows for derived metrics of the materialized gestion that changed (appended unless dry_run)"""
+    current_df = gestion_df.reindex(columns=GESTION_COLUMNS, fill_value='').reset_index(drop=True)
+    recomputed_df = compute_gestion_metrics(current_df, reservas_df)
+    booked_orders = set(reservas_df['Orden_de_compra'].astype(str).str.strip())
+    booked_mask = recomputed_df['Orden_de_compra'].isin(booked_orders)
+    
+    changes = {}
+    for col, changed, recomputed in changed_metric_columns(current_df, recomputed_df, booked_mask):
+        for position in changed.to_numpy().nonzero()[0]:
+            changes.setdefault(recomputed_df['Orden_de_compra'].iat[position], {})[col] = recomputed.iat[position]
+    events = [build_field_event('recalculo', orden_compra, fields) for orden_compra, fields in changes.items()]
+    logger.info(f"Recompute found changes for {len(events)} orders in {len(current_df)} materialized gestion rows")
+    
+    if not dry_run and events:
+        append_event_rows(events, chunk_size)
+    return events
+
+@st.cache_resource
+def get_gestion_materializer():
+    """Single materialized gestion view for the whole server process"""
+    return MaterializedGestion()
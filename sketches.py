@@ -0,0 +1,300 @@
+import logging
+import math
+import threading
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from time_utils import parse_datetime_flexible
+
+logger = logging.getLogger('provider_control_app')
+
+METRIC_COLUMNS = ['Tiempo_espera', 'Tiempo_atencion', 'Tiempo_total', 'Tiempo_retraso']
+
+# ─────────────────────────────────────────────────────────────
+# 1. Quantile Sketch
+# ─────────────────────────────────────────────────────────────
+class QuantileSketch:
+    """DDSketch-style mergeable quantile sketch with bounded relative error"""
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = defaultdict(int)  # bucket index -> count, values > 0
+        self.negative = defaultdict(int)  # bucket index -> count of |value|, values < 0
+        self.zero_count = 0
+        self.count = 0
+
+    def _bucket_indexes(self, magnitudes):
+        return np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64)
+
+    def _bucket_value(self, index):
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add_many(self, values):
+        """Add an array of values, ignoring NaN"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+
+        for store, magnitudes in [(self.positive, values[values > 0]), (self.negative, -values[values < 0])]:
+            if magnitudes.size:
+                indexes, counts = np.unique(self._bucket_indexes(magnitudes), return_counts=True)
+                for index, count in zip(indexes.tolist(), counts.tolist()):
+                    store[index] += count
+
+        self.zero_count += int((values == 0).sum())
+        self.count += int(values.size)
+
+    def merge(self, other):
+        """Add the counts of another sketch with the same accuracy into this one"""
+        for index, count in other.positive.items():
+            self.positive[index] += count
+        for index, count in other.negative.items():
+            self.negative[index] += count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q):
+        """Approximate value at quantile q (0..1), None when empty"""
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = 0
+        # Most negative values first: larger magnitude buckets come first
+        for index in sorted(self.negative, reverse=True):
+            seen += self.negative[index]
+            if seen > rank:
+                return -self._bucket_value(index)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.positive):
+            seen += self.positive[index]
+            if seen > rank:
+                return self._bucket_value(index)
+        return self._bucket_value(max(self.positive)) if self.positive else 0.0
+
+# ─────────────────────────────────────────────────────────────
+# 2. Sketch Index per (week, provider, hora_de_reserva)
+# ─────────────────────────────────────────────────────────────
+def get_week_label(datetime_str):
+    """Get week label from datetime string (YYYY-WW format)"""
+    dt = parse_datetime_flexible(datetime_str)
+    if dt:
+        year, week, _ = dt.isocalendar()
+        return f"{year}-W{week:02d}"
+    return None
+
+def completed_gestion_records(gestion_df):
+    """Gestion rows with a Tiempo_total, i.e. orders whose service is registered"""
+    if gestion_df.empty or 'Tiempo_total' not in gestion_df.columns:
+        return gestion_df.iloc[0:0]
+    completed = gestion_df['Tiempo_total'].astype(str).str.strip()
+    return gestion_df[~completed.isin(['', 'nan', 'None'])]
+
+class MetricSketchIndex:
+    """Quantile sketches of the Tiempo_* metrics for completed gestion records
+
+    Sketches are kept per (week_label, Proveedor, hora_de_reserva) and merged at
+    query time, so any filter combination costs one merge per matching key.
+    New completed records are added incrementally; the index is rebuilt only
+    when an already ingested record changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.data_version = None
+        self._reset()
+
+    def _reset(self):
+        self.sketches = defaultdict(lambda: {metric: QuantileSketch() for metric in METRIC_COLUMNS})
+        self.fingerprints = {}  # Orden_de_compra -> tuple of ingested values
+
+    def ingest(self, gestion_df, data_version):
+        """Bring the index up to date with a gestion snapshot (once per data version)"""
+        with self._lock:
+            if data_version == self.data_version:
+                return
+            self.data_version = data_version
+            
+            completed = completed_gestion_records(gestion_df)
+            columns = ['Orden_de_compra', 'Proveedor', 'Hora_llegada', 'hora_de_reserva'] + METRIC_COLUMNS
+            rows = completed[columns].astype(str).itertuples(index=False, name=None)
+            fingerprints = {row[0]: row for row in rows}
+
+            changed = any(
+                fingerprints.get(order) != fingerprint
+                for order, fingerprint in self.fingerprints.items()
+            )
+            if changed:
+                logger.info("Ingested gestion records changed, rebuilding sketch index")
+                self._reset()
+
+            new_orders = [order for order in fingerprints if order not in self.fingerprints]
+            if not new_orders:
+                return
+
+            new_records = completed[completed['Orden_de_compra'].astype(str).isin(new_orders)]
+            new_records = new_records.assign(week_label=new_records['Hora_llegada'].apply(get_week_label))
+            new_records = new_records[new_records['week_label'].notna()]
+
+            for key, group in new_records.groupby(['week_label', 'Proveedor', 'hora_de_reserva'], dropna=False):
+                key = tuple(str(part) for part in key)
+                for metric in METRIC_COLUMNS:
+                    self.sketches[key][metric].add_many(pd.to_numeric(group[metric], errors='coerce'))
+
+            for order in new_orders:
+                self.fingerprints[order] = fingerprints[order]
+            logger.info(f"Sketch index ingested {len(new_records)} records, {len(self.sketches)} keys")
+
+    def query(self, week_labels, provider=None, hora_de_reserva=None):
+        """Merged sketch per metric for the matching keys"""
+        week_labels = set(week_labels)
+        merged = {metric: QuantileSketch() for metric in METRIC_COLUMNS}
+        with self._lock:
+            for (week_label, key_provider, key_hora), metric_sketches in self.sketches.items():
+                if week_label not in week_labels:
+                    continue
+                if provider and provider != "Todos" and key_provider != provider:
+                    continue
+                if hora_de_reserva is not None and key_hora != str(hora_de_reserva):
+                    continue
+                for metric in METRIC_COLUMNS:
+                    merged[metric].merge(metric_sketches[metric])
+        return merged
+
+# ─────────────────────────────────────────────────────────────
+# 3. Provider Scorecard Rollup
+# ─────────────────────────────────────────────────────────────
+ON_TIME_TOLERANCE_MINUTES = 0  # Arrivals at or before the booked time count as on time
+
+class ProviderWeekRollup:
+    """Additive totals of one provider's completed records in one week"""
+
+    def __init__(self):
+        self.count = 0
+        self.on_time = 0
+        self.delay_count = 0
+        self.delay_sum = 0.0
+        self.delay_sketch = QuantileSketch()
+        self.per_bulto_atencion_sum = 0.0
+        self.per_bulto_bultos_sum = 0.0
+
+    def add(self, records):
+        delay = pd.to_numeric(records['Tiempo_retraso'], errors='coerce')
+        atencion = pd.to_numeric(records['Tiempo_atencion'], errors='coerce')
+        bultos = pd.to_numeric(records['Numero_de_bultos'], errors='coerce')
+        with_bultos = atencion.notna() & (bultos > 0)
+
+        self.count += len(records)
+        self.on_time += int((delay <= ON_TIME_TOLERANCE_MINUTES).sum())
+        self.delay_count += int(delay.notna().sum())
+        self.delay_sum += float(delay.sum())
+        self.delay_sketch.add_many(delay)
+        self.per_bulto_atencion_sum += float(atencion[with_bultos].sum())
+        self.per_bulto_bultos_sum += float(bultos[with_bultos].sum())
+
+    def merge(self, other):
+        self.count += other.count
+        self.on_time += other.on_time
+        self.delay_count += other.delay_count
+        self.delay_sum += other.delay_sum
+        self.delay_sketch.merge(other.delay_sketch)
+        self.per_bulto_atencion_sum += other.per_bulto_atencion_sum
+        self.per_bulto_bultos_sum += other.per_bulto_bultos_sum
+
+    def scorecard(self):
+        """Derived metrics for display (None where there is no data)"""
+        delay_p90 = self.delay_sketch.quantile(0.9)
+        return {
+            'Registros': self.count,
+            'Puntualidad_%': round(100 * self.on_time / self.delay_count, 1) if self.delay_count else None,
+            'Retraso_promedio': round(self.delay_sum / self.delay_count, 1) if self.delay_count else None,
+            'Retraso_p90': round(delay_p90, 1) if delay_p90 is not None else None,
+            'Atencion_por_bulto': (
+                round(self.per_bulto_atencion_sum / self.per_bulto_bultos_sum, 2)
+                if self.per_bulto_bultos_sum else None
+            ),
+        }
+
+class ProviderScorecardRollup:
+    """Per-provider, per-week rollups kept current incrementally
+
+    On each data version only providers with new or changed completed
+    records are recomputed; ranking all providers then merges a few
+    week rollups per provider.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.data_version = None
+        self.rollups = {}       # Proveedor -> {week_label: ProviderWeekRollup}
+        self.fingerprints = {}  # Orden_de_compra -> tuple of ingested values
+
+    def ingest(self, gestion_df, data_version):
+        """Update the rollups of affected providers (once per data version)"""
+        with self._lock:
+            if data_version == self.data_version:
+                return
+            self.data_version = data_version
+
+            completed = completed_gestion_records(gestion_df)
+            columns = ['Orden_de_compra', 'Proveedor', 'Hora_llegada', 'Numero_de_bultos'] + METRIC_COLUMNS
+            completed = completed.assign(**{col: completed[col].astype(str) for col in columns})
+            fingerprints = {row[0]: row for row in completed[columns].itertuples(index=False, name=None)}
+
+            # Providers of added, changed or removed records (fingerprint[1] is Proveedor)
+            affected = {
+                fingerprint[1] for order, fingerprint in fingerprints.items()
+                if self.fingerprints.get(order) != fingerprint
+            }
+            affected |= {
+                fingerprint[1] for order, fingerprint in self.fingerprints.items()
+                if fingerprints.get(order) != fingerprint
+            }
+            self.fingerprints = fingerprints
+            if not affected:
+                return
+
+            records = completed[completed['Proveedor'].isin(affected)]
+            records = records.assign(week_label=records['Hora_llegada'].apply(get_week_label))
+            records = records[records['week_label'].notna()]
+
+            for provider in affected:
+                self.rollups.pop(provider, None)
+            for (provider, week_label), group in records.groupby(['Proveedor', 'week_label']):
+                rollup = ProviderWeekRollup()
+                rollup.add(group)
+                self.rollups.setdefault(provider, {})[week_label] = rollup
+            logger.info(f"Scorecard rollup updated {len(affected)} providers")
+
+    def _merge_weeks(self, week_rollups, week_labels):
+        merged = ProviderWeekRollup()
+        for week_label in week_labels:
+            if week_label in week_rollups:
+                merged.merge(week_rollups[week_label])
+        return merged
+
+    def scorecards(self, week_labels, previous_week_labels):
+        """One scorecard row per provider for the period, with trend vs the previous period"""
+        rows = []
+        with self._lock:
+            for provider, week_rollups in self.rollups.items():
+                current = self._merge_weeks(week_rollups, week_labels)
+                if current.count == 0:
+                    continue
+                previous = self._merge_weeks(week_rollups, previous_week_labels)
+                row = {'Proveedor': provider, **current.scorecard()}
+                previous_card = previous.scorecard()
+                for metric in ['Puntualidad_%', 'Retraso_promedio']:
+                    if row[metric] is not None and previous_card[metric] is not None:
+                        row[f"Δ_{metric}"] = round(row[metric] - previous_card[metric], 1)
+                    else:
+                        row[f"Δ_{metric}"] = None
+                rows.append(row)
+        return rows
@@ -0,0 +1,39 @@
+from datetime import date
+
+import pandas as pd
+
+from forecast import forecast_dock_occupancy
+
+HISTORY_COLUMNS = ['Proveedor', 'hora_de_reserva', 'Tiempo_retraso', 'Tiempo_espera', 'Tiempo_atencion']
+
+def make_reservas(horas, fecha='2026-10-19'):
+    return pd.DataFrame({
+        'Fecha': [fecha] * len(horas),
+        'Hora': horas,
+        'Proveedor': [f"Proveedor {n}" for n in range(len(horas))],
+        'Numero_de_bultos': [1] * len(horas),
+        'Orden_de_compra': [str(1000 + n) for n in range(len(horas))]
+    })
+
+def test_arrival_on_last_bucket_boundary():
+    # Zero expected times: the last arrival falls exactly where the grid would end
+    history = pd.DataFrame([['Proveedor 0', 9, 0, 0, 0]], columns=HISTORY_COLUMNS)
+    forecast, bookings = forecast_dock_occupancy(make_reservas(['09:00', '10:00']), history, date(2026, 10, 19), days=1)
+
+    assert len(bookings) == 2
+    assert forecast['Llegadas_esperadas'].sum() == 2
+    assert forecast['Bucket'].iloc[-1] == pd.Timestamp('2026-10-19 10:00')
+    assert forecast['Llegadas_esperadas'].iloc[-1] == 1
+
+def test_empty_history_gives_empty_forecast():
+    history = pd.DataFrame(columns=HISTORY_COLUMNS)
+    forecast, bookings = forecast_dock_occupancy(make_reservas(['09:00', '10:00']), history, date(2026, 10, 19), days=1)
+
+    assert forecast.empty
+    assert len(bookings) == 2
+
+def test_history_without_columns_gives_empty_forecast():
+    # get_completed_weeks_data returns a bare DataFrame when gestion is empty
+    forecast, _ = forecast_dock_occupancy(make_reservas(['09:00']), pd.DataFrame(), date(2026, 10, 19), days=1)
+
+    assert forecast.empty
@@ -0,0 +1,11 @@
+from datetime import time
+
+from time_utils import parse_combined_time_slots, parse_time_slots
+
+def test_combined_slots_start_at_first_slot():
+    assert parse_combined_time_slots('09:00:00, 09:30') == time(9, 0)
+
+def test_malformed_first_slot_has_no_start():
+    # Only the booking's own first slot is its start, never a later one
+    assert parse_combined_time_slots('9h, 09:30') is None
+    assert parse_time_slots('9h, 09:30') == [time(9, 30)]
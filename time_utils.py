@@ -0,0 +1,121 @@
+import pytz
+from datetime import datetime
+
+# Configure timezone for Bolivia
+BOLIVIA_TZ = pytz.timezone('America/La_Paz')
+
+def get_bolivia_now():
+    """Get current datetime in Bolivia timezone"""
+    return datetime.now(BOLIVIA_TZ)
+
+def get_bolivia_today():
+    """Get today's date in Bolivia timezone"""
+    return get_bolivia_now().date()
+
+def parse_time_range(time_range_str):
+    """Parse time range string (e.g., '09:00-09:30' or '09:00 - 09:30') and return start time"""
+    try:
+        # Handle both formats: "12:00-12:30" and "12:00 - 12:30"
+        if '-' in time_range_str:
+            start_time_str = time_range_str.split('-')[0].strip()
+            return datetime.strptime(start_time_str, '%H:%M').time()
+        return None
+    except:
+        return None
+
+def parse_single_time(time_str):
+    """Parse single time string (e.g., '09:00') and return time object"""
+    try:
+        return datetime.strptime(time_str.strip(), '%H:%M').time()
+    except:
+        return None
+        
+def parse_slot(slot):
+    """Parse one 'HH:MM' or 'HH:MM:SS' slot into a time, or None if it is malformed"""
+    slot = slot.strip()
+    # Remove seconds if present (e.g., "09:00:00" -> "09:00")
+    if slot.count(':') == 2:
+        slot = ':'.join(slot.split(':')[:2])
+    try:
+        return datetime.strptime(slot, '%H:%M').time()
+    except ValueError:
+        return None
+
+def parse_time_slots(time_str):
+    """Parse comma-separated time slots (e.g., '09:00, 09:30, 10:00') and return every valid slot time"""
+    if ',' not in str(time_str):
+        return None
+    slots = [parse_slot(slot) for slot in str(time_str).split(',')]
+    return [slot for slot in slots if slot is not None] or None
+
+def parse_combined_time_slots(time_str):
+    """Parse comma-separated time slots and return the first (start) time, None if that slot is malformed"""
+    if ',' not in str(time_str):
+        return None
+    # Take the first time slot for combined bookings
+    return parse_slot(str(time_str).split(',')[0])
+
+def calculate_time_difference(start_datetime, end_datetime):
+    """Calculate time difference in minutes"""
+    if start_datetime and end_datetime:
+        # Ensure both are datetime objects
+        if isinstance(start_datetime, str):
+            start_datetime = datetime.fromisoformat(start_datetime)
+        if isinstance(end_datetime, str):
+            end_datetime = datetime.fromisoformat(end_datetime)
+            
+        diff = end_datetime - start_datetime
+        return int(diff.total_seconds() / 60)
+    return None
+
+def combine_date_time(date_part, time_part):
+    """Combine date and time into datetime"""
+    return datetime.combine(date_part, time_part)
+
+def format_datetime_no_zero_padding(dt):
+    """Format datetime with single digit hours (9:00:00 not 09:00:00)"""
+    if dt is None:
+        return None
+    
+    # Get components
+    year = dt.year
+    month = dt.month
+    day = dt.day
+    hour = dt.hour  # This will be single digit for 1-9
+    minute = dt.minute
+    second = dt.second
+    
+    # Format with single digit hour when needed
+    return f"{year}-{month:02d}-{day:02d} {hour}:{minute:02d}:{second:02d}"
+
+def parse_datetime_flexible(datetime_str):
+    """Parse datetime string that may have single or double digit hours"""
+    if not datetime_str or str(datetime_str).lower() in ['none', 'nan', '']:
+        return None
+    
+    datetime_str = str(datetime_str).strip()
+    
+    try:
+        # First try standard ISO format (with zero-padded hours)
+        return datetime.fromisoformat(datetime_str)
+    except ValueError:
+        try:
+            # Try parsing with single digit hours manually
+            # Format: "2025-07-08 9:00:00"
+            if ' ' in datetime_str and ':' in datetime_str:
+                date_part, time_part = datetime_str.split(' ', 1)
+                
+                # Parse date part
+                year, month, day = map(int, date_part.split('-'))
+                
+                # Parse time part
+                time_components = time_part.split(':')
+                hour = int(time_components[0])
+                minute = int(time_components[1]) if len(time_components) > 1 else 0
+                second = int(time_components[2]) if len(time_components) > 2 else 0
+                
+                return datetime(year, month, day, hour, minute, second)
+            else:
+                return None
+        except (ValueError, IndexError):
+            return None
@@ -0,0 +1,133 @@
+import fcntl
+import json
+import logging
+import os
+import uuid
+
+from time_utils import get_bolivia_now
+
+logger = logging.getLogger('provider_control_app')
+
+# ─────────────────────────────────────────────────────────────
+# Local write-ahead log of sheet writes
+# One JSON object per line: entries {"id", "key", "kind", "orden_compra",
+# "data", "base", "created_at"} and status markers {"id", "status"}. base holds
+# the values the operator saw before editing. Every operation takes a file
+# lock, so the app and the API can share one log.
+# ─────────────────────────────────────────────────────────────
+class WriteAheadLog:
+    """Durable append-only log of arrival and service writes waiting for Google Sheets"""
+
+    def __init__(self, path):
+        self.path = path
+        self.failed_path = f"{path}.failed"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _append_line(self, record, path=None):
+        with open(path or self.path, 'a', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, kind, orden_compra, data, key=None, base=None):
+        """Persist a write to disk and return its entry; the caller can acknowledge right away"""
+        entry = {
+            'id': uuid.uuid4().hex,
+            'key': key,
+            'kind': kind,
+            'orden_compra': str(orden_compra).strip(),
+            'data': data,
+            'base': base,
+            'created_at': get_bolivia_now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        self._append_line(entry)
+        logger.info(f"Logged {kind} write for order {entry['orden_compra']} ({entry['id']})")
+        return entry
+
+    def _read(self, f):
+        entries, statuses = {}, {}
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write can leave a partial last line
+                logger.warning(f"Skipping unreadable write log line: {line[:80]}")
+                continue
+            if 'status' in record:
+                statuses[record['id']] = record['status']
+            else:
+                entries[record['id']] = record
+        return [entry for entry_id, entry in entries.items() if entry_id not in statuses]
+
+    def pending(self):
+        """Entries not yet applied, in the order they were logged"""
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_SH)
+            return self._read(f)
+
+    def mark(self, entry, status, reason=None):
+        """Record an entry as 'done' or 'failed' (with the reason); the log is truncated once nothing is pending"""
+        if status == 'failed':
+            self._append_line({**entry, 'reason': reason}, self.failed_path)
+        with open(self.path, 'r+', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0, os.SEEK_END)
+            f.write(json.dumps({'id': entry['id'], 'status': status}) + '\n')
+            f.flush()
+            f.seek(0)
+            if not self._read(f):
+                f.truncate(0)
+            os.fsync(f.fileno())
+
+    def failed_count(self):
+        """Number of entries given up on, kept in the .failed file for manual review"""
+        if not os.path.exists(self.failed_path):
+            return 0
+        with open(self.failed_path, 'r', encoding='utf-8') as f:
+            return sum(1 for line in f if line.strip())
+
+    def failed_reasons(self):
+        """Entry id -> rejection reason of every entry given up on"""
+        if not os.path.exists(self.failed_path):
+            return {}
+        reasons = {}
+        with open(self.failed_path, 'r', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_SH)
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                reasons[record['id']] = record.get('reason')
+        return reasons
+
+    def archive_failed(self):
+        """Move the entries given up on to a timestamped file once reviewed; returns its path, None if there were none"""
+        if not os.path.exists(self.failed_path):
+            return None
+        archive_path = f"{self.failed_path}.{get_bolivia_now().strftime('%Y%m%d-%H%M%S')}"
+        with open(self.failed_path, 'r', encoding='utf-8') as f:
+            # Hold the lock so no rejection is appended while the file moves
+            fcntl.flock(f, fcntl.LOCK_EX)
+            os.replace(self.failed_path, archive_path)
+        logger.info(f"Archived failed writes to {archive_path}")
+        return archive_path
+
+    def try_acquire_replayer(self):
+        """Take the replayer lock without blocking; only its holder flushes the log to Sheets
+
+        Returns the open lock file (keep it open to hold the lock) or None.
+        """
+        lock_file = open(f"{self.path}.replayer", 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file